@@ -0,0 +1,95 @@
+"""
+Compares the compact wire format with pickled log records.
+The pickle encode time includes the formatting done by CustomQueueHandler.prepare,
+with the compact format the record is formatted by the listener instead.
+Run from the fastapi-application directory:
+    python -m benchmarks.bench_wire_format
+"""
+
+import logging
+import pickle
+import queue
+import timeit
+
+from utils.json_logger.json_log_formatter import JSONLogFormatter
+from utils.json_logger.log_handlers import CustomQueueHandler
+from utils.json_logger.wire import (
+    decode_record,
+    encode_record,
+)
+
+NUMBER = 20000
+
+
+def make_request_record() -> logging.LogRecord:
+    request_json_fields = {
+        "request": {
+            "request_uri": "http://0.0.0.0:8080/api/v1/public/user",
+            "request_referer": "http://0.0.0.0:8080/docs",
+            "request_protocol": "HTTP/1.1",
+            "request_method": "POST",
+            "request_path": "/api/v1/public/user",
+            "request_host": "127.0.0.1:8080",
+            "request_size": 84,
+            "request_content_type": "application/json",
+            "request_headers": {
+                "host": "0.0.0.0:8080",
+                "connection": "keep-alive",
+                "content-length": "84",
+                "accept": "application/json",
+                "content-type": "application/json",
+            },
+            "request_body": '{"first_name":"string","last_name":"string","email":"****"}',
+            "request_direction": "in",
+            "remote_ip": "127.0.0.1",
+            "remote_port": 50296,
+        },
+        "response": {
+            "response_status_code": 200,
+            "response_size": 71,
+            "response_headers": {"content-length": "71", "content-type": "application/json"},
+            "response_body": '{"first_name":"string","last_name":"string","email":"****"}',
+        },
+        "duration": 2,
+    }
+    return logging.makeLogRecord(
+        {
+            "name": "main",
+            "levelno": logging.INFO,
+            "levelname": "INFO",
+            "msg": "Response with code 200 to 'POST http://0.0.0.0:8080/api/v1/public/user' in 2 ms",
+            "duration": 2,
+            "request_json_fields": request_json_fields,
+        }
+    )
+
+
+def main() -> None:
+    record = make_request_record()
+    handler = CustomQueueHandler(queue.Queue())
+    handler.setFormatter(JSONLogFormatter())
+    handler.wire_format = "pickle"
+    prepared = handler.prepare(record)
+
+    pickled = pickle.dumps(prepared)
+    compact = encode_record(record)
+
+    results = {
+        "pickle": (
+            len(pickled),
+            timeit.timeit(lambda: pickle.dumps(handler.prepare(record)), number=NUMBER),
+            timeit.timeit(lambda: pickle.loads(pickled), number=NUMBER),
+        ),
+        "compact": (
+            len(compact),
+            timeit.timeit(lambda: encode_record(record), number=NUMBER),
+            timeit.timeit(lambda: decode_record(compact), number=NUMBER),
+        ),
+    }
+    print(f"{'format':<10}{'bytes/record':>14}{'encode us':>12}{'decode us':>12}")
+    for name, (size, encode_time, decode_time) in results.items():
+        print(f"{name:<10}{size:>14}{encode_time / NUMBER * 1e6:>12.2f}{decode_time / NUMBER * 1e6:>12.2f}")
+
+
+if __name__ == "__main__":
+    main()
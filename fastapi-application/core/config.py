@@ -7,7 +7,10 @@ from collections.abc import Sequence
 from pathlib import Path
 from typing import Literal
 
-from pydantic import BaseModel
+from pydantic import (
+    BaseModel,
+    model_validator,
+)
 from pydantic_settings import (
     BaseSettings,
     SettingsConfigDict,
@@ -36,6 +39,152 @@ class ApiBaseConfig(BaseModel):
     v1: ApiV1Prefix = ApiV1Prefix()
 
 
+class DebugBufferConfig(BaseModel):
+    enabled: bool = False
+    max_records: int = 500
+    max_bytes: int = 1048576  # 1MB
+    flush_status_code: int = 500
+
+
+class DedupConfig(BaseModel):
+    enabled: bool = False
+    max_repeats: int = 10
+    window: float = 1.0  # seconds
+    max_keys: int = 4096
+
+
+class ExceptionFormatConfig(BaseModel):
+    mode: Literal["text", "structured"] = "text"
+    frame_limit: int | None = None
+    cache_size: int = 256
+
+
+class BulkHttpConfig(BaseModel):
+    enabled: bool = False
+    url: str = "http://localhost:9200/logs/_bulk"
+    action_line: str | None = '{"index":{}}'
+    level: str = "INFO"
+    max_batch_records: int = 500
+    max_batch_bytes: int = 5242880  # 5MB
+    flush_interval: float = 1.0  # seconds
+    max_pending_records: int = 100000
+    pool_size: int = 2
+    max_retries: int = 5
+    timeout: float = 10.0
+
+
+class SocketStreamConfig(BaseModel):
+    enabled: bool = False
+    address: str = "tcp://127.0.0.1:5170"  # or unix:///path/to/socket
+    framing: Literal["newline", "length"] = "newline"
+    level: str = "INFO"
+    max_batch_records: int = 500
+    max_batch_bytes: int = 1048576  # 1MB
+    flush_interval: float = 0.5  # seconds
+    max_pending_records: int = 100000
+    connections: int = 1
+    max_retries: int = 10
+    max_backoff: float = 10.0  # seconds
+    timeout: float = 5.0
+
+
+class StdoutConfig(BaseModel):
+    buffered: bool = False  # replaces the console StreamHandler
+    max_batch_records: int = 1000
+    max_batch_bytes: int = 262144  # 256KB
+    flush_interval: float = 0.1  # seconds
+    max_pending_records: int = 100000
+    write_timeout: float = 1.0  # seconds
+
+
+class SpillConfig(BaseModel):
+    enabled: bool = False
+    handlers: tuple[str, ...] = ("bulk_http_handler",)
+    directory: Path = BASE_DIR / "logs" / "spill"
+    max_bytes: int = 1073741824  # 1GB
+    max_age: float = 86400.0  # seconds
+    segment_bytes: int = 16777216  # 16MB
+    slow_threshold: float = 0.5  # seconds
+    retry_interval: float = 1.0  # seconds
+
+
+class ListenerConfig(BaseModel):
+    fanout: bool = False
+    sink_queue_size: int = 10000
+    overflow: Literal["block", "drop"] = "block"
+    block_timeout: float = 1.0  # seconds
+    stop_timeout: float = 5.0  # seconds
+    format_workers: int = 0  # 0 formats on the listener thread
+    format_pool: Literal["auto", "process", "thread"] = "auto"
+    format_batch_size: int = 256
+
+
+class QueueBudgetConfig(BaseModel):
+    max_bytes: int = 67108864  # 64MB, 0 disables the limit
+    max_records: int = 10000  # 0 disables the limit
+    overflow: Literal["block", "drop"] = "drop"
+    block_timeout: float = 0.05  # seconds
+    report_interval: float = 10.0  # seconds, 0 disables the reports of dropped records
+
+
+class ProjectionConfig(BaseModel):
+    profiles: dict[str, tuple[str, ...]] = {
+        "slim": (
+            "timestamp",
+            "level_name",
+            "message",
+            "duration",
+            "response.response_status_code",
+        ),
+    }
+    handlers: dict[str, str] = {}  # handler name -> profile
+
+
+class BodyRedactionConfig(BaseModel):
+    json_keys: bool = True
+    max_json_size: int = 1048576  # 1MB, larger JSON bodies are redacted as text
+    max_size: int = 4194304  # 4MB, larger bodies are truncated before redaction
+
+
+class BodyEncodingConfig(BaseModel):
+    fallback: Literal["base64", "hex", "placeholder"] = "placeholder"
+    preview_bytes: int = 64
+    max_base64_bytes: int = 65536  # 64KB
+
+
+class RouteMetricsConfig(BaseModel):
+    enabled: bool = False
+    interval: float = 60.0  # seconds
+    max_routes: int = 1000
+    request_logs: Literal["all", "errors"] = "all"
+
+
+class TracingConfig(BaseModel):
+    enabled: bool = False
+    max_spans: int = 100  # per request
+
+
+class FlightRecorderConfig(BaseModel):
+    enabled: bool = False
+    max_records: int = 5000
+    max_bytes: int = 16777216  # 16MB
+    path: str = "/debug/logs"
+    token: str | None = None  # the route rejects all requests without a token
+
+
+class ProfilingConfig(BaseModel):
+    enabled: bool = False
+    header: str = "x-profile-token"
+    token: str | None = None  # requests carrying it in the header are profiled
+    sample_rate: float = 0.0  # share of the requests profiled without the header
+    mode: Literal["cprofile", "sampling"] = "cprofile"
+    sample_interval: float = 0.005  # seconds
+    top_n: int = 20
+    tracemalloc: bool = False
+    write_files: bool = False
+    directory: Path = BASE_DIR / "logs" / "profiles"
+
+
 class LoggingBaseConfig(BaseModel):
     log_format: str = LOG_DEFAULT_FORMAT
     date_fmt: str = DATE_FMT
@@ -60,12 +209,39 @@ class LoggingBaseConfig(BaseModel):
         "secret",
         "password",
         "access",
+        "x-profile-token",
     )
     mask: str = "****"
     pass_routes: tuple[str, ...] = (
         "/openapi.json",
         "/docs",
     )
+    debug_buffer: DebugBufferConfig = DebugBufferConfig()
+    dedup: DedupConfig = DedupConfig()
+    exc_format: ExceptionFormatConfig = ExceptionFormatConfig()
+    wire_format: Literal["pickle", "compact"] = "pickle"
+    bulk_http: BulkHttpConfig = BulkHttpConfig()
+    socket_stream: SocketStreamConfig = SocketStreamConfig()
+    stdout: StdoutConfig = StdoutConfig()
+    spill: SpillConfig = SpillConfig()
+    listener: ListenerConfig = ListenerConfig()
+    queue_budget: QueueBudgetConfig = QueueBudgetConfig()
+    projection: ProjectionConfig = ProjectionConfig()
+    body_redaction: BodyRedactionConfig = BodyRedactionConfig()
+    embed_json_bodies: bool = False
+    body_encoding: BodyEncodingConfig = BodyEncodingConfig()
+    route_metrics: RouteMetricsConfig = RouteMetricsConfig()
+    sharded_files: bool = False
+    tracing: TracingConfig = TracingConfig()
+    request_id_header: str = "x-request-id"
+    flight_recorder: FlightRecorderConfig = FlightRecorderConfig()
+    profiling: ProfilingConfig = ProfilingConfig()
+
+    @model_validator(mode="after")
+    def pass_flight_recorder_route(self) -> "LoggingBaseConfig":
+        if self.flight_recorder.path not in self.pass_routes:
+            self.pass_routes = (*self.pass_routes, self.flight_recorder.path)
+        return self
 
 
 class GunicornConfig(BaseModel):
@@ -1,10 +1,13 @@
 from contextlib import asynccontextmanager
+import asyncio
 import logging
 
 from fastapi import FastAPI
 
 from utils.json_logger.setup import setup_logging
 from utils.json_logger.middlewares import LoggingMiddleware
+from utils.json_logger.debug_views import router as debug_router
+from utils.json_logger.route_metrics import emit_route_summaries
 from core.config import settings
 
 
@@ -13,8 +16,15 @@ async def lifespan(app: FastAPI):
     setup_logging()
     queue_handler = logging.getHandlerByName("queue_handler")
     queue_handler.listener.start()
+    summaries_task = None
+    if settings.log_cfg.route_metrics.enabled:
+        summaries_task = asyncio.create_task(emit_route_summaries())
 
     yield
+    if summaries_task is not None:
+        summaries_task.cancel()
+        await asyncio.gather(summaries_task, return_exceptions=True)
+    queue_handler.flush()
     queue_handler.listener.stop()
 
 
@@ -25,5 +35,10 @@ def create_app() -> FastAPI:
         lifespan=lifespan,
     )
     app.middleware("http")(LoggingMiddleware())
+    if settings.log_cfg.flight_recorder.enabled:
+        app.include_router(
+            debug_router,
+            prefix=settings.log_cfg.flight_recorder.path,
+        )
 
     return app
@@ -0,0 +1,29 @@
+import base64
+
+import pytest
+
+from utils.json_logger.body_encoding import (
+    BodyFallback,
+    encode_body,
+)
+
+BINARY = b"\x89PNG\r\n\x1a\n" + bytes(range(256))
+
+
+@pytest.mark.parametrize(
+    "body, fallback, expected",
+    [
+        (b'{"name":"string"}', "placeholder", '{"name":"string"}'),
+        ("Привет".encode(), "placeholder", "Привет"),
+        (BINARY, "placeholder", f"<binary {len(BINARY)} bytes>"),
+        (BINARY, "hex", f"<binary {len(BINARY)} bytes> {BINARY[:4].hex()}..."),
+        (BINARY, "base64", f"<base64 {len(BINARY)} bytes> {base64.b64encode(BINARY).decode()}"),
+    ],
+)
+def test_encode_body(body: bytes, fallback: BodyFallback, expected: str) -> None:
+    assert encode_body(body, fallback=fallback, preview_bytes=4, max_base64_bytes=1024) == expected
+
+
+def test_encode_body_base64_limit(caplog) -> None:
+    assert encode_body(BINARY, fallback="base64", max_base64_bytes=16) == f"<binary {len(BINARY)} bytes>"
+    assert caplog.records == []
@@ -0,0 +1,94 @@
+import logging
+import queue
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from core.config import DebugBufferConfig
+from utils.json_logger.debug_buffer import (
+    RequestLogBuffer,
+    end_request_buffer,
+    start_request_buffer,
+)
+from utils.json_logger.log_handlers import CustomQueueHandler
+from utils.json_logger.middlewares import LoggingMiddleware
+from utils.json_logger.wire import QueueItem
+
+
+@pytest.fixture
+def buffered_logger(request):
+    log_queue: queue.Queue[QueueItem | None] = queue.Queue()
+    handler = CustomQueueHandler(log_queue)
+    handler.buffer_level = logging.INFO
+    log = logging.getLogger(request.node.name)
+    log.setLevel(logging.DEBUG)
+    log.propagate = False
+    log.addHandler(handler)
+    yield log, log_queue
+    log.removeHandler(handler)
+
+
+def drain(log_queue: queue.Queue[QueueItem | None]) -> list[str]:
+    messages = []
+    while not log_queue.empty():
+        record = log_queue.get_nowait()
+        assert isinstance(record, logging.LogRecord)
+        messages.append(record.getMessage())
+    return messages
+
+
+def test_buffer_limits() -> None:
+    handler = CustomQueueHandler(queue.Queue())
+    buffer = RequestLogBuffer(max_records=3, max_bytes=10**6)
+    for i in range(5):
+        buffer.append(handler, logging.makeLogRecord({"msg": f"message {i}"}))
+    assert len(buffer) == 3
+    assert buffer.dropped == 2
+
+    buffer = RequestLogBuffer(max_records=100, max_bytes=3000)
+    for i in range(10):
+        buffer.append(handler, logging.makeLogRecord({"msg": "x" * 500}))
+    assert buffer.size <= 3000
+    assert len(buffer) == 2
+
+
+def test_debug_records_flushed_on_error(buffered_logger) -> None:
+    log, log_queue = buffered_logger
+    log.debug("Outside of a request")
+    assert drain(log_queue) == []
+
+    token = start_request_buffer()
+    log.debug("Debug message")
+    log.info("Info message")
+    assert drain(log_queue) == ["Info message"]
+    end_request_buffer(token, flush=True)
+    assert drain(log_queue) == ["Debug message"]
+
+    token = start_request_buffer()
+    log.debug("Debug message")
+    end_request_buffer(token, flush=False)
+    assert drain(log_queue) == []
+
+
+def test_middleware_flushes_buffer(buffered_logger, mocker) -> None:
+    log, log_queue = buffered_logger
+    mocker.patch("utils.json_logger.middlewares.DEBUG_BUFFER", DebugBufferConfig(enabled=True))
+    app = FastAPI()
+    app.middleware("http")(LoggingMiddleware())
+
+    @app.get("/ok")
+    def ok():
+        log.debug("Debug ok")
+        return {}
+
+    @app.get("/fail")
+    def fail():
+        log.debug("Debug fail")
+        raise ValueError
+
+    client = TestClient(app)
+    assert client.get("/ok").status_code == 200
+    assert drain(log_queue) == []
+    assert client.get("/fail").status_code == 500
+    assert drain(log_queue) == ["Debug fail"]
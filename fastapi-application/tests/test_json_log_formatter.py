@@ -0,0 +1,110 @@
+import json
+import logging
+import traceback
+from collections.abc import Callable
+
+import pytest
+
+from utils.json_logger.exception_formatter import (
+    ExceptionRenderer,
+    ExcInfo,
+)
+from utils.json_logger.json_log_formatter import (
+    JSONLogFormatter,
+    ProjectionFormatter,
+)
+
+
+def raise_chained() -> None:
+    values: dict[str, int] = {}
+    try:
+        values["key"]
+    except KeyError as err:
+        raise ValueError("Invalid value") from err
+
+
+def get_exc_info(func: Callable[[], object]) -> ExcInfo:
+    try:
+        func()
+    except Exception as err:
+        return type(err), err, err.__traceback__
+    pytest.fail("No exception was raised")
+
+
+def test_text_rendering_matches_traceback() -> None:
+    renderer = ExceptionRenderer(mode="text", frame_limit=None, cache_size=8)
+    exc_info = get_exc_info(raise_chained)
+    assert renderer.render(exc_info) == traceback.format_exception(*exc_info)
+    assert renderer.render(exc_info) == traceback.format_exception(*exc_info)
+    assert len(renderer._cache) == 2
+
+
+def test_structured_rendering() -> None:
+    renderer = ExceptionRenderer(mode="structured", frame_limit=1, cache_size=8)
+    cause, exc = renderer.render(get_exc_info(raise_chained))
+    assert isinstance(cause, dict) and isinstance(exc, dict)
+    assert cause["type"] == "KeyError"
+    assert exc["type"] == "ValueError"
+    assert exc["message"] == "Invalid value"
+    assert exc["frames"] == [
+        {
+            "file": __file__,
+            "line": exc["frames"][0]["line"],
+            "function": "get_exc_info",
+        }
+    ]
+
+
+def test_projection_formatter_shares_fragments() -> None:
+    record = logging.makeLogRecord(
+        {
+            "name": "test",
+            "msg": "Response",
+            "levelno": logging.INFO,
+            "duration": 3,
+            "request_json_fields": {
+                "request": {"request_path": "/"},
+                "response": {"response_status_code": 200, "response_body": "ok"},
+            },
+        }
+    )
+    formatter = JSONLogFormatter()
+    log_object = formatter._format_log_object(record)
+    assert formatter.format(record) == json.dumps(log_object, default=str)
+
+    record.json_fragments = formatter.get_fragments(record)
+    record.request_json_fields = {}
+    projection = ProjectionFormatter(fields=("message", "response.response_status_code", "duration"))
+    assert json.loads(projection.format(record)) == {
+        "message": "Response",
+        "duration": 3,
+        "response": {"response_status_code": 200},
+    }
+    assert formatter.format(record) == json.dumps(log_object, default=str)
+
+
+@pytest.mark.parametrize(
+    "body, content_type, expected",
+    [
+        ('{"email":"****","ids":[1,2]}', "application/json", {"email": "****", "ids": [1, 2]}),
+        ('{\n  "first_name": "John Smith"\n}', "application/json", {"first_name": "John Smith"}),
+        ('{"first_name": ', "application/json", '{"first_name": '),
+        ("NaN", "application/json", "NaN"),
+        ('{"a":1}', "text/plain", '{"a":1}'),
+    ],
+)
+def test_embed_json_bodies(body: str, content_type: str, expected) -> None:
+    record = logging.makeLogRecord(
+        {
+            "name": "test",
+            "msg": "Response",
+            "levelno": logging.INFO,
+            "request_json_fields": {
+                "response": {"response_headers": {"content-type": content_type}, "response_body": body},
+            },
+        }
+    )
+    line = JSONLogFormatter(embed_json_bodies=True).format(record)
+    assert json.loads(line)["response"]["response_body"] == expected
+    if isinstance(expected, dict):
+        assert '"response_body": {' in line
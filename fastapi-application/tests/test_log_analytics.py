@@ -0,0 +1,95 @@
+import gzip
+import json
+
+from tools.log_analytics import analyze
+from utils.json_logger.histogram import (
+    LogLinearHistogram,
+    get_bucket,
+    get_bucket_bounds,
+)
+from utils.json_logger.route_metrics import RouteMetrics
+
+
+def test_histogram_quantiles_and_merge() -> None:
+    for value in (0, 15, 16, 17, 100, 12345, 2**40):
+        lower, upper = get_bucket_bounds(get_bucket(value))
+        assert lower <= min(value, 2**40 - 1) <= upper
+
+    first = LogLinearHistogram()
+    second = LogLinearHistogram()
+    for value in range(1, 501):
+        first.record(value)
+    for value in range(501, 1001):
+        second.record(value)
+    first.merge(second)
+    assert first.count == 1000
+    median = first.quantile(0.5)
+    p99 = first.quantile(0.99)
+    assert median is not None and abs(median - 500) / 500 < 0.07
+    assert p99 is not None and abs(p99 - 990) / 990 < 0.07
+    assert LogLinearHistogram.from_dict(first.to_dict()).quantile(0.95) == first.quantile(0.95)
+
+
+def make_line(path: str, duration: int, status: int, worker: int = 1) -> str:
+    return json.dumps(
+        {
+            "thread": worker,
+            "message": "Response",
+            "duration": duration,
+            "request": {"request_method": "GET", "request_path": path, "request_size": 0},
+            "response": {"response_status_code": status, "response_size": 100},
+        }
+    )
+
+
+def test_analyze_files(tmp_path) -> None:
+    lines = [make_line("/users", duration, 500 if duration % 10 == 0 else 200) for duration in range(1, 101)]
+    lines.append(json.dumps({"message": "Application started"}))
+    (tmp_path / "info_log.jsonl").write_text("\n".join(lines[:50]) + "\n")
+    (tmp_path / "info_log.jsonl.1.gz").write_bytes(gzip.compress(("\n".join(lines[50:]) + "\n").encode()))
+    (tmp_path / "error_log.jsonl").write_text(make_line("/items", 5, 404) + "\n")
+    paths = sorted(tmp_path.iterdir())
+
+    for workers in (0, 2):
+        summary = analyze(paths, workers=workers, max_routes=10)
+        users = summary[("GET", "/users")].to_dict()
+        assert users["count"] == 100
+        assert users["server_error_rate"] == 0.1
+        assert abs(users["latency_ms"]["p95"] - 95) <= 5
+        assert summary[("GET", "/items")].to_dict()["error_rate"] == 1.0
+
+    summary = analyze(paths, max_routes=1)
+    assert set(summary) == {("GET", "/items"), ("GET", "(other)")}
+
+
+def test_analyze_route_summaries(tmp_path) -> None:
+    metrics = RouteMetrics(max_routes=10)
+    lines = []
+    for worker in range(2):
+        for duration in range(1, 51):
+            metrics.observe(method="GET", route="/users/{user_id}", status_code=200, duration=duration + worker * 50)
+        metrics.observe(method="GET", route="/users/{user_id}", status_code=503, duration=1)
+        lines.append(json.dumps({"message": "Route latency summary", "route_summary": metrics.drain()}))
+    (tmp_path / "info_log.jsonl").write_text("\n".join(lines) + "\n")
+
+    stats = analyze([tmp_path / "info_log.jsonl"])[("GET", "/users/{user_id}")].to_dict()
+    assert stats["count"] == 102
+    assert stats["server_error_rate"] == 2 / 102
+    assert abs(stats["latency_ms"]["p50"] - 50) <= 4
+
+
+def test_analyze_requests_and_route_summaries(tmp_path) -> None:
+    metrics = RouteMetrics(max_routes=10)
+    lines = []
+    for duration in (10, 20, 30):
+        metrics.observe(method="GET", route="/users", status_code=500, duration=duration)
+        lines.append(make_line("/users", duration, 500, worker=7))
+    lines.append(json.dumps({"thread": 7, "message": "Route latency summary", "route_summary": metrics.drain()}))
+    lines.extend(make_line("/users", 5, 200, worker=8) for _ in range(2))
+    (tmp_path / "info_log.jsonl").write_text("\n".join(lines) + "\n")
+    paths = [tmp_path / "info_log.jsonl"]
+
+    users = analyze(paths)[("GET", "/users")]
+    assert (users.count, users.server_errors) == (5, 3)
+    assert analyze(paths, source="requests")[("GET", "/users")].count == 5
+    assert analyze(paths, source="summaries")[("GET", "/users")].count == 3
@@ -1,11 +1,42 @@
+import asyncio
 import json
 import logging
+import threading
+import time
+from collections.abc import AsyncIterator
+from typing import (
+    Any,
+    Literal,
+)
 
 import pytest
 from _pytest.logging import LogCaptureFixture
+from fastapi import (
+    FastAPI,
+    Request,
+    Response,
+)
+from fastapi.responses import StreamingResponse
 from fastapi.testclient import TestClient
 
+from core.config import (
+    FlightRecorderConfig,
+    ProfilingConfig,
+    RouteMetricsConfig,
+    TracingConfig,
+)
+from utils.json_logger.debug_views import router as debug_router
 from utils.json_logger.json_log_formatter import JSONLogFormatter
+from utils.json_logger.middlewares import LoggingMiddleware
+from utils.json_logger.profiling import RequestProfiler
+from utils.json_logger.request_id import (
+    RequestIdFilter,
+    get_request_id,
+)
+from utils.json_logger.route_metrics import RouteMetrics
+from utils.json_logger.routes import RouteMatcher
+from utils.json_logger.sinks import FlightRecorderHandler
+from utils.json_logger.tracing import span
 
 request_params = {
     "request_uri",
@@ -13,6 +44,7 @@ request_params = {
     "request_protocol",
     "request_method",
     "request_path",
+    "request_route",
     "request_host",
     "request_size",
     "request_content_type",
@@ -48,7 +80,7 @@ def test_log_middleware(
     log_request_response = format_caplog_record(caplog.records[0])
     assert log_request_response["timestamp"] != ""
     assert log_request_response["level"] == 20
-    assert log_request_response["message"].split()[0] == "Response"
+    assert log_request_response["message"].startswith("Response with code 200 to 'GET http://testserver/' in ")
     assert log_request_response["source_log"] == "test"
     request_log = log_request_response["request"]
     response_log = log_request_response["response"]
@@ -121,3 +153,220 @@ def test_logs_written_to_file(
     assert log_entries[0]["message"] == "User Elena and secretpwd"
 
     assert log_entries[1]["source_log"] == "test"
+
+
+def test_route_metrics(
+    app: FastAPI,
+    mocker,
+    caplog: LogCaptureFixture,
+    disable_loggers_during_tests,
+) -> None:
+    @app.get("/users/{user_id}")
+    def get_user(user_id: int):
+        return {"user_id": user_id}
+
+    mocker.patch(
+        "utils.json_logger.middlewares.ROUTE_METRICS",
+        RouteMetricsConfig(enabled=True, request_logs="errors"),
+    )
+    metrics = RouteMetrics(max_routes=10)
+    mocker.patch("utils.json_logger.middlewares.route_metrics", metrics)
+    logging.getLogger("test").propagate = True
+    caplog.set_level(level=logging.INFO, logger="root")
+    client = TestClient(app, raise_server_exceptions=False)
+    for user_id in range(3):
+        assert client.get(f"/users/{user_id}").status_code == 200
+    assert client.get("/error").status_code == 500
+    assert caplog.records
+    assert all(record.levelno == logging.ERROR and "/error" in record.getMessage() for record in caplog.records)
+
+    summary = metrics.drain()
+    assert summary is not None
+    routes = {(route["route"], route["status_class"]): route for route in summary["routes"]}
+    assert routes[("/users/{user_id}", "2xx")]["count"] == 3
+    assert routes[("/error", "5xx")]["count"] == 1
+    assert metrics.drain() is None
+
+
+def test_pass_routes(
+    app: FastAPI,
+    mocker,
+    caplog: LogCaptureFixture,
+    disable_loggers_during_tests,
+) -> None:
+    @app.get("/health/live")
+    def health():
+        return {}
+
+    @app.get("/items/{item_id}")
+    def get_item(item_id: int):
+        return {}
+
+    mocker.patch("utils.json_logger.middlewares.PASS_ROUTES", RouteMatcher(("/health/*",)))
+    logging.getLogger("test").propagate = True
+    caplog.set_level(level=logging.INFO, logger="root")
+    client = TestClient(app)
+    assert client.get("/health/live").status_code == 200
+    assert caplog.records == []
+
+    assert client.get("/items/7").status_code == 200
+    request_log = format_caplog_record(caplog.records[0])["request"]
+    assert request_log["request_path"] == "/items/7"
+    assert request_log["request_route"] == "/items/{item_id}"
+
+
+def test_request_spans(
+    app,
+    mocker,
+    caplog: LogCaptureFixture,
+    disable_loggers_during_tests,
+) -> None:
+    @app.get("/traced")
+    async def traced():
+        with span("db.query"):
+            with span("db.fetch"):
+                pass
+        return {}
+
+    mocker.patch("utils.json_logger.middlewares.TRACING", TracingConfig(enabled=True))
+    logging.getLogger("test").propagate = True
+    caplog.set_level(level=logging.INFO, logger="root")
+    assert TestClient(app).get("/traced").status_code == 200
+    spans = format_caplog_record(caplog.records[0])["spans"]
+    assert [(item["name"], item.get("parent")) for item in spans] == [("db.query", None), ("db.fetch", 0)]
+
+
+def test_flight_recorder_route(
+    app,
+    mocker,
+    disable_loggers_during_tests,
+) -> None:
+    app.include_router(debug_router, prefix="/debug/logs")
+    mocker.patch("core.config.settings.log_cfg.flight_recorder", FlightRecorderConfig(token="secret"))
+    recorder = FlightRecorderHandler()
+    recorder.name = "flight_recorder"
+    recorder.setFormatter(JSONLogFormatter())
+    recorder.addFilter(RequestIdFilter())
+    test_logger = logging.getLogger("test")
+    test_2_logger = logging.getLogger("test_2")
+    test_logger.addHandler(recorder)
+    test_2_logger.addHandler(recorder)
+    try:
+        client = TestClient(app)
+        response = client.get("/public", headers={"x-request-id": "req-1"})
+        assert response.headers["x-request-id"] == "req-1"
+        assert client.get("/").headers["x-request-id"] != "req-1"
+
+        assert client.get("/debug/logs").status_code == 403
+        assert client.get("/debug/logs", headers={"x-debug-token": "wrong"}).status_code == 403
+        response = client.get("/debug/logs", params={"request_id": "req-1"}, headers={"x-debug-token": "secret"})
+        records = response.json()
+        assert [record["source_log"] for record in records] == ["test_2", "test"]
+        assert all(record["request_id"] == "req-1" for record in records)
+        response = client.get("/debug/logs", params={"path": "/"}, headers={"x-debug-token": "secret"})
+        assert [record["request"]["request_path"] for record in response.json()] == ["/"]
+    finally:
+        test_logger.removeHandler(recorder)
+        test_2_logger.removeHandler(recorder)
+        recorder.close()
+
+
+@pytest.mark.parametrize("mode", ["cprofile", "sampling"])
+def test_request_profile(
+    app,
+    mocker,
+    caplog: LogCaptureFixture,
+    disable_loggers_during_tests,
+    mode: Literal["cprofile", "sampling"],
+) -> None:
+    def busy_loop() -> None:
+        deadline = time.perf_counter() + 0.05
+        while time.perf_counter() < deadline:
+            pass
+
+    @app.get("/slow")
+    def slow():
+        busy_loop()
+        return {}
+
+    mocker.patch(
+        "utils.json_logger.middlewares.PROFILING",
+        ProfilingConfig(enabled=True, token="secret", mode=mode, sample_interval=0.001),
+    )
+    logging.getLogger("test").propagate = True
+    caplog.set_level(level=logging.INFO, logger="root")
+    client = TestClient(app)
+    assert client.get("/slow").status_code == 200
+    assert client.get("/slow", headers={"x-profile-token": "secret"}).status_code == 200
+    records = [format_caplog_record(record) for record in caplog.records]
+    assert "profile" not in records[0]
+    profile = records[1]["profile"]
+    assert profile["mode"] == mode
+    assert any("busy_loop" in item["function"] for item in profile["top"])
+
+
+def test_request_profile_summarized_off_the_event_loop(
+    app,
+    mocker,
+    disable_loggers_during_tests,
+) -> None:
+    threads = {}
+    summarize = RequestProfiler.summarize
+
+    def summarize_spy(self: RequestProfiler, request_id: str) -> dict[str, Any]:
+        threads["summarize"] = threading.get_ident()
+        return summarize(self, request_id)
+
+    @app.get("/async")
+    async def async_endpoint():
+        threads["event_loop"] = threading.get_ident()
+        return {}
+
+    mocker.patch.object(RequestProfiler, "summarize", summarize_spy)
+    mocker.patch(
+        "utils.json_logger.middlewares.PROFILING",
+        ProfilingConfig(enabled=True, token="secret", mode="sampling", sample_interval=0.001),
+    )
+    assert TestClient(app).get("/async", headers={"x-profile-token": "secret"}).status_code == 200
+    assert threads["summarize"] != threads["event_loop"]
+
+
+def test_streaming_error_releases_request_state(
+    app,
+    mocker,
+    caplog: LogCaptureFixture,
+    disable_loggers_during_tests,
+) -> None:
+    async def broken_body() -> AsyncIterator[bytes]:
+        yield b"partial"
+        raise RuntimeError("stream failed")
+
+    async def call_next(request: Request) -> Response:
+        return StreamingResponse(broken_body())
+
+    async def receive() -> dict[str, Any]:
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    @app.get("/fine")
+    def fine():
+        return {}
+
+    mocker.patch(
+        "utils.json_logger.middlewares.PROFILING",
+        ProfilingConfig(enabled=True, token="secret", mode="cprofile"),
+    )
+    scope = {
+        "type": "http",
+        "method": "GET",
+        "path": "/broken-stream",
+        "query_string": b"",
+        "headers": [(b"x-profile-token", b"secret")],
+    }
+    response = asyncio.run(LoggingMiddleware()(Request(scope, receive), call_next))
+    assert response.status_code == 500
+    assert get_request_id() is None
+
+    logging.getLogger("test").propagate = True
+    caplog.set_level(level=logging.INFO, logger="root")
+    assert TestClient(app).get("/fine", headers={"x-profile-token": "secret"}).status_code == 200
+    assert format_caplog_record(caplog.records[0])["profile"]["mode"] == "cprofile"
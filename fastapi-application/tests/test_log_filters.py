@@ -5,6 +5,10 @@ from logging.handlers import RotatingFileHandler
 
 import pytest
 
+from utils.json_logger.events import (
+    RequestLogEvent,
+    RequestUri,
+)
 from utils.json_logger.json_log_formatter import JSONLogFormatter
 from utils.json_logger.log_filters import (
     NonErrorFilter,
@@ -137,3 +141,137 @@ def test_non_error_filter(
     assert info_msg["source_log"] == logging.getLogger(__name__).name
     assert info_msg["message"] == "Info message"
     assert info_msg["level"] == logging.INFO
+
+
+def test_sensitive_data_filter_request_event(
+    caplog,
+    console_output,
+) -> None:
+    request_event = RequestLogEvent(
+        request_uri="http://testserver/login?token=tokenvalue",
+        request_protocol="HTTP/1.1",
+        request_method="POST",
+        request_path="/login",
+        request_host="127.0.0.1:8080",
+        request_headers=[(b"Token", b"tokenvalue"), (b"content-type", b"text/plain")],
+        request_body=b"password=secretpwd",
+        remote_ip="127.0.0.1",
+        remote_port=50296,
+        response_status_code=200,
+        response_headers=[(b"content-length", b"2")],
+        response_body=b"ok",
+        duration=1,
+    )
+    console_output.info("Response", extra={"request_event": request_event})
+    log_entry = json.loads(JSONLogFormatter().format(caplog.records[0]))
+    request_log = log_entry["request"]
+    assert request_log["request_uri"] == "http://testserver/login?REDACTED"
+    assert request_log["request_headers"] == {"Token": "REDACTED", "content-type": "text/plain"}
+    assert request_log["request_body"] == "REDACTED"
+    assert log_entry["response"]["response_size"] == 2
+    assert log_entry["response"]["response_body"] == "ok"
+
+
+def test_sensitive_data_filter_scope_request_event(
+    caplog,
+    console_output,
+) -> None:
+    scope = {
+        "type": "http",
+        "http_version": "1.1",
+        "method": "GET",
+        "scheme": "http",
+        "server": ("127.0.0.1", 8080),
+        "client": ("127.0.0.1", 50296),
+        "path": "/login",
+        "query_string": b"token=tokenvalue",
+        "headers": [(b"host", b"testserver"), (b"token", b"tokenvalue")],
+    }
+    request_event = RequestLogEvent.from_scope(
+        scope=scope,
+        request_body=b"",
+        response_status_code=200,
+        response_headers=[],
+        response_body=b"",
+        duration=1,
+    )
+    assert request_event.request_uri is None
+    console_output.info("Response to '%s'", RequestUri(request_event), extra={"request_event": request_event})
+    log_entry = json.loads(JSONLogFormatter().format(caplog.records[0]))
+    assert log_entry["message"] == "Response to 'http://testserver/login?REDACTED'"
+    request_log = log_entry["request"]
+    assert request_log["request_uri"] == "http://testserver/login?REDACTED"
+    assert request_log["request_protocol"] == "HTTP/1.1"
+    assert request_log["request_host"] == "127.0.0.1:8080"
+    assert request_log["request_headers"] == {"host": "testserver", "token": "REDACTED"}
+    assert (request_log["remote_ip"], request_log["remote_port"]) == ("127.0.0.1", 50296)
+
+
+def test_sensitive_data_filter_request_fields() -> None:
+    request_event = RequestLogEvent(
+        request_uri="http://testserver/login?token=tokenvalue",
+        request_protocol="HTTP/1.1",
+        request_method="POST",
+        request_path="/login",
+        request_host="127.0.0.1:8080",
+        request_headers=[(b"Token", b"tokenvalue"), (b"content-type", b"text/plain")],
+        request_body=b"password=secretpwd",
+        remote_ip="127.0.0.1",
+        remote_port=50296,
+        response_status_code=200,
+        response_headers=[(b"content-length", b"2")],
+        response_body=b"ok",
+        duration=1,
+    )
+    sensitive_filter = SensitiveDataFilter(mask_patterns=regex, mask_keys=keys, mask="REDACTED")
+    fields = request_event.to_dict()
+    redacted = sensitive_filter.redact_request_fields(fields)
+    assert redacted["request"]["request_uri"] == "http://testserver/login?REDACTED"
+    assert redacted["request"]["request_headers"] == {"Token": "REDACTED", "content-type": "text/plain"}
+    assert redacted["request"]["request_body"] == "REDACTED"
+    assert fields["request"]["request_body"] == "password=secretpwd"
+
+
+def test_sensitive_data_filter_request_path(
+    caplog,
+    console_output,
+) -> None:
+    def make_event() -> RequestLogEvent:
+        return RequestLogEvent(
+            request_uri="http://testserver/users/john@example.com",
+            request_protocol="HTTP/1.1",
+            request_method="GET",
+            request_path="/users/john@example.com",
+            request_route="/users/john@example.com",
+            request_host="127.0.0.1:8080",
+            request_headers=[],
+            request_body=b"",
+            remote_ip="127.0.0.1",
+            remote_port=50296,
+            response_status_code=404,
+            response_headers=[],
+            response_body=b"",
+            duration=1,
+        )
+
+    console_output.info("Response", extra={"request_event": make_event()})
+    request_log = json.loads(JSONLogFormatter().format(caplog.records[0]))["request"]
+    assert request_log["request_uri"] == "http://testserver/users/REDACTED"
+    assert request_log["request_path"] == "/users/REDACTED"
+    assert request_log["request_route"] == "/users/REDACTED"
+
+    sensitive_filter = SensitiveDataFilter(mask_patterns=regex, mask_keys=keys, mask="REDACTED")
+    redacted = sensitive_filter.redact_request_fields(make_event().to_dict())["request"]
+    assert {key: redacted[key] for key in request_log} == request_log
+
+
+def test_sensitive_data_filter_json_body() -> None:
+    sensitive_filter = SensitiveDataFilter(mask_patterns=regex, mask_keys=keys, mask="REDACTED", max_body_size=200)
+    body = json.dumps({"user": {"Password": "secretpwd", "email": "user@gmail.com"}, "items": [{"token": 1}, "x"]})
+    assert json.loads(sensitive_filter.redact_body(body, content_type="application/json; charset=utf-8")) == {
+        "user": {"Password": "REDACTED", "email": "REDACTED"},
+        "items": [{"token": "REDACTED"}, "x"],
+    }
+    assert sensitive_filter.redact_body("password=secretpwd", content_type="text/plain") == "REDACTED"
+    assert sensitive_filter.redact_body('{"password": ', content_type="application/json") == '{"password": '
+    assert sensitive_filter.redact_body("a" * 210) == "a" * 200 + "...[truncated 10 characters]"
@@ -0,0 +1,352 @@
+import io
+import json
+import logging
+import queue
+import threading
+import time
+from typing import Any
+
+import pytest
+
+from utils.json_logger.dedup import LogDeduplicator
+from utils.json_logger.events import RequestLogEvent
+from utils.json_logger.format_pool import PoolKind
+from utils.json_logger.json_log_formatter import JSONLogFormatter
+from utils.json_logger.log_handlers import CustomQueueHandler
+from utils.json_logger.log_listeners import (
+    CustomQueueListener,
+    LogQueue,
+    SinkWorker,
+)
+from utils.json_logger.wire import (
+    QueueItem,
+    WireFormatError,
+    decode_record,
+    encode_record,
+)
+
+
+def make_record(msg: str, created: float, level: int = logging.ERROR) -> logging.LogRecord:
+    return logging.makeLogRecord({"name": "test", "msg": msg, "levelno": level, "created": created})
+
+
+def get_log(log_queue: LogQueue, timeout: float = 1) -> Any:
+    record = log_queue.get(timeout=timeout)
+    assert isinstance(record, logging.LogRecord)
+    return json.loads(record.getMessage())
+
+
+def make_request_event(request_body: bytes = b"") -> RequestLogEvent:
+    scope = {"type": "http", "method": "GET", "path": "/error", "query_string": b"", "headers": []}
+    return RequestLogEvent.from_scope(
+        scope=scope,
+        request_body=request_body,
+        response_status_code=500,
+        response_headers=[],
+        response_body=b"",
+        duration=1,
+    )
+
+
+def test_deduplicator_suppresses_repeats() -> None:
+    deduplicator = LogDeduplicator(max_repeats=2, window=1.0, max_keys=10)
+    results = [deduplicator.process(make_record("Connection refused", 100.0 + i * 0.1)) for i in range(5)]
+    assert [allowed for allowed, _ in results] == [True, True, False, False, False]
+    assert all(not summaries for _, summaries in results)
+
+    allowed, summaries = deduplicator.process(make_record("Another message", 100.6))
+    assert allowed is True
+    assert summaries == []
+
+    allowed, summaries = deduplicator.process(make_record("Connection refused", 101.5))
+    assert allowed is True
+    assert len(summaries) == 1
+    summary = summaries[0]
+    assert summary.getMessage() == "Suppressed 3 repeated messages: Connection refused"
+    assert summary.levelno == logging.ERROR
+    assert vars(summary)["suppressed"]["count"] == 3
+    assert vars(summary)["suppressed"]["first"] < vars(summary)["suppressed"]["last"]
+
+
+def test_deduplicator_drain() -> None:
+    deduplicator = LogDeduplicator(max_repeats=1, window=60.0, max_keys=10)
+    for i in range(3):
+        deduplicator.process(make_record("Timeout", 100.0 + i))
+    deduplicator.process(make_record("Single", 100.0))
+    summaries = deduplicator.drain()
+    assert [vars(summary)["suppressed"]["count"] for summary in summaries] == [2]
+    assert deduplicator.drain() == []
+
+
+def test_queue_handler_dedup() -> None:
+    log_queue: queue.Queue[QueueItem | None] = queue.Queue()
+    handler = CustomQueueHandler(log_queue)
+    handler.setFormatter(JSONLogFormatter())
+    handler.deduplicator = LogDeduplicator(max_repeats=1, window=60.0, max_keys=10)
+    log = logging.getLogger("test_queue_handler_dedup")
+    log.propagate = False
+    log.addHandler(handler)
+    for _ in range(4):
+        log.error("Dependency is unavailable")
+    for _ in range(3):
+        log.error("ERROR with code %s", 500, extra={"request_event": make_request_event()})
+    handler.flush()
+    log.removeHandler(handler)
+
+    records = [get_log(log_queue) for _ in range(log_queue.qsize())]
+    assert len(records) == 5
+    assert records[0]["message"] == "Dependency is unavailable"
+    assert [record["message"] for record in records[1:4]] == ["ERROR with code 500"] * 3
+    assert records[4]["suppressed"]["count"] == 3
+
+
+def test_queue_handler_dedup_timer() -> None:
+    log_queue: queue.Queue[QueueItem | None] = queue.Queue()
+    handler = CustomQueueHandler(log_queue, deduplicator=LogDeduplicator(max_repeats=1, window=0.05, max_keys=10))
+    handler.setFormatter(JSONLogFormatter())
+    log = logging.getLogger("test_queue_handler_dedup_timer")
+    log.propagate = False
+    log.addHandler(handler)
+    try:
+        for _ in range(3):
+            log.error("Dependency is unavailable")
+        first = get_log(log_queue)
+        summary = get_log(log_queue)
+    finally:
+        log.removeHandler(handler)
+        handler.close()
+
+    assert first["message"] == "Dependency is unavailable"
+    assert summary["suppressed"]["count"] == 2
+
+
+def test_wire_format_round_trip() -> None:
+    record = logging.makeLogRecord(
+        {
+            "name": "main",
+            "levelno": logging.ERROR,
+            "levelname": "ERROR",
+            "msg": "ERROR with code %s",
+            "args": (500,),
+            "duration": 7,
+            "request_json_fields": {"request": {"request_path": "/error"}, "duration": 7},
+        }
+    )
+    formatter = JSONLogFormatter()
+    exceptions = ["Traceback (most recent call last):\n", "ValueError\n"]
+    decoded = decode_record(encode_record(record, exceptions=exceptions))
+    assert decoded.levelno == logging.ERROR
+    assert decoded.getMessage() == "ERROR with code 500"
+
+    expected = json.loads(formatter.format(record))
+    expected["exceptions"] = exceptions
+    assert json.loads(formatter.format(decoded)) == expected
+
+    with pytest.raises(WireFormatError):
+        decode_record(encode_record(record)[:-1])
+
+
+@pytest.mark.parametrize(
+    "duration, expected",
+    [(-5, -5), (2**32 + 1, 2**32 + 1), (2**70, 2**63 - 1), (-(2**70), -(2**63 - 1))],
+)
+def test_wire_format_duration_range(duration: int, expected: int) -> None:
+    record = logging.makeLogRecord({"name": "main", "msg": "Slow", "levelno": logging.INFO, "duration": duration})
+    assert decode_record(encode_record(record)).duration == expected
+
+
+def test_compact_queue_listener() -> None:
+    log_queue: queue.Queue[QueueItem | None] = queue.Queue()
+    handler = CustomQueueHandler(log_queue)
+    handler.setFormatter(JSONLogFormatter())
+    handler.wire_format = "compact"
+    stream = io.StringIO()
+    listener = CustomQueueListener(log_queue, logging.StreamHandler(stream))
+    log = logging.getLogger("test_compact_queue_listener")
+    log.setLevel(logging.DEBUG)
+    log.propagate = False
+    log.addHandler(handler)
+    listener.start()
+    log.info("User %s", "Elena")
+    listener.stop()
+    log.removeHandler(handler)
+
+    log_entry = json.loads(stream.getvalue())
+    assert log_entry["message"] == "User Elena"
+    assert log_entry["source_log"] == "test_compact_queue_listener"
+
+
+class SlowHandler(logging.Handler):
+    def __init__(self, level: int = logging.NOTSET) -> None:
+        super().__init__(level=level)
+        self.unblock = threading.Event()
+        self.messages: list[str] = []
+
+    def emit(self, record: logging.LogRecord) -> None:
+        self.unblock.wait(timeout=5)
+        self.messages.append(record.getMessage())
+
+
+def test_fanout_queue_listener() -> None:
+    log_queue: queue.Queue[QueueItem | None] = queue.Queue()
+    slow_handler = SlowHandler()
+    slow_handler.name = "slow"
+    fast_stream = io.StringIO()
+    fast_handler = logging.StreamHandler(fast_stream)
+    fast_handler.name = "fast"
+    fast_handler.setLevel(logging.INFO)
+    listener = CustomQueueListener(log_queue, slow_handler, fast_handler, respect_handler_level=True, fanout=True)
+    listener.start()
+    log_queue.put(logging.makeLogRecord({"msg": "Debug message", "levelno": logging.DEBUG}))
+    for i in range(3):
+        log_queue.put(logging.makeLogRecord({"msg": f"Message {i}", "levelno": logging.INFO}))
+
+    deadline = time.monotonic() + 5
+    while fast_stream.getvalue().count("\n") < 3 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert fast_stream.getvalue().splitlines() == ["Message 0", "Message 1", "Message 2"]
+    assert slow_handler.messages == []
+
+    slow_handler.unblock.set()
+    listener.stop()
+    assert slow_handler.messages == ["Debug message", "Message 0", "Message 1", "Message 2"]
+    stats = listener.get_stats()
+    assert stats["fast"]["handled"] == 3
+    assert stats["slow"]["handled"] == 4
+
+
+class FailingHandler(logging.Handler):
+    def __init__(self) -> None:
+        super().__init__()
+        self.messages: list[str] = []
+        self.errors: list[str] = []
+
+    def emit(self, record: logging.LogRecord) -> None:
+        if record.getMessage() == "bad":
+            raise ValueError("Can't handle the record")
+        self.messages.append(record.getMessage())
+
+    def handleError(self, record: logging.LogRecord) -> None:
+        self.errors.append(record.getMessage())
+
+
+def test_sink_worker_handler_errors() -> None:
+    handler = FailingHandler()
+    worker = SinkWorker(handler, maxsize=10, overflow="block", block_timeout=1)
+    worker.start()
+    for message in ("first", "bad", "last"):
+        worker.submit(logging.makeLogRecord({"msg": message}))
+    worker.stop()
+
+    assert handler.messages == ["first", "last"]
+    assert handler.errors == ["bad"]
+    assert (worker.stats["handled"], worker.stats["errors"]) == (2, 1)
+
+
+def test_sink_worker_stop_timeout() -> None:
+    handler = SlowHandler()
+    worker = SinkWorker(handler, maxsize=1, overflow="drop", block_timeout=0, stop_timeout=0.1)
+    worker.start()
+    worker.submit(logging.makeLogRecord({"msg": "Message 0"}))
+    while worker.queue.qsize():
+        time.sleep(0.01)
+    worker.submit(logging.makeLogRecord({"msg": "Message 1"}))
+    started = time.monotonic()
+    worker.stop()
+    assert time.monotonic() - started < 0.5
+    handler.unblock.set()
+
+
+@pytest.mark.parametrize("format_pool", ["thread", "process"])
+def test_format_pool_queue_listener(format_pool: PoolKind) -> None:
+    log_queue: queue.Queue[QueueItem | None] = queue.Queue()
+    handler = CustomQueueHandler(log_queue)
+    handler.setFormatter(JSONLogFormatter())
+    handler.wire_format = "compact"
+    stream = io.StringIO()
+    listener = CustomQueueListener(
+        log_queue,
+        logging.StreamHandler(stream),
+        format_workers=2,
+        format_pool=format_pool,
+        format_batch_size=8,
+    )
+    log = logging.getLogger(f"test_format_pool_queue_listener_{format_pool}")
+    log.setLevel(logging.DEBUG)
+    log.propagate = False
+    log.addHandler(handler)
+    listener.start()
+    for i in range(50):
+        log.info("Message %s password=qwerty%s", i, i)
+    listener.stop()
+    log.removeHandler(handler)
+
+    messages = [json.loads(line)["message"] for line in stream.getvalue().splitlines()]
+    assert messages == [f"Message {i} ****" for i in range(50)]
+
+
+def test_queue_byte_budget() -> None:
+    log_queue: queue.Queue[QueueItem | None] = queue.Queue()
+    handler = CustomQueueHandler(log_queue)
+    handler.setFormatter(JSONLogFormatter())
+    handler.wire_format = "compact"
+    handler.budget.max_bytes = 1000
+    log = logging.getLogger("test_queue_byte_budget")
+    log.setLevel(logging.DEBUG)
+    log.propagate = False
+    log.addHandler(handler)
+    log.info("x" * 2000)
+    log.info("small")
+    stats = handler.get_stats()
+    assert stats["enqueued_records"] == 1
+    assert stats["dropped_records"] == 1
+    assert stats["in_flight_bytes"] > 2000
+
+    listener = CustomQueueListener(log_queue, logging.NullHandler())
+    listener.start()
+    listener.stop()
+    log.info("small")
+    log.removeHandler(handler)
+    stats = handler.get_stats()
+    assert stats["enqueued_records"] == 2
+    assert stats["in_flight_records"] == 1
+
+
+def test_queue_record_cap_and_drop_report() -> None:
+    log_queue: queue.Queue[QueueItem | None] = queue.Queue()
+    handler = CustomQueueHandler(log_queue, report_interval=0.05)
+    handler.setFormatter(JSONLogFormatter())
+    handler.budget.max_records = 2
+    log = logging.getLogger("test_queue_record_cap_and_drop_report")
+    log.setLevel(logging.DEBUG)
+    log.propagate = False
+    log.addHandler(handler)
+    try:
+        for i in range(4):
+            log.info("Message %s", i)
+        assert handler.get_stats()["dropped_records"] == 2
+        messages = [get_log(log_queue)["message"] for _ in range(2)]
+        handler.budget.release(0)
+        handler.budget.release(0)
+        report = get_log(log_queue)
+    finally:
+        log.removeHandler(handler)
+        handler.close()
+
+    assert messages == ["Message 0", "Message 1"]
+    assert report["level"] == logging.WARNING
+    assert report["message"].startswith("Dropped 2 log records")
+
+
+def test_queue_item_size_includes_bodies() -> None:
+    log_queue: queue.Queue[QueueItem | None] = queue.Queue()
+    handler = CustomQueueHandler(log_queue, report_interval=0)
+    handler.setFormatter(JSONLogFormatter())
+    handler.wire_format = "pickle"
+    log = logging.getLogger("test_queue_item_size_includes_bodies")
+    log.propagate = False
+    log.addHandler(handler)
+    log.error("ERROR with code %s", 500, extra={"request_event": make_request_event(b"x" * 10000)})
+    log.removeHandler(handler)
+
+    assert handler.get_stats()["in_flight_bytes"] > 10000
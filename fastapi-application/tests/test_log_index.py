@@ -0,0 +1,77 @@
+import gzip
+import json
+
+from tools.cli import main
+from tools.log_index import LogIndex
+
+
+def make_line(second: int, path: str, status: int, level_name: str = "information") -> str:
+    return json.dumps(
+        {
+            "timestamp": f"2025-05-30 16:{second // 60:02d}:{second % 60:02d}+03:00",
+            "level_name": level_name,
+            "message": f"{path} {status}",
+            "request": {"request_path": path},
+            "response": {"response_status_code": status},
+        }
+    )
+
+
+def test_log_index_incremental_update(tmp_path) -> None:
+    log_path = tmp_path / "info_log.jsonl"
+    index_dir = tmp_path / ".index"
+    log_path.write_text("\n".join(make_line(i * 30, "/users", 200 if i % 3 else 500) for i in range(6)) + "\n")
+    index = LogIndex(log_path=log_path, index_dir=index_dir)
+    assert index.update() == 6
+    assert index.match(status="5xx") == [0, 3]
+
+    with open(log_path, "a") as log_file:
+        log_file.write(make_line(400, "/items", 404) + "\n" + make_line(401, "/items", 200))
+    rotated_path = log_path.rename(tmp_path / "info_log.jsonl.1")
+    index = LogIndex(log_path=rotated_path, index_dir=index_dir)
+    assert index.update() == 1
+    assert index.lines == 7
+    line_numbers = index.match(path="/items", status="404")
+    assert [json.loads(line)["message"] for line in index.read_lines(line_numbers)] == ["/items 404"]
+
+
+def test_log_index_short_file_and_interrupted_update(tmp_path) -> None:
+    log_path = tmp_path / "info_log.jsonl"
+    index_dir = tmp_path / ".index"
+    log_path.write_text('{"level_name": "ERROR"}\n')
+    assert LogIndex(log_path=log_path, index_dir=index_dir).update() == 1
+
+    with open(log_path, "a") as log_file:
+        log_file.write('{"level_name": "INFO"}\n')
+    index = LogIndex(log_path=log_path, index_dir=index_dir)
+    with open(index.get_postings_path("level"), "ab") as postings_file:
+        postings_file.write(b'{"error":[5]}\n')
+    assert index.update() == 1
+    assert index.lines == 2
+
+    index = LogIndex(log_path=log_path, index_dir=index_dir)
+    assert index.load()
+    assert index.match(levels=["error"]) == [0]
+    assert index.match(levels=["info"]) == [1]
+    assert "postings" not in json.loads(index.meta_path.read_text())
+
+    log_path.write_text('{"level_name": "DEBUG"}\n')
+    index = LogIndex(log_path=log_path, index_dir=index_dir)
+    assert index.update() == 1
+    assert index.match(levels=["debug"]) == [0]
+
+
+def test_query_cli(tmp_path, capsysbinary) -> None:
+    lines = [make_line(i * 20, "/users", 500 if i % 2 else 200) for i in range(10)]
+    (tmp_path / "info_log.jsonl.1.gz").write_bytes(gzip.compress(("\n".join(lines[:5]) + "\n").encode()))
+    (tmp_path / "info_log.jsonl").write_text("\n".join(lines[5:]) + "\n")
+    argv = ["--log-dir", str(tmp_path), "query", "--status", "500", "--since", "2025-05-30T16:00:30+03:00"]
+    argv += ["--until", "2025-05-30T16:02:40+03:00"]
+    assert main(argv) == 0
+
+    output = capsysbinary.readouterr().out.decode().splitlines()
+    assert [json.loads(line)["timestamp"] for line in output] == [
+        "2025-05-30 16:01:00+03:00",
+        "2025-05-30 16:01:40+03:00",
+        "2025-05-30 16:02:20+03:00",
+    ]
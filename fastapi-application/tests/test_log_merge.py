@@ -0,0 +1,70 @@
+import gzip
+import json
+import logging
+import os
+
+from tools.cli import main
+from tools.log_merge import (
+    ShardTail,
+    find_shards,
+    merge_shards,
+)
+from utils.json_logger.sinks import ShardedRotatingFileHandler
+
+
+def make_line(second: int, shard: str) -> str:
+    return json.dumps({"timestamp": f"2025-05-30 16:00:{second:02d}+03:00", "message": f"{shard} {second}"})
+
+
+def write_lines(path, seconds, shard: str) -> None:
+    path.write_text("".join(make_line(second, shard) + "\n" for second in seconds))
+
+
+def test_sharded_rotating_file_handler(tmp_path) -> None:
+    handler = ShardedRotatingFileHandler(tmp_path / "info_log.jsonl", maxBytes=200, backupCount=3)
+    record = logging.makeLogRecord({"msg": "x" * 80})
+    for _ in range(4):
+        handler.emit(record)
+    handler.close()
+
+    pid = os.getpid()
+    assert (tmp_path / f"info_log.{pid}.jsonl").exists()
+    assert (tmp_path / f"info_log.{pid}.jsonl.1").exists()
+    assert not (tmp_path / "info_log.jsonl").exists()
+
+
+def test_merge_shards(tmp_path, capsysbinary) -> None:
+    write_lines(tmp_path / "info_log.100.jsonl.1", [0, 4], "a")
+    write_lines(tmp_path / "info_log.100.jsonl", [8, 9], "a")
+    (tmp_path / "info_log.200.jsonl.1.gz").write_bytes(gzip.compress(make_line(1, "b").encode() + b"\n"))
+    write_lines(tmp_path / "info_log.200.jsonl", [5, 7], "b")
+    write_lines(tmp_path / "info_log.jsonl", [2], "c")
+    write_lines(tmp_path / "error_log.100.jsonl", [3], "e")
+    write_lines(tmp_path / "info_log_old.jsonl", [3], "o")
+
+    shards = find_shards(tmp_path, name="info_log")
+    assert set(shards) == {"info_log", "info_log.100", "info_log.200"}
+    assert [path.name for path in shards["info_log.100"]] == ["info_log.100.jsonl.1", "info_log.100.jsonl"]
+    messages = [json.loads(line)["message"] for line in merge_shards(shards.values())]
+    assert messages == ["a 0", "b 1", "c 2", "a 4", "b 5", "b 7", "a 8", "a 9"]
+
+    assert main(["--log-dir", str(tmp_path), "merge", "--name", "error_log"]) == 0
+    assert capsysbinary.readouterr().out == make_line(3, "e").encode() + b"\n"
+
+
+def test_shard_tail_rotation(tmp_path) -> None:
+    path = tmp_path / "info_log.100.jsonl"
+    write_lines(path, [0], "a")
+    tail = ShardTail(path, from_end=True)
+    assert tail.read_lines() == []
+
+    with open(path, "a") as log_file:
+        log_file.write(make_line(1, "a") + "\n" + make_line(2, "a")[:10])
+    assert [line for _, line in tail.read_lines()] == [make_line(1, "a").encode()]
+
+    with open(path, "a") as log_file:
+        log_file.write(make_line(2, "a")[10:] + "\n")
+    path.rename(tmp_path / "info_log.100.jsonl.1")
+    write_lines(path, [3], "a")
+    assert [line for _, line in tail.read_lines()] == [make_line(2, "a").encode(), make_line(3, "a").encode()]
+    tail.close()
@@ -0,0 +1,55 @@
+import time
+
+from core.config import ProfilingConfig
+from utils.json_logger.profiling import (
+    RequestProfiler,
+    should_profile,
+)
+
+
+def busy_loop(seconds: float) -> int:
+    deadline = time.perf_counter() + seconds
+    count = 0
+    while time.perf_counter() < deadline:
+        count += 1
+    return count
+
+
+def test_should_profile() -> None:
+    config = ProfilingConfig(token="secret")
+    assert should_profile({"x-profile-token": "secret"}, config=config) is True
+    assert should_profile({"x-profile-token": "wrong"}, config=config) is False
+    assert should_profile({}, config=config) is False
+    assert should_profile({}, config=ProfilingConfig(sample_rate=1.0)) is True
+    assert should_profile({"x-profile-token": ""}, config=ProfilingConfig()) is False
+
+
+def test_cprofile(tmp_path) -> None:
+    config = ProfilingConfig(top_n=5, tracemalloc=True, write_files=True, directory=tmp_path)
+    profiler = RequestProfiler(config=config)
+    assert profiler.start() is True
+    assert RequestProfiler(config=config).start() is False
+    busy_loop(0.01)
+    data = [bytes(1024) for _ in range(100)]
+    profiler.stop()
+    summary = profiler.summarize(request_id="../req 1")
+
+    assert summary["mode"] == "cprofile"
+    assert len(summary["top"]) <= 5
+    assert any("busy_loop" in item["function"] for item in summary["top"])
+    assert summary["allocations"]["peak_kb"] >= len(data)
+    assert summary["file"].endswith("-.._req_1.prof")
+    assert [path.name for path in tmp_path.iterdir()] == [summary["file"].rsplit("/", 1)[-1]]
+
+
+def test_sampling_profiler() -> None:
+    profiler = RequestProfiler(config=ProfilingConfig(mode="sampling", sample_interval=0.001))
+    assert profiler.start() is True
+    busy_loop(0.1)
+    profiler.stop()
+    summary = profiler.summarize(request_id="req")
+
+    assert summary["samples"] > 0
+    functions = [item["function"] for item in summary["top"]]
+    assert any("busy_loop" in function for function in functions)
+    assert "file" not in summary
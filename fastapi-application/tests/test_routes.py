@@ -0,0 +1,84 @@
+from typing import Any
+
+import pytest
+from fastapi import (
+    APIRouter,
+    FastAPI,
+    Request,
+)
+from fastapi.testclient import TestClient
+
+from core.config import (
+    FlightRecorderConfig,
+    LoggingBaseConfig,
+)
+from utils.json_logger.routes import (
+    UNMATCHED_ROUTE,
+    RouteMatcher,
+    RouteTemplates,
+    get_scope_template,
+)
+
+PATTERNS = ("/docs", "/openapi.json", "/health*", "/static/*", "/api/v?/ping")
+
+
+@pytest.mark.parametrize(
+    "path, expected",
+    [
+        ("/docs", True),
+        ("/docs/oauth2-redirect", False),
+        ("/health", True),
+        ("/healthz", True),
+        ("/static/css/app.css", True),
+        ("/static", False),
+        ("/api/v1/ping", True),
+        ("/api/v1/pong", False),
+        ("/", False),
+    ],
+)
+def test_route_matcher(path: str, expected: bool) -> None:
+    assert RouteMatcher(PATTERNS).matches(path) is expected
+
+
+def test_empty_route_matcher() -> None:
+    matcher = RouteMatcher(())
+    assert not matcher
+    assert matcher.matches("/docs") is False
+
+
+def test_pass_flight_recorder_route() -> None:
+    assert "/debug/logs" in LoggingBaseConfig().pass_routes
+    config = LoggingBaseConfig(flight_recorder=FlightRecorderConfig(path="/internal/logs"))
+    assert "/internal/logs" in config.pass_routes
+    assert "/debug/logs" not in config.pass_routes
+
+
+def test_route_templates() -> None:
+    app = FastAPI()
+
+    @app.get("/users/{user_id}")
+    def get_user(user_id: int):
+        return {}
+
+    templates = RouteTemplates(max_size=2)
+
+    def get_scope(path: str) -> dict[str, Any]:
+        return {"type": "http", "method": "GET", "path": path, "root_path": "", "app": app}
+
+    assert templates.resolve(get_scope("/users/1")) == "/users/{user_id}"
+    assert templates.resolve(get_scope("/missing")) == UNMATCHED_ROUTE
+    assert templates.resolve(get_scope("/users/2")) == "/users/{user_id}"
+    assert len(templates._cache) <= 2
+    assert templates.resolve({"path": "/users/3", "route": app.router.routes[-1]}) == "/users/{user_id}"
+
+
+def test_included_router_template() -> None:
+    app = FastAPI()
+    router = APIRouter(prefix="/v1")
+
+    @router.get("/users/{user_id}")
+    def get_user(user_id: int, request: Request):
+        return {"template": get_scope_template(request.scope)}
+
+    app.include_router(router, prefix="/api")
+    assert TestClient(app).get("/api/v1/users/1").json() == {"template": "/api/v1/users/{user_id}"}
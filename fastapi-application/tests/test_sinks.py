@@ -0,0 +1,450 @@
+import json
+import logging
+import os
+import resource
+import socket
+import socketserver
+import struct
+import threading
+import time
+from http.server import (
+    BaseHTTPRequestHandler,
+    ThreadingHTTPServer,
+)
+from typing import Any
+
+import pytest
+
+from utils.json_logger.json_log_formatter import JSONLogFormatter
+from utils.json_logger.sinks import (
+    BufferedStdoutHandler,
+    BulkHTTPHandler,
+    FlightRecorderHandler,
+    SocketStreamHandler,
+    SpillHandler,
+)
+from utils.json_logger.sinks.socket_stream import (
+    Framing,
+    SocketConnection,
+)
+from utils.json_logger.sinks.stdout import iter_chunks
+
+
+class BulkStubServer(ThreadingHTTPServer):
+    def __init__(self, fail_first: int = 0) -> None:
+        super().__init__(("127.0.0.1", 0), BulkStubRequestHandler)
+        self.fail_first = fail_first
+        self.item_statuses: list[list[int]] = []
+        self.requests: list[bytes] = []
+        self.connections: set[int] = set()
+
+
+class BulkStubRequestHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    server: BulkStubServer
+
+    def do_POST(self) -> None:
+        body = self.rfile.read(int(self.headers["Content-Length"]))
+        self.server.connections.add(self.client_address[1])
+        if self.server.fail_first > 0:
+            self.server.fail_first -= 1
+            status = 503
+        else:
+            self.server.requests.append(body)
+            status = 200
+        response = b"{}"
+        if status == 200 and self.server.item_statuses:
+            items = [{"index": {"status": item_status}} for item_status in self.server.item_statuses.pop(0)]
+            response = json.dumps({"errors": True, "items": items}).encode()
+        self.send_response(status)
+        self.send_header("Content-Length", str(len(response)))
+        self.end_headers()
+        self.wfile.write(response)
+
+    def log_message(self, *args) -> None:
+        pass
+
+
+@pytest.fixture
+def bulk_server(request):
+    server = BulkStubServer(fail_first=getattr(request, "param", 0))
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def bulk_logger(request, bulk_server):
+    handler = BulkHTTPHandler(
+        url=f"http://127.0.0.1:{bulk_server.server_port}/logs/_bulk",
+        max_batch_records=3,
+        flush_interval=0.05,
+        pool_size=1,
+        max_retries=3,
+        timeout=5,
+    )
+    handler.backoff = 0.01
+    handler.setFormatter(JSONLogFormatter())
+    log = logging.getLogger(request.node.name)
+    log.setLevel(logging.DEBUG)
+    log.propagate = False
+    log.addHandler(handler)
+    yield log, handler
+    log.removeHandler(handler)
+    handler.close()
+
+
+def parse_bulk_body(body: bytes) -> list[dict[str, Any]]:
+    return [json.loads(line) for line in body.decode().splitlines()]
+
+
+def test_bulk_http_handler_batches(bulk_server, bulk_logger) -> None:
+    log, handler = bulk_logger
+    for i in range(7):
+        log.info("Message %s", i)
+    handler.flush(timeout=5)
+
+    assert [len(body.splitlines()) for body in bulk_server.requests] == [6, 6, 2]
+    lines = [line for body in bulk_server.requests for line in parse_bulk_body(body)]
+    assert lines[0] == {"index": {}}
+    assert [line["message"] for line in lines[1::2]] == [f"Message {i}" for i in range(7)]
+    assert len(bulk_server.connections) == 1
+    stats = handler.get_stats()
+    assert stats["records_sent"] == 7
+    assert stats["records_dropped"] == 0
+
+
+@pytest.mark.parametrize("bulk_server", [2], indirect=True)
+def test_bulk_http_handler_retries(bulk_server, bulk_logger) -> None:
+    log, handler = bulk_logger
+    log.info("Message")
+    handler.flush(timeout=5)
+
+    assert len(bulk_server.requests) == 1
+    assert handler.get_stats()["retries"] == 2
+
+
+def test_bulk_http_handler_item_errors(bulk_server, bulk_logger) -> None:
+    log, handler = bulk_logger
+    bulk_server.item_statuses.append([201, 429, 400])
+    for i in range(3):
+        log.info("Message %s", i)
+    handler.flush(timeout=5)
+
+    assert len(bulk_server.requests) == 2
+    assert [line["message"] for line in parse_bulk_body(bulk_server.requests[1])[1::2]] == ["Message 1"]
+    stats = handler.get_stats()
+    assert stats["records_sent"] == 2
+    assert stats["records_dropped"] == 1
+    assert stats["retries"] == 1
+
+
+class FlakyHandler(logging.Handler):
+    def __init__(self) -> None:
+        super().__init__()
+        self.available = True
+        self.messages: list[str] = []
+
+    def emit(self, record: logging.LogRecord) -> None:
+        if not self.available:
+            raise ConnectionError("Sink is unavailable")
+        self.messages.append(record.getMessage())
+
+
+@pytest.fixture
+def spill_handler(tmp_path):
+    target = FlakyHandler()
+    handler = SpillHandler(
+        target=target,
+        directory=tmp_path,
+        max_bytes=10**6,
+        max_age=3600,
+        segment_bytes=200,
+        slow_threshold=1,
+        retry_interval=0.02,
+    )
+    yield handler, target
+    handler.close()
+
+
+def wait_for(condition, timeout: float = 5.0) -> None:
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline
+        time.sleep(0.01)
+
+
+def test_spill_handler_replays_in_order(spill_handler, tmp_path) -> None:
+    handler, target = spill_handler
+    handler.handle(logging.makeLogRecord({"name": "test", "levelno": logging.INFO, "msg": "Message 0"}))
+    target.available = False
+    for i in range(1, 6):
+        handler.handle(logging.makeLogRecord({"name": "test", "levelno": logging.INFO, "msg": f"Message {i}"}))
+    assert target.messages == ["Message 0"]
+    assert len(list(tmp_path.iterdir())) > 1
+    assert "handleError" not in vars(target)
+
+    target.available = True
+    handler.handle(logging.makeLogRecord({"name": "test", "levelno": logging.INFO, "msg": "Message 6"}))
+    wait_for(lambda: len(target.messages) == 7)
+    assert target.messages == [f"Message {i}" for i in range(7)]
+    wait_for(lambda: not handler.get_stats()["spilling"])
+    assert list(tmp_path.iterdir()) == []
+
+    handler.handle(logging.makeLogRecord({"name": "test", "levelno": logging.INFO, "msg": "Message 7"}))
+    assert target.messages[-1] == "Message 7"
+
+
+def test_spill_handler_limits(spill_handler, tmp_path) -> None:
+    handler, target = spill_handler
+    target.available = False
+    handler.max_bytes = 400
+    for i in range(20):
+        handler.handle(logging.makeLogRecord({"name": "test", "levelno": logging.INFO, "msg": f"Message {i}"}))
+    stats = handler.get_stats()
+    assert stats["spill_bytes"] <= 400
+    assert stats["dropped_segments"] > 0
+
+    target.available = True
+    wait_for(lambda: not handler.get_stats()["spilling"])
+    assert target.messages[-1] == "Message 19"
+    assert len(target.messages) < 20
+
+
+def test_flight_recorder_handler() -> None:
+    recorder = FlightRecorderHandler(max_records=3, max_bytes=4096)
+    recorder.setFormatter(JSONLogFormatter())
+    for index, (level, path) in enumerate(
+        [(logging.INFO, "/a"), (logging.ERROR, "/b"), (logging.INFO, "/b"), (logging.ERROR, "/a")]
+    ):
+        record = logging.makeLogRecord(
+            {"name": "test", "msg": f"record {index}", "levelno": level, "request_id": f"id-{index}"}
+        )
+        record.request_json_fields = {"request": {"request_path": path}}
+        recorder.handle(record)
+
+    assert recorder.get_stats()["records"] == 3
+    assert recorder.evicted == 1
+    messages = [json.loads(line)["message"] for line in recorder.query()]
+    assert messages == ["record 1", "record 2", "record 3"]
+    assert [json.loads(line)["message"] for line in recorder.query(level=logging.ERROR)] == ["record 1", "record 3"]
+    assert [json.loads(line)["message"] for line in recorder.query(path="/b", limit=1)] == ["record 2"]
+    assert [json.loads(line)["request_id"] for line in recorder.query(request_id="id-3")] == ["id-3"]
+
+    recorder.handle(logging.makeLogRecord({"name": "test", "msg": "x" * 8192}))
+    assert recorder.size <= recorder.max_bytes
+    assert recorder.get_stats()["records"] == 3
+
+
+class StreamStubHandler(socketserver.BaseRequestHandler):
+    server: "TCPStreamStubServer | UnixStreamStubServer"
+
+    def handle(self) -> None:
+        chunks = []
+        while data := self.request.recv(65536):
+            chunks.append(data)
+            if self.server.close_first and len(self.server.received) == 0:
+                break
+        with self.server.lock:
+            self.server.received.append(b"".join(chunks))
+
+
+class TCPStreamStubServer(socketserver.ThreadingTCPServer):
+    def __init__(self, close_first: bool = False) -> None:
+        super().__init__(("127.0.0.1", 0), StreamStubHandler)
+        self.close_first = close_first
+        self.received: list[bytes] = []
+        self.lock = threading.Lock()
+
+
+class UnixStreamStubServer(socketserver.ThreadingUnixStreamServer):
+    def __init__(self, path: str) -> None:
+        super().__init__(path, StreamStubHandler)
+        self.close_first = False
+        self.received: list[bytes] = []
+        self.lock = threading.Lock()
+
+
+def serve(server: socketserver.BaseServer) -> threading.Thread:
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    return thread
+
+
+def parse_length_frames(data: bytes) -> list[dict[str, Any]]:
+    records = []
+    while data:
+        (length,) = struct.unpack_from("!I", data)
+        records.append(json.loads(data[4 : 4 + length]))
+        data = data[4 + length :]
+    return records
+
+
+def make_socket_handler(address: str, framing: Framing = "newline") -> SocketStreamHandler:
+    handler = SocketStreamHandler(
+        address=address, framing=framing, max_batch_records=2, flush_interval=0.05, max_retries=5, timeout=5
+    )
+    handler.backoff = 0.01
+    handler.setFormatter(JSONLogFormatter())
+    return handler
+
+
+def make_record(message: str) -> logging.LogRecord:
+    return logging.makeLogRecord({"name": "test", "msg": message, "levelno": logging.INFO})
+
+
+def test_socket_stream_handler_tcp_reconnects() -> None:
+    server = TCPStreamStubServer(close_first=True)
+    serve(server)
+    handler = make_socket_handler(f"tcp://127.0.0.1:{server.server_address[1]}")
+    try:
+        handler.handle(make_record("first"))
+        handler.flush(timeout=5)
+        deadline = time.monotonic() + 5
+        while not server.received and time.monotonic() < deadline:
+            time.sleep(0.01)
+        for i in range(3):
+            handler.handle(make_record(f"Message {i}"))
+        handler.flush(timeout=5)
+        stats = handler.get_stats()
+    finally:
+        handler.close()
+        server.shutdown()
+        server.server_close()
+
+    lines = [json.loads(line) for data in server.received for line in data.splitlines()]
+    assert [line["message"] for line in lines] == ["first", "Message 0", "Message 1", "Message 2"]
+    (connection,) = stats["connections"].values()
+    assert connection["connects"] == 2
+    assert connection["records_sent"] == 4
+    assert stats["records_dropped"] == 0
+
+
+def test_socket_stream_handler_unix_length_framing(tmp_path) -> None:
+    path = str(tmp_path / "agent.sock")
+    server = UnixStreamStubServer(path)
+    serve(server)
+    handler = make_socket_handler(f"unix://{path}", framing="length")
+    try:
+        for i in range(5):
+            handler.handle(make_record(f"Message {i}\nwith a newline"))
+        handler.flush(timeout=5)
+    finally:
+        handler.close()
+        server.shutdown()
+        server.server_close()
+
+    records = parse_length_frames(b"".join(server.received))
+    assert [record["message"] for record in records] == [f"Message {i}\nwith a newline" for i in range(5)]
+
+
+def test_socket_stream_handler_unavailable(tmp_path) -> None:
+    handler = make_socket_handler(f"unix://{tmp_path / 'missing.sock'}")
+    handler.max_retries = 1
+    try:
+        started = time.monotonic()
+        handler.handle(make_record("lost"))
+        assert time.monotonic() - started < 0.1
+        handler.flush(timeout=5)
+        stats = handler.get_stats()
+    finally:
+        handler.close()
+
+    assert stats["records_dropped"] == 1
+    (connection,) = stats["connections"].values()
+    assert connection["errors"] == 2
+    assert connection["connected"] is False
+
+
+def test_batching_handler_shutdown_is_bounded() -> None:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+    handler = make_socket_handler(f"tcp://127.0.0.1:{port}")
+    handler.max_retries = 3
+    handler.backoff = 0.5
+    for i in range(8):
+        handler.handle(make_record(f"Message {i}"))
+    started = time.monotonic()
+    handler.flush()
+    handler.close()
+    assert time.monotonic() - started < 1
+    assert handler.get_stats()["records_sent"] == 0
+
+
+@pytest.mark.skipif(resource.getrlimit(resource.RLIMIT_NOFILE)[0] <= 2000, reason="Not enough file descriptors")
+def test_socket_connection_high_fd() -> None:
+    local, peer = socket.socketpair()
+    os.dup2(local.fileno(), 2000)
+    local.close()
+    connection = SocketConnection(socket.AF_UNIX, "unused", timeout=5)
+    connection.sock = socket.socket(fileno=2000)
+    try:
+        connection.send(b"record\n", records=1)
+        assert peer.recv(64) == b"record\n"
+        assert connection._is_alive() is True
+        peer.close()
+        assert connection._is_alive() is False
+    finally:
+        connection.close()
+        peer.close()
+
+
+def test_iter_chunks() -> None:
+    payload = memoryview(b"aaa\nbb\ncccccccc\nd\n")
+    assert [bytes(chunk) for chunk in iter_chunks(payload, 8)] == [b"aaa\nbb\n", b"cccccccc\n", b"d\n"]
+
+
+def test_iter_chunks_long_line() -> None:
+    payload = memoryview(b"a\n" + b"b" * 20 + b"\nc\n" + b"d" * 10)
+    assert [bytes(chunk) for chunk in iter_chunks(payload, 8)] == [b"a\n", b"b" * 20 + b"\n", b"c\n", b"d" * 10]
+
+
+def test_buffered_stdout_handler() -> None:
+    read_fd, write_fd = os.pipe()
+    handler = BufferedStdoutHandler(fd=write_fd, max_batch_records=100, flush_interval=0.05)
+    handler.setFormatter(JSONLogFormatter())
+    try:
+        for i in range(50):
+            handler.handle(make_record(f"Message {i}"))
+        handler.flush(timeout=5)
+        stats = handler.get_stats()
+        output = os.read(read_fd, 1 << 20)
+    finally:
+        handler.close()
+        os.close(read_fd)
+        os.close(write_fd)
+
+    assert handler.is_pipe
+    assert [json.loads(line)["message"] for line in output.splitlines()] == [f"Message {i}" for i in range(50)]
+    assert stats["records_sent"] == 50
+    assert stats["writes"] < 50
+
+
+def test_buffered_stdout_handler_full_pipe() -> None:
+    read_fd, write_fd = os.pipe()
+    os.set_blocking(write_fd, False)
+    try:
+        while True:
+            os.write(write_fd, b"x" * 4096)
+    except BlockingIOError:
+        pass
+    os.set_blocking(write_fd, True)
+    handler = BufferedStdoutHandler(fd=write_fd, max_batch_records=2, flush_interval=0.05, write_timeout=0.05)
+    handler.setFormatter(JSONLogFormatter())
+    try:
+        started = time.monotonic()
+        for i in range(4):
+            handler.handle(make_record(f"Message {i}"))
+        assert time.monotonic() - started < 0.1
+        handler.flush(timeout=5)
+        stats = handler.get_stats()
+    finally:
+        handler.close()
+        os.close(read_fd)
+        os.close(write_fd)
+
+    assert stats["records_dropped"] == 4
+    assert stats["stalls"] == 2
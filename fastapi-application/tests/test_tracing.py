@@ -0,0 +1,110 @@
+import asyncio
+from contextvars import Token
+from typing import Any
+
+from utils.json_logger.tracing import (
+    RequestTrace,
+    end_request_trace,
+    get_request_trace,
+    span,
+    start_request_trace,
+)
+
+
+def end_trace(token: Token[RequestTrace | None]) -> dict[str, Any]:
+    trace = end_request_trace(token)
+    assert trace is not None
+    return trace.to_dict()
+
+
+@span("decorated")
+def decorated() -> int:
+    with span("inner"):
+        return 1
+
+
+@span("decorated_async")
+async def decorated_async() -> int:
+    async with span("inner_async"):
+        await asyncio.sleep(0)
+    return 2
+
+
+def test_spans_without_trace() -> None:
+    assert get_request_trace() is None
+    with span("noop"):
+        pass
+    assert decorated() == 1
+    assert asyncio.run(decorated_async()) == 2
+
+
+def test_nested_spans() -> None:
+    async def handle() -> dict[str, Any]:
+        token = start_request_trace()
+        with span("outer"):
+            assert decorated() == 1
+            assert await decorated_async() == 2
+        return end_trace(token)
+
+    spans = asyncio.run(handle())["spans"]
+    assert [(item["name"], item.get("parent")) for item in spans] == [
+        ("outer", None),
+        ("decorated", 0),
+        ("inner", 1),
+        ("decorated_async", 0),
+        ("inner_async", 3),
+    ]
+    assert all(item["duration_us"] >= 0 for item in spans)
+    assert spans[0]["duration_us"] >= spans[1]["duration_us"]
+
+
+def test_concurrent_spans() -> None:
+    async def child(name: str) -> None:
+        with span(name):
+            await asyncio.sleep(0)
+            with span(f"{name}.inner"):
+                await asyncio.sleep(0)
+
+    async def handle() -> dict[str, Any]:
+        token = start_request_trace()
+        with span("gather"):
+            await asyncio.gather(child("a"), child("b"))
+        return end_trace(token)
+
+    spans = asyncio.run(handle())["spans"]
+    names = [item["name"] for item in spans]
+    parents = {item["name"]: names[item["parent"]] for item in spans if "parent" in item}
+    assert parents == {"a": "gather", "b": "gather", "a.inner": "a", "b.inner": "b"}
+
+
+def test_reused_span() -> None:
+    db_span = span("db")
+
+    async def query() -> None:
+        async with db_span:
+            await asyncio.sleep(0)
+
+    async def handle() -> dict[str, Any]:
+        token = start_request_trace()
+        with db_span:
+            with db_span:
+                pass
+            await asyncio.gather(query(), query())
+        return end_trace(token)
+
+    spans = asyncio.run(handle())["spans"]
+    assert [(item["name"], item.get("parent")) for item in spans] == [("db", None), ("db", 0), ("db", 0), ("db", 0)]
+    assert all(item["duration_us"] is not None for item in spans)
+
+
+def test_span_limit() -> None:
+    token = start_request_trace()
+    trace = get_request_trace()
+    assert trace is not None
+    trace.max_spans = 3
+    for _ in range(5):
+        with span("loop"):
+            pass
+    fields = end_trace(token)
+    assert len(fields["spans"]) == 3
+    assert fields["spans_dropped"] == 2
@@ -0,0 +1,180 @@
+"""
+Command line tools for the JSONL log files.
+Run from the fastapi-application directory:
+    python -m tools.cli index
+    python -m tools.cli query --status 5xx --since 2025-05-30T16:00:00+03:00
+    python -m tools.cli analyze --workers 4
+    python -m tools.cli merge --follow
+"""
+
+import argparse
+import json
+import sys
+from collections.abc import Sequence
+from datetime import datetime
+from pathlib import Path
+
+from core.config import settings
+from tools.log_analytics import (
+    analyze,
+    format_report,
+)
+from tools.log_index import (
+    LogIndex,
+    find_log_files,
+    parse_timestamp,
+    prune_indexes,
+)
+from tools.log_merge import (
+    find_shards,
+    follow_shards,
+    merge_shards,
+)
+
+INDEX_DIR_NAME = ".index"
+
+
+def get_log_files(args: argparse.Namespace) -> list[Path]:
+    if args.files:
+        return [Path(path) for path in args.files]
+    return find_log_files(args.log_dir)
+
+
+def get_index_dir(args: argparse.Namespace) -> Path:
+    index_dir: Path | None = args.index_dir
+    return index_dir or args.log_dir / INDEX_DIR_NAME
+
+
+def update_indexes(log_files: Sequence[Path], index_dir: Path) -> list[LogIndex]:
+    indexes = []
+    for path in log_files:
+        index = LogIndex(log_path=path, index_dir=index_dir)
+        index.update()
+        indexes.append(index)
+
+    return indexes
+
+
+def run_index(args: argparse.Namespace) -> int:
+    log_files = get_log_files(args)
+    index_dir = get_index_dir(args)
+    for path in log_files:
+        index = LogIndex(log_path=path, index_dir=index_dir)
+        added = index.update()
+        print(f"{path}: {index.lines} lines, {added} new", file=sys.stderr)
+    removed = prune_indexes(index_dir=index_dir, log_files=find_log_files(args.log_dir))
+    if removed:
+        print(f"Removed {removed} stale indexes", file=sys.stderr)
+
+    return 0
+
+
+def run_query(args: argparse.Namespace) -> int:
+    since = None if args.since is None else args.since.timestamp()
+    until = None if args.until is None else args.until.timestamp()
+    output = sys.stdout.buffer
+    found = 0
+    for index in update_indexes(get_log_files(args), get_index_dir(args)):
+        line_numbers = index.match(
+            since=since,
+            until=until,
+            levels=args.level,
+            path=args.path,
+            path_prefix=args.path_prefix,
+            status=args.status,
+        )
+        for line in index.read_lines(line_numbers):
+            if since is not None or until is not None:
+                timestamp = parse_timestamp(json.loads(line).get("timestamp"))
+                if timestamp is None or (since is not None and timestamp < since):
+                    continue
+                if until is not None and timestamp > until:
+                    continue
+            output.write(line + b"\n")
+            found += 1
+            if args.limit and found >= args.limit:
+                return 0
+
+    return 0
+
+
+def run_analyze(args: argparse.Namespace) -> int:
+    summary = analyze(get_log_files(args), workers=args.workers, max_routes=args.max_routes, source=args.source)
+    if args.json:
+        report = [{"method": method, "route": route} | stats.to_dict() for (method, route), stats in summary.items()]
+        print(json.dumps(report, indent=2))
+    else:
+        print(format_report(summary))
+
+    return 0
+
+
+def run_merge(args: argparse.Namespace) -> int:
+    output = sys.stdout.buffer
+    if args.follow:
+        lines = follow_shards(args.log_dir, name=args.name, poll_interval=args.poll_interval, lag=args.lag)
+    else:
+        lines = merge_shards(find_shards(args.log_dir, name=args.name).values())
+    try:
+        for line in lines:
+            output.write(line + b"\n")
+            if args.follow:
+                output.flush()
+    except KeyboardInterrupt:
+        pass
+
+    return 0
+
+
+def get_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="python -m tools.cli", description=__doc__.splitlines()[1])
+    parser.add_argument("--log-dir", type=Path, default=settings.log_cfg.log_dir)
+    parser.add_argument("--index-dir", type=Path, default=None, help="By default <log-dir>/.index")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    index_parser = subparsers.add_parser("index", help="Build or update the sidecar indexes")
+    index_parser.add_argument("files", nargs="*", help="By default all the *.jsonl* files of the log directory")
+    index_parser.set_defaults(func=run_index)
+
+    query_parser = subparsers.add_parser("query", help="Print the matching log lines")
+    query_parser.add_argument("files", nargs="*", help="By default all the *.jsonl* files of the log directory")
+    query_parser.add_argument("--since", type=datetime.fromisoformat)
+    query_parser.add_argument("--until", type=datetime.fromisoformat)
+    query_parser.add_argument("--level", action="append", default=[], help="Level name, may be repeated")
+    query_parser.add_argument("--path", help="Request path")
+    query_parser.add_argument("--path-prefix", help="Prefix of the request path")
+    query_parser.add_argument("--status", help="Response status code or class, e.g. 404 or 5xx")
+    query_parser.add_argument("--limit", type=int, default=0)
+    query_parser.set_defaults(func=run_query)
+
+    analyze_parser = subparsers.add_parser("analyze", help="Per-route latency, error rate and payload size report")
+    analyze_parser.add_argument("files", nargs="*", help="By default all the *.jsonl* files of the log directory")
+    analyze_parser.add_argument("--workers", type=int, default=0, help="Number of processes, 0 disables the pool")
+    analyze_parser.add_argument("--max-routes", type=int, default=1000)
+    analyze_parser.add_argument(
+        "--source",
+        choices=("auto", "requests", "summaries"),
+        default="auto",
+        help="Records the requests are counted from, auto prefers the route summaries of the workers that emit them",
+    )
+    analyze_parser.add_argument("--json", action="store_true", help="Print the report as JSON")
+    analyze_parser.set_defaults(func=run_analyze)
+
+    merge_parser = subparsers.add_parser("merge", help="Print the lines of the sharded log files ordered by timestamp")
+    merge_parser.add_argument("--name", default="info_log", help="Log name, e.g. info_log or error_log")
+    merge_parser.add_argument("--follow", action="store_true", help="Keep printing the new lines")
+    merge_parser.add_argument("--poll-interval", type=float, default=0.5, help="Seconds between polls with --follow")
+    merge_parser.add_argument("--lag", type=float, default=1.0, help="Seconds new lines are held back for ordering")
+    merge_parser.set_defaults(func=run_merge)
+
+    return parser
+
+
+def main(argv: Sequence[str] | None = None) -> int:
+    args = get_parser().parse_args(argv)
+    exit_code: int = args.func(args)
+    return exit_code
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,309 @@
+"""
+This module contains the streaming latency analytics of the JSONL log files.
+
+Each file is streamed through a generator pipeline:
+    read_lines -> parse_entries -> get_samples -> summarize
+and the per-route statistics of the files are merged, so memory use depends
+only on the number of routes, which is capped by max_routes.
+The route summary records emitted by the workers are merged in the same way.
+A worker that emits route summaries counts all its requests in them, so its
+request records are only used if it emitted none and no request is counted twice.
+"""
+
+import json
+from collections.abc import (
+    Iterable,
+    Iterator,
+    Sequence,
+)
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import (
+    Any,
+    Literal,
+    NamedTuple,
+)
+
+from tools.log_index import open_log
+from utils.json_logger.histogram import LogLinearHistogram
+
+OTHER_ROUTES = "(other)"
+QUANTILES = (0.5, 0.95, 0.99)
+
+Source = Literal["auto", "requests", "summaries"]
+
+
+class Sample(NamedTuple):
+    worker: int
+    method: str
+    route: str
+    duration: int
+    status: int
+    request_size: int
+    response_size: int
+
+
+class RouteStats:
+    """
+    Mergeable statistics of a single route.
+    """
+
+    __slots__ = (
+        "count",
+        "client_errors",
+        "server_errors",
+        "latency",
+        "request_size",
+        "response_size",
+    )
+
+    def __init__(self) -> None:
+        self.count = 0
+        self.client_errors = 0
+        self.server_errors = 0
+        self.latency = LogLinearHistogram()
+        self.request_size = LogLinearHistogram()
+        self.response_size = LogLinearHistogram()
+
+    def add(self, sample: Sample) -> None:
+        self.count += 1
+        if 400 <= sample.status < 500:
+            self.client_errors += 1
+        elif sample.status >= 500:
+            self.server_errors += 1
+        self.latency.record(sample.duration)
+        self.request_size.record(sample.request_size)
+        self.response_size.record(sample.response_size)
+
+    def merge(self, other: "RouteStats") -> None:
+        self.count += other.count
+        self.client_errors += other.client_errors
+        self.server_errors += other.server_errors
+        self.latency.merge(other.latency)
+        self.request_size.merge(other.request_size)
+        self.response_size.merge(other.response_size)
+
+    def to_dict(self) -> dict[str, Any]:
+        return {
+            "count": self.count,
+            "error_rate": (self.client_errors + self.server_errors) / self.count if self.count else 0.0,
+            "server_error_rate": self.server_errors / self.count if self.count else 0.0,
+            "latency_ms": {f"p{round(q * 100)}": self.latency.quantile(q) for q in QUANTILES},
+            "request_size": {f"p{round(q * 100)}": self.request_size.quantile(q) for q in QUANTILES},
+            "response_size": {f"p{round(q * 100)}": self.response_size.quantile(q) for q in QUANTILES},
+        }
+
+
+class RouteSummary(NamedTuple):
+    worker: int
+    method: str
+    route: str
+    stats: RouteStats
+
+
+RouteKey = tuple[str, str]
+Summary = dict[RouteKey, RouteStats]
+
+
+class SourceSummaries(NamedTuple):
+    """
+    Statistics of the route summary records and of the request records by worker.
+    """
+
+    summaries: Summary
+    requests: dict[int, Summary]
+    workers: set[int]
+
+
+def get_worker(entry: dict[str, Any]) -> int:
+    """
+    Returns:
+            Process id of the worker that wrote the record, 0 if it is unknown.
+    """
+    worker = entry.get("thread")
+    return worker if isinstance(worker, int) else 0
+
+
+def get_summary_stats(route: dict[str, Any]) -> RouteStats:
+    stats = RouteStats()
+    stats.count = route["count"]
+    if route["status_class"] == "4xx":
+        stats.client_errors = stats.count
+    elif route["status_class"] >= "5xx":
+        stats.server_errors = stats.count
+    stats.latency = LogLinearHistogram.from_dict(route["latency_ms"])
+    return stats
+
+
+def read_lines(path: Path) -> Iterator[bytes]:
+    with open_log(path) as log_file:
+        yield from log_file
+
+
+def parse_entries(lines: Iterable[bytes]) -> Iterator[dict[str, Any]]:
+    for line in lines:
+        try:
+            entry = json.loads(line)
+        except ValueError:
+            continue
+        if isinstance(entry, dict):
+            yield entry
+
+
+def get_samples(entries: Iterable[dict[str, Any]]) -> Iterator[Sample | RouteSummary]:
+    """
+    Yields the samples of the request records and the aggregated statistics
+    of the route summary records, other records are skipped.
+    Requests are grouped by the route template, by the path for the older records.
+    """
+    for entry in entries:
+        route_summary = entry.get("route_summary")
+        if isinstance(route_summary, dict):
+            for route in route_summary.get("routes", ()):
+                try:
+                    yield RouteSummary(
+                        worker=get_worker(entry),
+                        method=route["method"],
+                        route=route["route"],
+                        stats=get_summary_stats(route),
+                    )
+                except (KeyError, TypeError, ValueError):
+                    continue
+            continue
+        request = entry.get("request")
+        response = entry.get("response")
+        if not isinstance(request, dict) or not isinstance(response, dict):
+            continue
+        try:
+            yield Sample(
+                worker=get_worker(entry),
+                method=str(request.get("request_method", "")),
+                route=str(request.get("request_route") or request.get("request_path", "")),
+                duration=int(entry.get("duration") or 0),
+                status=int(response.get("response_status_code") or 0),
+                request_size=int(request.get("request_size") or 0),
+                response_size=int(response.get("response_size") or 0),
+            )
+        except (TypeError, ValueError):
+            continue
+
+
+def get_route_stats(summary: Summary, method: str, route: str, max_routes: int) -> RouteStats:
+    """
+    Returns:
+            Statistics of the route, routes beyond max_routes share the statistics of OTHER_ROUTES.
+    """
+    key = (method, route)
+    stats = summary.get(key)
+    if stats is None:
+        if len(summary) >= max_routes:
+            key = (method, OTHER_ROUTES)
+            stats = summary.get(key)
+        if stats is None:
+            stats = summary[key] = RouteStats()
+
+    return stats
+
+
+def summarize(samples: Iterable[Sample | RouteSummary], max_routes: int) -> SourceSummaries:
+    """
+    Aggregates the samples by method and route, separately for the route summaries
+    and for the requests of each worker. Routes beyond max_routes are aggregated together.
+    """
+    sources = SourceSummaries(summaries={}, requests={}, workers=set())
+    for sample in samples:
+        if isinstance(sample, RouteSummary):
+            sources.workers.add(sample.worker)
+            get_route_stats(sources.summaries, sample.method, sample.route, max_routes).merge(sample.stats)
+        else:
+            summary = sources.requests.setdefault(sample.worker, {})
+            get_route_stats(summary, sample.method, sample.route, max_routes).add(sample)
+
+    return sources
+
+
+def summarize_file(path: Path, max_routes: int) -> SourceSummaries:
+    return summarize(get_samples(parse_entries(read_lines(path))), max_routes=max_routes)
+
+
+def merge_summary(merged: Summary, summary: Summary, max_routes: int) -> None:
+    for key, stats in summary.items():
+        if key not in merged and len(merged) >= max_routes:
+            key = (key[0], OTHER_ROUTES)
+        if key in merged:
+            merged[key].merge(stats)
+        else:
+            merged[key] = stats
+
+
+def merge_sources(sources: Iterable[SourceSummaries], max_routes: int, source: Source = "auto") -> Summary:
+    """
+    Merges the statistics of the files taking the requests of each worker from a single source.
+    Args:
+        sources: Statistics of the files.
+        max_routes: Maximum number of routes.
+        source: auto takes the route summaries of a worker if there are any and its request records otherwise,
+                requests and summaries take only the request records or only the route summaries.
+
+    Returns:
+            Statistics by method and route.
+    """
+    summaries: Summary = {}
+    requests: dict[int, Summary] = {}
+    workers: set[int] = set()
+    for item in sources:
+        merge_summary(summaries, item.summaries, max_routes)
+        for worker, summary in item.requests.items():
+            merge_summary(requests.setdefault(worker, {}), summary, max_routes)
+        workers |= item.workers
+    if source == "summaries":
+        return summaries
+
+    merged = summaries if source == "auto" else {}
+    for worker, summary in requests.items():
+        if source == "requests" or worker not in workers:
+            merge_summary(merged, summary, max_routes)
+
+    return merged
+
+
+def analyze(paths: Sequence[Path], workers: int = 0, max_routes: int = 1000, source: Source = "auto") -> Summary:
+    """
+    Computes the per-route statistics of the log files.
+    Args:
+        paths: Log files, plain or gzip-compressed.
+        workers: Number of processes, the files are summarized sequentially if it is 0.
+        max_routes: Maximum number of routes.
+        source: Records the requests are counted from, see merge_sources.
+
+    Returns:
+            Statistics by method and route.
+    """
+    if workers > 0 and len(paths) > 1:
+        with ProcessPoolExecutor(max_workers=min(workers, len(paths))) as pool:
+            sources = pool.map(summarize_file, paths, [max_routes] * len(paths))
+            return merge_sources(sources, max_routes=max_routes, source=source)
+
+    return merge_sources((summarize_file(path, max_routes) for path in paths), max_routes=max_routes, source=source)
+
+
+def format_report(summary: Summary) -> str:
+    def get_value(value: float | None) -> str:
+        return "-" if value is None else f"{value:.0f}"
+
+    header = (
+        f"{'METHOD':<7} {'ROUTE':<40} {'COUNT':>8} {'P50':>7} {'P95':>7} {'P99':>7} "
+        f"{'ERR%':>6} {'5XX%':>6} {'REQ P95':>9} {'RES P95':>9}"
+    )
+    rows = [header]
+    for (method, route), stats in sorted(summary.items(), key=lambda item: -item[1].count):
+        rows.append(
+            f"{method:<7} {route:<40} {stats.count:>8} "
+            f"{get_value(stats.latency.quantile(0.5)):>7} {get_value(stats.latency.quantile(0.95)):>7} "
+            f"{get_value(stats.latency.quantile(0.99)):>7} "
+            f"{(stats.client_errors + stats.server_errors) / stats.count:>6.1%} "
+            f"{stats.server_errors / stats.count:>6.1%} "
+            f"{get_value(stats.request_size.quantile(0.95)):>9} {get_value(stats.response_size.quantile(0.95)):>9}"
+        )
+
+    return "\n".join(rows)
@@ -0,0 +1,390 @@
+"""
+This module contains the sidecar index of the JSONL log files.
+
+The index of a file is stored in the index directory under the device and inode
+of the file, so it stays valid when the file is renamed by the log rotation.
+It consists of the start offsets of the lines (<dev>-<inode>.off), a file of posting
+lists of line numbers per field: minute, level, request path and response status
+(<dev>-<inode>.<field>), and the metadata (<dev>-<inode>.json).
+The offsets and the posting files are only appended to, every update appends one line
+with the postings of the new lines to each posting file. The metadata is rewritten last
+with the committed sizes of the files, so an update costs as much as the new lines.
+"""
+
+import gzip
+import hashlib
+import io
+import json
+import mmap
+import os
+from array import array
+from collections.abc import (
+    Iterable,
+    Iterator,
+)
+from datetime import datetime
+from pathlib import Path
+
+INDEX_VERSION = 2
+FINGERPRINT_BYTES = 256
+READ_CHUNK = 1048576
+POSTING_FIELDS = ("minute", "level", "path", "status")
+
+Postings = dict[str, list[int]]
+
+
+def is_compressed(path: Path) -> bool:
+    return path.suffix == ".gz"
+
+
+def open_log(path: Path) -> io.BufferedIOBase:
+    if is_compressed(path):
+        return gzip.open(path, "rb")
+    return open(path, "rb")
+
+
+def get_fingerprint(path: Path, size: int = FINGERPRINT_BYTES) -> str:
+    """
+    Hash of the first size bytes of the file, detects truncation and reuse of the inode.
+    """
+    with open_log(path) as log_file:
+        return hashlib.sha1(log_file.read(size)).hexdigest()
+
+
+def parse_timestamp(value: object) -> float | None:
+    if not isinstance(value, str):
+        return None
+    try:
+        return datetime.fromisoformat(value).timestamp()
+    except ValueError:
+        return None
+
+
+def get_index_keys(line: bytes) -> dict[str, str]:
+    """
+    Extracts the indexed fields of a log line.
+    Returns:
+            Posting field names mapped to the keys of the line.
+    """
+    try:
+        entry = json.loads(line)
+    except ValueError:
+        return {}
+    if not isinstance(entry, dict):
+        return {}
+
+    keys = {}
+    timestamp = parse_timestamp(entry.get("timestamp"))
+    if timestamp is not None:
+        keys["minute"] = str(int(timestamp // 60))
+    if "level_name" in entry:
+        keys["level"] = str(entry["level_name"]).lower()
+    request = entry.get("request")
+    if isinstance(request, dict) and "request_path" in request:
+        keys["path"] = str(request["request_path"])
+    response = entry.get("response")
+    if isinstance(response, dict) and "response_status_code" in response:
+        keys["status"] = str(response["response_status_code"])
+
+    return keys
+
+
+def iter_lines(log_file: io.BufferedIOBase, offset: int) -> Iterator[tuple[int, bytes]]:
+    """
+    Yields the complete lines of a file starting from the offset with their offsets.
+    An unterminated last line is left for the next update.
+    """
+    pending = b""
+    while chunk := log_file.read(READ_CHUNK):
+        lines = (pending + chunk).split(b"\n")
+        pending = lines.pop()
+        for line in lines:
+            yield offset, line
+            offset += len(line) + 1
+
+
+def read_file(path: Path, size: int) -> bytes:
+    with open(path, "rb") as in_f:
+        data = in_f.read(size)
+    if len(data) != size:
+        raise ValueError(f"Index file {path} is shorter than committed")
+    return data
+
+
+class LogIndex:
+    """
+    Index of a single log file, rotated files compressed with gzip are indexed
+    by the offsets of the uncompressed stream.
+    An update reads only the metadata of the index, the offsets and the postings
+    are read when the index is queried.
+    """
+
+    def __init__(self, log_path: Path, index_dir: Path) -> None:
+        self.log_path = log_path
+        stat = log_path.stat()
+        self.file_size = stat.st_size
+        self.index_dir = index_dir
+        self.index_id = f"{stat.st_dev}-{stat.st_ino}"
+        self.meta_path = index_dir / f"{self.index_id}.json"
+        self.offsets_path = index_dir / f"{self.index_id}.off"
+        self.fingerprint: str | None = None
+        self.fingerprint_size = 0
+        self.source_size = 0
+        self.size = 0
+        self.lines = 0
+        self.postings_sizes = dict.fromkeys(POSTING_FIELDS, 0)
+        self._offsets: array[int] | None = None
+        self._postings: dict[str, Postings] = {}
+
+    def get_postings_path(self, field: str) -> Path:
+        return self.index_dir / f"{self.index_id}.{field}"
+
+    @property
+    def offsets(self) -> array[int]:
+        if self._offsets is None:
+            self._offsets = array("Q", read_file(self.offsets_path, self.lines * 8) if self.lines else b"")
+        return self._offsets
+
+    def get_postings(self, field: str) -> Postings:
+        """
+        Returns:
+                Keys of the field mapped to the sorted line numbers, merged from the appended postings.
+        """
+        postings = self._postings.get(field)
+        if postings is None:
+            postings = self._postings[field] = {}
+            size = self.postings_sizes[field]
+            data = read_file(self.get_postings_path(field), size) if size else b""
+            for chunk in data.splitlines():
+                for key, line_numbers in json.loads(chunk).items():
+                    postings.setdefault(key, []).extend(line_numbers)
+
+        return postings
+
+    def load(self) -> bool:
+        """
+        Loads the metadata, the index files are truncated to their committed sizes
+        if an interrupted update appended to them.
+        """
+        try:
+            meta = json.loads(self.meta_path.read_text())
+        except (OSError, ValueError):
+            return False
+        if meta.get("version") != INDEX_VERSION:
+            return False
+
+        sizes = {self.offsets_path: meta["lines"] * 8}
+        sizes.update({self.get_postings_path(field): meta["postings_sizes"][field] for field in POSTING_FIELDS})
+        try:
+            for path, size in sizes.items():
+                if path.stat().st_size < size:
+                    return False
+                if path.stat().st_size > size:
+                    os.truncate(path, size)
+        except OSError:
+            return False
+
+        self.fingerprint = meta["fingerprint"]
+        self.fingerprint_size = meta["fingerprint_size"]
+        self.source_size = meta["source_size"]
+        self.size = meta["size"]
+        self.lines = meta["lines"]
+        self.postings_sizes = meta["postings_sizes"]
+        self._offsets = None
+        self._postings = {}
+        return True
+
+    def update(self) -> int:
+        """
+        Indexes the lines appended since the last update,
+        the index is rebuilt if the file was truncated or replaced.
+        Returns:
+                Number of newly indexed lines.
+        """
+        if (
+            not self.load()
+            or self.file_size < self.source_size
+            or get_fingerprint(self.log_path, self.fingerprint_size) != self.fingerprint
+        ):
+            self.reset()
+        elif self.file_size == self.source_size:
+            return 0
+        elif is_compressed(self.log_path):
+            self.reset()
+
+        start = self.lines
+        offsets = array("Q")
+        postings: dict[str, Postings] = {field: {} for field in POSTING_FIELDS}
+        with open_log(self.log_path) as log_file:
+            log_file.seek(self.size)
+            for offset, line in iter_lines(log_file, self.size):
+                for field, key in get_index_keys(line).items():
+                    postings[field].setdefault(key, []).append(start + len(offsets))
+                offsets.append(offset)
+                self.size = offset + len(line) + 1
+        self.source_size = self.file_size if is_compressed(self.log_path) else self.size
+        if self.fingerprint_size < FINGERPRINT_BYTES:
+            self.fingerprint_size = min(FINGERPRINT_BYTES, self.size)
+            self.fingerprint = get_fingerprint(self.log_path, self.fingerprint_size)
+        self.save(offsets, postings)
+
+        return len(offsets)
+
+    def reset(self) -> None:
+        self.fingerprint = get_fingerprint(self.log_path, 0)
+        self.fingerprint_size = 0
+        self.source_size = 0
+        self.size = 0
+        self.lines = 0
+        self.postings_sizes = dict.fromkeys(POSTING_FIELDS, 0)
+        self._offsets = None
+        self._postings = {}
+        self.offsets_path.unlink(missing_ok=True)
+        for field in POSTING_FIELDS:
+            self.get_postings_path(field).unlink(missing_ok=True)
+
+    def save(self, offsets: array[int], postings: dict[str, Postings]) -> None:
+        """
+        Appends the offsets and the postings of the new lines and commits them in the metadata.
+        """
+        self.index_dir.mkdir(parents=True, exist_ok=True)
+        with open(self.offsets_path, "ab") as offsets_file:
+            offsets.tofile(offsets_file)
+        for field, field_postings in postings.items():
+            with open(self.get_postings_path(field), "ab") as postings_file:
+                if field_postings:
+                    self.postings_sizes[field] += postings_file.write(
+                        json.dumps(field_postings, separators=(",", ":")).encode() + b"\n"
+                    )
+        if self._offsets is not None:
+            self._offsets.extend(offsets)
+        for field, field_postings in self._postings.items():
+            for key, line_numbers in postings[field].items():
+                field_postings.setdefault(key, []).extend(line_numbers)
+        self.lines += len(offsets)
+
+        meta = {
+            "version": INDEX_VERSION,
+            "log_path": str(self.log_path),
+            "fingerprint": self.fingerprint,
+            "fingerprint_size": self.fingerprint_size,
+            "source_size": self.source_size,
+            "size": self.size,
+            "lines": self.lines,
+            "postings_sizes": self.postings_sizes,
+        }
+        tmp_path = self.meta_path.with_suffix(".tmp")
+        tmp_path.write_text(json.dumps(meta, separators=(",", ":")))
+        os.replace(tmp_path, self.meta_path)
+
+    def match(
+        self,
+        since: float | None = None,
+        until: float | None = None,
+        levels: Iterable[str] = (),
+        path: str | None = None,
+        path_prefix: str | None = None,
+        status: str | None = None,
+    ) -> list[int]:
+        """
+        Finds the lines matching all the conditions using the posting lists.
+        The time window is matched by minute, the exact bounds are checked by the caller.
+        Args:
+            since: Start of the time window, unix time.
+            until: End of the time window, unix time.
+            levels: Level names.
+            path: Request path.
+            path_prefix: Prefix of the request path.
+            status: Response status code or a status class like 5xx.
+
+        Returns:
+                Sorted line numbers.
+        """
+        candidates: set[int] | None = None
+
+        def restrict(field: str, keys: Iterable[str]) -> None:
+            nonlocal candidates
+            lines: set[int] = set()
+            postings = self.get_postings(field)
+            for key in keys:
+                lines.update(postings.get(key, ()))
+            candidates = lines if candidates is None else candidates & lines
+
+        if since is not None or until is not None:
+            first = -1 if since is None else int(since // 60)
+            last = float("inf") if until is None else int(until // 60)
+            restrict("minute", [key for key in self.get_postings("minute") if first <= int(key) <= last])
+        if levels:
+            restrict("level", [level.lower() for level in levels])
+        if path is not None:
+            restrict("path", [path])
+        if path_prefix is not None:
+            restrict("path", [key for key in self.get_postings("path") if key.startswith(path_prefix)])
+        if status is not None:
+            if status.lower().endswith("xx"):
+                restrict("status", [key for key in self.get_postings("status") if key[:1] == status[:1]])
+            else:
+                restrict("status", [status])
+
+        if candidates is None:
+            return list(range(self.lines))
+        return sorted(candidates)
+
+    def read_lines(self, line_numbers: list[int]) -> Iterator[bytes]:
+        """
+        Reads the lines by number, plain files are memory-mapped and
+        compressed ones are decompressed sequentially up to the last match.
+        """
+        if not line_numbers:
+            return
+        if is_compressed(self.log_path):
+            yield from self._read_compressed_lines(line_numbers)
+            return
+
+        with open(self.log_path, "rb") as log_file, mmap.mmap(log_file.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            for line_number in line_numbers:
+                start, end = self._get_line_bounds(line_number)
+                yield data[start:end]
+
+    def _get_line_bounds(self, line_number: int) -> tuple[int, int]:
+        start = self.offsets[line_number]
+        end = self.offsets[line_number + 1] - 1 if line_number + 1 < self.lines else self.size - 1
+        return start, end
+
+    def _read_compressed_lines(self, line_numbers: list[int]) -> Iterator[bytes]:
+        with gzip.open(self.log_path, "rb") as log_file:
+            for line_number in line_numbers:
+                start, end = self._get_line_bounds(line_number)
+                log_file.seek(start)
+                yield log_file.read(end - start)
+
+
+def find_log_files(log_dir: Path, pattern: str = "*.jsonl*") -> list[Path]:
+    """
+    Returns:
+            Log files ordered from the oldest to the newest.
+    """
+    files = [path for path in log_dir.glob(pattern) if path.is_file()]
+    return sorted(files, key=lambda path: path.stat().st_mtime)
+
+
+def prune_indexes(index_dir: Path, log_files: Iterable[Path]) -> int:
+    """
+    Removes the indexes of the files that no longer exist.
+    Returns:
+            Number of removed indexes.
+    """
+    if not index_dir.is_dir():
+        return 0
+    live = set()
+    for path in log_files:
+        stat = path.stat()
+        live.add(f"{stat.st_dev}-{stat.st_ino}")
+    removed = 0
+    for meta_path in index_dir.glob("*.json"):
+        if meta_path.stem not in live:
+            for path in index_dir.glob(f"{meta_path.stem}.*"):
+                path.unlink(missing_ok=True)
+            removed += 1
+
+    return removed
@@ -0,0 +1,196 @@
+"""
+This module contains the ordered merge of the sharded JSONL log files.
+
+Every process writes its own shard (info_log.<pid>.jsonl) with its own rotated
+generations (info_log.<pid>.jsonl.1, ...). The lines of a shard are read from
+the oldest generation to the current file, and the shards are merged by
+the timestamp of their lines with a streaming k-way merge.
+"""
+
+import heapq
+import itertools
+import os
+import re
+import time
+from collections.abc import (
+    Iterable,
+    Iterator,
+    Sequence,
+)
+from operator import itemgetter
+from pathlib import Path
+from typing import BinaryIO
+
+from tools.log_index import (
+    open_log,
+    parse_timestamp,
+)
+
+LOG_SUFFIX = ".jsonl"
+TIMESTAMP_PATTERN = re.compile(rb'"timestamp":\s*"([^"]*)"')
+
+TimedLine = tuple[float, bytes]
+
+
+def get_line_timestamp(line: bytes) -> float | None:
+    match = TIMESTAMP_PATTERN.search(line)
+    if match is None:
+        return None
+    return parse_timestamp(match.group(1).decode())
+
+
+def parse_log_name(path: Path) -> tuple[str, int] | None:
+    """
+    Returns:
+            Shard name and rotation generation of a log file, 0 for the current file,
+            e.g. info_log.1234.jsonl.2 -> ("info_log.1234", 2), or None for other files.
+    """
+    name = path.name.removesuffix(".gz")
+    shard, separator, generation = name.partition(LOG_SUFFIX)
+    if not separator:
+        return None
+    if not generation:
+        return shard, 0
+    generation = generation.removeprefix(".")
+    return (shard, int(generation)) if generation.isdigit() else None
+
+
+def find_shards(log_dir: Path, name: str = "info_log") -> dict[str, list[Path]]:
+    """
+    Finds the shards of a log, including the unsharded file.
+    Returns:
+            Shard names mapped to their files ordered from the oldest generation to the current file.
+    """
+    shards: dict[str, list[tuple[int, Path]]] = {}
+    for path in log_dir.glob(f"{name}*{LOG_SUFFIX}*"):
+        parsed = parse_log_name(path)
+        if parsed is None or not path.is_file():
+            continue
+        shard, generation = parsed
+        if shard != name and not (shard.startswith(f"{name}.") and shard[len(name) + 1 :].isdigit()):
+            continue
+        shards.setdefault(shard, []).append((generation, path))
+
+    return {shard: [path for _, path in sorted(files, reverse=True)] for shard, files in sorted(shards.items())}
+
+
+def iter_shard(paths: Iterable[Path]) -> Iterator[TimedLine]:
+    """
+    Yields the lines of the files of a shard with their timestamps,
+    a line without a timestamp gets the timestamp of the previous line.
+    """
+    timestamp = 0.0
+    for path in paths:
+        with open_log(path) as log_file:
+            for line in log_file:
+                line = line.rstrip(b"\n")
+                if not line:
+                    continue
+                timestamp = get_line_timestamp(line) or timestamp
+                yield timestamp, line
+
+
+def merge_shards(shards: Iterable[Sequence[Path]]) -> Iterator[bytes]:
+    """
+    Streams the lines of the shards ordered by timestamp, keeping one line per shard in memory.
+    """
+    for _, line in heapq.merge(*(iter_shard(paths) for paths in shards), key=itemgetter(0)):
+        yield line
+
+
+class ShardTail:
+    """
+    Follows the current file of a shard across rotations.
+    """
+
+    def __init__(self, path: Path, from_end: bool = False) -> None:
+        self.path = path
+        self.from_end = from_end
+        self.file: BinaryIO | None = None
+        self.inode: int | None = None
+        self.pending = b""
+        self.timestamp = 0.0
+
+    def read_lines(self) -> list[TimedLine]:
+        """
+        Returns:
+                Complete lines appended since the previous call. The rest of a rotated file
+                is read before switching to the new one.
+        """
+        if self.file is None and not self._open():
+            return []
+        lines = self._read_available()
+        try:
+            inode = os.stat(self.path).st_ino
+        except FileNotFoundError:
+            return lines
+        if inode != self.inode:
+            self.close()
+            self.from_end = False
+            if self._open():
+                lines.extend(self._read_available())
+
+        return lines
+
+    def close(self) -> None:
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+        self.pending = b""
+
+    def _open(self) -> bool:
+        try:
+            self.file = open(self.path, "rb")
+        except FileNotFoundError:
+            return False
+        self.inode = os.fstat(self.file.fileno()).st_ino
+        if self.from_end:
+            self.file.seek(0, os.SEEK_END)
+        return True
+
+    def _read_available(self) -> list[TimedLine]:
+        assert self.file is not None
+        data = self.pending + self.file.read()
+        chunks = data.split(b"\n")
+        self.pending = chunks.pop()
+        lines = []
+        for line in chunks:
+            if line:
+                self.timestamp = get_line_timestamp(line) or self.timestamp
+                lines.append((self.timestamp, line))
+
+        return lines
+
+
+def follow_shards(
+    log_dir: Path,
+    name: str = "info_log",
+    poll_interval: float = 0.5,
+    lag: float = 1.0,
+) -> Iterator[bytes]:
+    """
+    Tails the current files of all the shards, including the ones created later.
+    Args:
+        log_dir: Log file directory.
+        name: Log name, e.g. info_log.
+        poll_interval: Seconds between polls of the files.
+        lag: Lines are held back for this many seconds, so that the late lines
+             of a slower shard are still merged in order.
+    """
+    tails: dict[Path, ShardTail] = {}
+    pending: list[tuple[float, int, bytes]] = []
+    sequence = itertools.count()
+    from_end = True
+    while True:
+        for shard, files in find_shards(log_dir, name).items():
+            current = files[-1]
+            if current not in tails and parse_log_name(current) == (shard, 0):
+                tails[current] = ShardTail(current, from_end=from_end)
+        from_end = False
+        for tail in tails.values():
+            for timestamp, line in tail.read_lines():
+                heapq.heappush(pending, (timestamp, next(sequence), line))
+        watermark = time.time() - lag
+        while pending and pending[0][0] <= watermark:
+            yield heapq.heappop(pending)[2]
+        time.sleep(poll_interval)
@@ -0,0 +1,47 @@
+"""
+This module contains the encoding of request and response bodies for the logs.
+"""
+
+import base64
+from typing import Literal
+
+from core.config import settings
+
+BodyFallback = Literal["base64", "hex", "placeholder"]
+
+
+def encode_body(
+    body: bytes,
+    fallback: BodyFallback = settings.log_cfg.body_encoding.fallback,
+    preview_bytes: int = settings.log_cfg.body_encoding.preview_bytes,
+    max_base64_bytes: int = settings.log_cfg.body_encoding.max_base64_bytes,
+) -> str:
+    """
+    Converts a body to a string, never raises and never logs.
+    Args:
+        body: Raw body.
+        fallback: Representation of bodies that aren't valid UTF-8:
+                  base64 - the whole body encoded as base64,
+                  hex - hex preview of the first preview_bytes bytes,
+                  placeholder - only the size of the body.
+        preview_bytes: Size of the hex preview.
+        max_base64_bytes: Larger bodies are logged with the placeholder instead of base64.
+
+    Returns:
+            Decoded body or its representation.
+    """
+    if body.isascii():
+        return body.decode("ascii")
+    try:
+        return body.decode("utf-8")
+    except UnicodeDecodeError:
+        pass
+
+    size = len(body)
+    if fallback == "base64" and size <= max_base64_bytes:
+        return f"<base64 {size} bytes> {base64.b64encode(body).decode('ascii')}"
+    if fallback == "hex":
+        suffix = "..." if size > preview_bytes else ""
+        return f"<binary {size} bytes> {body[:preview_bytes].hex()}{suffix}"
+
+    return f"<binary {size} bytes>"
@@ -0,0 +1,111 @@
+"""
+This module contains the per-request buffer for records below the log level.
+"""
+
+import logging
+from collections import deque
+from contextvars import (
+    ContextVar,
+    Token,
+)
+from typing import Protocol
+
+from core.config import settings
+
+RECORD_OVERHEAD = 512
+ARG_OVERHEAD = 64
+
+_request_buffer: ContextVar["RequestLogBuffer | None"] = ContextVar("request_log_buffer", default=None)
+
+
+class BufferingHandler(Protocol):
+    def handle_buffered(self, record: logging.LogRecord) -> bool: ...
+
+
+def estimate_record_size(record: logging.LogRecord) -> int:
+    """
+    Cheap approximation of the memory held by a buffered record.
+    """
+    args = record.args or ()
+    return RECORD_OVERHEAD + len(str(record.msg)) + len(args) * ARG_OVERHEAD
+
+
+class RequestLogBuffer:
+    """
+    Ring buffer of the records emitted during a single request.
+    When one of the limits is exceeded the oldest records are discarded.
+    """
+
+    __slots__ = (
+        "max_records",
+        "max_bytes",
+        "size",
+        "dropped",
+        "_items",
+    )
+
+    def __init__(
+        self,
+        max_records: int = settings.log_cfg.debug_buffer.max_records,
+        max_bytes: int = settings.log_cfg.debug_buffer.max_bytes,
+    ) -> None:
+        self.max_records = max_records
+        self.max_bytes = max_bytes
+        self.size = 0
+        self.dropped = 0
+        self._items: deque[tuple[BufferingHandler, logging.LogRecord, int]] = deque()
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def append(self, handler: BufferingHandler, record: logging.LogRecord) -> None:
+        record_size = estimate_record_size(record)
+        self._items.append((handler, record, record_size))
+        self.size += record_size
+        while self._items and (len(self._items) > self.max_records or self.size > self.max_bytes):
+            _, _, evicted_size = self._items.popleft()
+            self.size -= evicted_size
+            self.dropped += 1
+
+    def flush(self) -> None:
+        """
+        Passes the buffered records to the handlers that buffered them.
+        """
+        while self._items:
+            handler, record, record_size = self._items.popleft()
+            self.size -= record_size
+            handler.handle_buffered(record)
+
+    def discard(self) -> None:
+        self._items.clear()
+        self.size = 0
+
+
+def start_request_buffer() -> Token["RequestLogBuffer | None"]:
+    """
+    Binds a new buffer to the current request context.
+    Returns:
+            Token for restoring the previous context value.
+    """
+    return _request_buffer.set(RequestLogBuffer())
+
+
+def get_request_buffer() -> RequestLogBuffer | None:
+    return _request_buffer.get()
+
+
+def end_request_buffer(token: Token["RequestLogBuffer | None"], flush: bool) -> None:
+    """
+    Flushes or discards the buffer of the current request and unbinds it.
+    Args:
+        token: Token returned by start_request_buffer.
+        flush: If true, the buffered records are passed to the handlers.
+    """
+    buffer = _request_buffer.get()
+    _request_buffer.reset(token)
+    if buffer is None:
+        return
+    if flush:
+        buffer.flush()
+    else:
+        buffer.discard()
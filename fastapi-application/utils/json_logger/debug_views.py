@@ -0,0 +1,61 @@
+"""
+This module contains the protected route querying the flight recorder of the worker.
+"""
+
+import logging
+import os
+import secrets
+
+from fastapi import (
+    APIRouter,
+    Depends,
+    Header,
+    HTTPException,
+    Query,
+    Response,
+    status,
+)
+
+from core.config import settings
+from utils.json_logger.sinks import FlightRecorderHandler
+
+FLIGHT_RECORDER_HANDLER = "flight_recorder"
+LOG_LEVELS = logging.getLevelNamesMapping()
+
+
+def verify_debug_token(x_debug_token: str | None = Header(default=None)) -> None:
+    token = settings.log_cfg.flight_recorder.token
+    if not token or x_debug_token is None or not secrets.compare_digest(x_debug_token, token):
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN)
+
+
+router = APIRouter(
+    tags=["Debug"],
+    dependencies=[Depends(verify_debug_token)],
+)
+
+
+@router.get("")
+def get_recorded_logs(
+    level: str | None = None,
+    path: str | None = None,
+    request_id: str | None = None,
+    limit: int = Query(default=100, ge=1, le=10000),
+) -> Response:
+    recorder = logging.getHandlerByName(FLIGHT_RECORDER_HANDLER)
+    if not isinstance(recorder, FlightRecorderHandler):
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Flight recorder is not enabled")
+    if level is not None and level.upper() not in LOG_LEVELS:
+        raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail=f"Unknown level: {level}")
+
+    lines = recorder.query(
+        level=LOG_LEVELS[level.upper()] if level is not None else logging.NOTSET,
+        path=path,
+        request_id=request_id,
+        limit=limit,
+    )
+    return Response(
+        content=f"[{','.join(lines)}]",
+        media_type="application/json",
+        headers={"x-log-worker": str(os.getpid())},
+    )
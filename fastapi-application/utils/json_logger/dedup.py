@@ -0,0 +1,147 @@
+"""
+This module contains the suppression of repeated log messages.
+"""
+
+import logging
+import threading
+import time
+from datetime import datetime
+
+from core.config import settings
+
+SUMMARY_MSG = "Suppressed %s repeated messages: %s"
+
+DedupKey = tuple[str, int, str, type[BaseException] | None]
+
+
+class _DedupEntry:
+    __slots__ = (
+        "window_start",
+        "count",
+        "suppressed",
+        "first_suppressed",
+        "last_suppressed",
+    )
+
+    def __init__(self, window_start: float) -> None:
+        self.window_start = window_start
+        self.count = 0
+        self.suppressed = 0
+        self.first_suppressed = 0.0
+        self.last_suppressed = 0.0
+
+
+class LogDeduplicator:
+    """
+    Passes the first max_repeats occurrences of a message per window,
+    the rest are counted and reported by a single summary record.
+    Messages are identified by logger, level, message template and exception type.
+    """
+
+    def __init__(
+        self,
+        max_repeats: int = settings.log_cfg.dedup.max_repeats,
+        window: float = settings.log_cfg.dedup.window,
+        max_keys: int = settings.log_cfg.dedup.max_keys,
+    ) -> None:
+        self.max_repeats = max_repeats
+        self.window = window
+        self.max_keys = max_keys
+        self._entries: dict[DedupKey, _DedupEntry] = {}
+        self._next_sweep = 0.0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def get_key(record: logging.LogRecord) -> DedupKey:
+        exc_type = record.exc_info[0] if record.exc_info else None
+        msg = record.msg if isinstance(record.msg, str) else str(record.msg)
+        return record.name, record.levelno, msg, exc_type
+
+    def process(self, record: logging.LogRecord) -> tuple[bool, list[logging.LogRecord]]:
+        """
+        Counts the record.
+        Args:
+            record: Log record.
+
+        Returns:
+                Whether the record should be logged and the summaries of the expired windows.
+        """
+        now = record.created
+        key = self.get_key(record)
+        summaries = []
+        with self._lock:
+            if now >= self._next_sweep:
+                summaries.extend(self._sweep(now))
+                self._next_sweep = now + self.window
+
+            entry = self._entries.get(key)
+            if entry is not None and now - entry.window_start >= self.window:
+                if entry.suppressed:
+                    summaries.append(self._make_summary(key, entry))
+                entry = None
+            if entry is None:
+                if len(self._entries) >= self.max_keys:
+                    return True, summaries
+                entry = self._entries[key] = _DedupEntry(window_start=now)
+
+            entry.count += 1
+            if entry.count <= self.max_repeats:
+                return True, summaries
+
+            if not entry.suppressed:
+                entry.first_suppressed = now
+            entry.suppressed += 1
+            entry.last_suppressed = now
+
+        return False, summaries
+
+    def expire(self, now: float | None = None) -> list[logging.LogRecord]:
+        """
+        Returns the summaries of the expired windows, so that they aren't held
+        until the next record is logged.
+        """
+        now = time.time() if now is None else now
+        with self._lock:
+            self._next_sweep = now + self.window
+            return self._sweep(now)
+
+    def drain(self) -> list[logging.LogRecord]:
+        """
+        Returns the summaries of all the windows with suppressed records.
+        """
+        with self._lock:
+            summaries = [self._make_summary(key, entry) for key, entry in self._entries.items() if entry.suppressed]
+            self._entries.clear()
+
+        return summaries
+
+    def _sweep(self, now: float) -> list[logging.LogRecord]:
+        expired = [key for key, entry in self._entries.items() if now - entry.window_start >= self.window]
+        summaries = []
+        for key in expired:
+            entry = self._entries.pop(key)
+            if entry.suppressed:
+                summaries.append(self._make_summary(key, entry))
+
+        return summaries
+
+    @staticmethod
+    def _make_summary(key: DedupKey, entry: _DedupEntry) -> logging.LogRecord:
+        name, levelno, msg, exc_type = key
+        summary = logging.LogRecord(
+            name=name,
+            level=levelno,
+            pathname="",
+            lineno=0,
+            msg=SUMMARY_MSG,
+            args=(entry.suppressed, msg),
+            exc_info=None,
+        )
+        summary.suppressed = {
+            "count": entry.suppressed,
+            "first": datetime.fromtimestamp(entry.first_suppressed).astimezone().isoformat(),
+            "last": datetime.fromtimestamp(entry.last_suppressed).astimezone().isoformat(),
+            "exception_type": exc_type.__name__ if exc_type is not None else None,
+        }
+
+        return summary
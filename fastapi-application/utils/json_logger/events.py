@@ -0,0 +1,285 @@
+"""
+This module contains the compact request-response log event.
+"""
+
+from collections.abc import Mapping
+from typing import (
+    Any,
+    Protocol,
+)
+
+from starlette.datastructures import URL
+from starlette.types import Scope
+
+from core.config import settings
+from utils.json_logger.body_encoding import encode_body
+
+EMPTY_VALUE = ""
+HEADER_ENCODING = "latin-1"
+DEFAULT_SERVER = (settings.run.host, settings.run.port)
+
+RawHeaders = list[tuple[bytes, bytes]]
+
+BODY_FIELDS = (
+    ("request", "request_body", "request_headers"),
+    ("response", "response_body", "response_headers"),
+)
+
+
+class EventRedactor(Protocol):
+    def redact_string(self, content: str) -> str: ...
+
+    def redact_headers(self, headers: RawHeaders) -> RawHeaders: ...
+
+    def redact_body(self, body: str, content_type: str = EMPTY_VALUE) -> str: ...
+
+
+def decode_headers(headers: RawHeaders) -> dict[str, str]:
+    return {key.decode(HEADER_ENCODING): value.decode(HEADER_ENCODING) for key, value in headers}
+
+
+def get_raw_header(headers: RawHeaders, name: bytes) -> str:
+    for key, value in headers:
+        if key.lower() == name:
+            return value.decode(HEADER_ENCODING)
+
+    return EMPTY_VALUE
+
+
+def get_content_type(headers: Mapping[str, str]) -> str:
+    return next((value for name, value in headers.items() if name.lower() == "content-type"), EMPTY_VALUE)
+
+
+def is_json_content(content_type: str) -> bool:
+    media_type = content_type.partition(";")[0].strip().lower()
+    return media_type == "application/json" or media_type.endswith("+json")
+
+
+def get_content_length(headers: dict[str, str]) -> int:
+    content_length = headers.get("content-length", EMPTY_VALUE)
+    return int(content_length) if content_length.isdigit() else 0
+
+
+def get_scope_protocol(scope: Scope) -> str:
+    protocol = str(scope.get("type", ""))
+    http_version = str(scope.get("http_version", ""))
+    if protocol.lower() == "http" and http_version:
+        return f"{protocol.upper()}/{http_version}"
+    return EMPTY_VALUE
+
+
+def get_scope_host(scope: Scope) -> str:
+    host, port = scope.get("server") or DEFAULT_SERVER
+    return f"{host}:{port}"
+
+
+class RequestLogEvent:
+    """
+    Request-response log event.
+    Headers are kept as raw ASGI lists and bodies as bytes until the event
+    is redacted or serialized. An event created from the ASGI scope builds
+    the uri, protocol and host from the scope only then as well.
+    """
+
+    __slots__ = (
+        "request_uri",
+        "request_protocol",
+        "request_method",
+        "request_path",
+        "request_route",
+        "request_host",
+        "request_headers",
+        "request_body",
+        "remote_ip",
+        "remote_port",
+        "response_status_code",
+        "response_headers",
+        "response_body",
+        "duration",
+        "trace",
+        "profile",
+        "scope",
+        "redacted",
+    )
+
+    def __init__(
+        self,
+        request_uri: str | None,
+        request_protocol: str | None,
+        request_method: str,
+        request_path: str,
+        request_host: str | None,
+        request_headers: RawHeaders,
+        request_body: bytes | str,
+        remote_ip: str,
+        remote_port: int,
+        response_status_code: int,
+        response_headers: RawHeaders,
+        response_body: bytes | str,
+        duration: int,
+        request_route: str = EMPTY_VALUE,
+        trace: dict[str, Any] | None = None,
+        profile: dict[str, Any] | None = None,
+        scope: Scope | None = None,
+    ) -> None:
+        self.request_uri = request_uri
+        self.request_protocol = request_protocol
+        self.request_method = request_method
+        self.request_path = request_path
+        self.request_route = request_route
+        self.request_host = request_host
+        self.request_headers = request_headers
+        self.request_body = request_body
+        self.remote_ip = remote_ip
+        self.remote_port = remote_port
+        self.response_status_code = response_status_code
+        self.response_headers = response_headers
+        self.response_body = response_body
+        self.duration = duration
+        self.trace = trace
+        self.profile = profile
+        self.scope = scope
+        self.redacted = False
+
+    @classmethod
+    def from_scope(
+        cls,
+        scope: Scope,
+        request_body: bytes,
+        response_status_code: int,
+        response_headers: RawHeaders,
+        response_body: bytes,
+        duration: int,
+        request_route: str = EMPTY_VALUE,
+        trace: dict[str, Any] | None = None,
+        profile: dict[str, Any] | None = None,
+    ) -> "RequestLogEvent":
+        """
+        Creates an event that keeps a reference to the ASGI scope of the request.
+        """
+        remote_ip, remote_port = scope.get("client") or (EMPTY_VALUE, 0)
+        return cls(
+            request_uri=None,
+            request_protocol=None,
+            request_method=scope["method"],
+            request_path=scope["path"],
+            request_host=None,
+            request_headers=scope["headers"],
+            request_body=request_body,
+            remote_ip=remote_ip,
+            remote_port=remote_port,
+            response_status_code=response_status_code,
+            response_headers=response_headers,
+            response_body=response_body,
+            duration=duration,
+            request_route=request_route,
+            trace=trace,
+            profile=profile,
+            scope=scope,
+        )
+
+    def get_request_uri(self) -> str:
+        if self.request_uri is None:
+            self.request_uri = str(URL(scope=self.scope))
+        return self.request_uri
+
+    def get_request_protocol(self) -> str:
+        if self.request_protocol is None:
+            assert self.scope is not None
+            self.request_protocol = get_scope_protocol(self.scope)
+        return self.request_protocol
+
+    def get_request_host(self) -> str:
+        if self.request_host is None:
+            assert self.scope is not None
+            self.request_host = get_scope_host(self.scope)
+        return self.request_host
+
+    def get_request_body(self) -> str:
+        if isinstance(self.request_body, bytes):
+            self.request_body = encode_body(self.request_body)
+        return self.request_body
+
+    def get_response_body(self) -> str:
+        if isinstance(self.response_body, bytes):
+            self.response_body = encode_body(self.response_body)
+        return self.response_body
+
+    def redact(self, redactor: EventRedactor) -> None:
+        """
+        Masks the sensitive data of the event in place.
+        Args:
+            redactor: Object that masks strings and raw headers.
+        """
+        if self.redacted:
+            return
+        self.request_uri = redactor.redact_string(self.get_request_uri())
+        self.request_path = redactor.redact_string(self.request_path)
+        self.request_route = redactor.redact_string(self.request_route)
+        self.request_headers = redactor.redact_headers(self.request_headers)
+        self.response_headers = redactor.redact_headers(self.response_headers)
+        self.request_body = redactor.redact_body(
+            self.get_request_body(), content_type=get_raw_header(self.request_headers, b"content-type")
+        )
+        self.response_body = redactor.redact_body(
+            self.get_response_body(), content_type=get_raw_header(self.response_headers, b"content-type")
+        )
+        self.redacted = True
+
+    def to_dict(self) -> dict[str, Any]:
+        """
+        Returns:
+                Request and response fields of the log.
+        """
+        request_headers = decode_headers(self.request_headers)
+        response_headers = decode_headers(self.response_headers)
+
+        fields = {
+            "request": {
+                "request_uri": self.get_request_uri(),
+                "request_referer": request_headers.get("referer", EMPTY_VALUE),
+                "request_protocol": self.get_request_protocol(),
+                "request_method": self.request_method,
+                "request_path": self.request_path,
+                "request_route": self.request_route,
+                "request_host": self.get_request_host(),
+                "request_size": get_content_length(request_headers),
+                "request_content_type": request_headers.get("content-type", EMPTY_VALUE),
+                "request_headers": request_headers,
+                "request_body": self.get_request_body(),
+                "request_direction": "in",
+                "remote_ip": self.remote_ip,
+                "remote_port": self.remote_port,
+            },
+            "response": {
+                "response_status_code": self.response_status_code,
+                "response_size": get_content_length(response_headers),
+                "response_headers": response_headers,
+                "response_body": self.get_response_body(),
+            },
+            "duration": self.duration,
+        }
+        if self.trace is not None:
+            fields.update(self.trace)
+        if self.profile is not None:
+            fields["profile"] = self.profile
+
+        return fields
+
+
+class RequestUri:
+    """
+    Uri of a request event as an argument of the log message,
+    built when the message is formatted, after the event is redacted.
+    """
+
+    __slots__ = ("event",)
+
+    def __init__(self, event: RequestLogEvent) -> None:
+        self.event = event
+
+    def __str__(self) -> str:
+        return self.event.get_request_uri()
+
+    def __deepcopy__(self, memo: dict[int, Any]) -> "RequestUri":
+        return self
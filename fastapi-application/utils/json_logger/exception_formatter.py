@@ -0,0 +1,150 @@
+"""
+This module contains the rendering of exceptions for logging.
+"""
+
+import traceback
+from types import TracebackType
+from typing import (
+    Any,
+    Literal,
+)
+
+from core.config import settings
+
+CAUSE_MESSAGE = "\nThe above exception was the direct cause of the following exception:\n\n"
+CONTEXT_MESSAGE = "\nDuring handling of the above exception, another exception occurred:\n\n"
+TRACEBACK_HEADER = "Traceback (most recent call last):\n"
+
+ExcInfo = tuple[type[BaseException], BaseException, TracebackType | None] | tuple[None, None, None]
+FramesKey = tuple[tuple[str, str, int, int], ...]
+
+
+def get_type_name(exc_type: type[BaseException]) -> str:
+    module = exc_type.__module__
+    if module in ("builtins", "__main__"):
+        return exc_type.__qualname__
+    return f"{module}.{exc_type.__qualname__}"
+
+
+def get_exc_message(exc: BaseException) -> str:
+    try:
+        return str(exc)
+    except Exception:
+        return "<exception str() failed>"
+
+
+def get_frames_key(tb: TracebackType | None) -> FramesKey:
+    """
+    Identifies a traceback by the code locations of its frames.
+    """
+    key = []
+    while tb is not None:
+        code = tb.tb_frame.f_code
+        key.append((code.co_filename, code.co_qualname, tb.tb_lineno, tb.tb_lasti))
+        tb = tb.tb_next
+
+    return tuple(key)
+
+
+class ExceptionRenderer:
+    """
+    Renders exceptions as text like traceback.format_exception or as structured frames.
+    Rendered stacks are cached by the code locations of the traceback, so recurring
+    exceptions are rendered without walking the frames and reading source lines again.
+    """
+
+    def __init__(
+        self,
+        mode: Literal["text", "structured"] = settings.log_cfg.exc_format.mode,
+        frame_limit: int | None = settings.log_cfg.exc_format.frame_limit,
+        cache_size: int = settings.log_cfg.exc_format.cache_size,
+    ) -> None:
+        self.mode = mode
+        self.frame_limit = frame_limit
+        self.cache_size = cache_size
+        self._cache: dict[FramesKey, list[Any]] = {}
+
+    def render(self, exc_info: ExcInfo) -> list[str] | list[dict[str, Any]]:
+        """
+        Renders the exception and its chain of causes, oldest first.
+        Args:
+            exc_info: Exception info of the log record.
+
+        Returns:
+                Text lines or a dictionary per exception in the chain.
+        """
+        exc_type, exc, tb = exc_info
+        if exc is None or isinstance(exc, BaseExceptionGroup):
+            return traceback.format_exception(exc_type, exc, tb, limit=self.frame_limit)
+
+        chain = self._get_chain(exc)
+        if self.mode == "structured":
+            return [
+                {
+                    "type": get_type_name(type(item)),
+                    "message": get_exc_message(item),
+                    "frames": self._get_frames(tb if item is exc else item.__traceback__),
+                }
+                for item, _ in reversed(chain)
+            ]
+
+        lines = []
+        for item, link in reversed(chain):
+            item_tb = tb if item is exc else item.__traceback__
+            if item_tb is not None:
+                lines.append(TRACEBACK_HEADER)
+                lines.extend(self._get_frames(item_tb))
+            lines.extend(traceback.format_exception_only(item))
+            if link is not None:
+                lines.append(link)
+
+        return lines
+
+    @staticmethod
+    def _get_chain(exc: BaseException) -> list[tuple[BaseException, str | None]]:
+        """
+        Returns the exception and its causes, newest first, each with the message
+        that links it to the following exception.
+        """
+        chain: list[tuple[BaseException, str | None]] = []
+        link = None
+        seen = set()
+        item: BaseException | None = exc
+        while item is not None and id(item) not in seen:
+            seen.add(id(item))
+            chain.append((item, link))
+            if item.__cause__ is not None:
+                item, link = item.__cause__, CAUSE_MESSAGE
+            elif item.__context__ is not None and not item.__suppress_context__:
+                item, link = item.__context__, CONTEXT_MESSAGE
+            else:
+                item = None
+
+        return chain
+
+    def _get_frames(self, tb: TracebackType | None) -> list[Any]:
+        key = get_frames_key(tb)
+        frames = self._cache.get(key)
+        if frames is None:
+            frames = self._extract_frames(tb)
+            if self._cache and len(self._cache) >= self.cache_size:
+                self._cache.pop(next(iter(self._cache)), None)
+            self._cache[key] = frames
+
+        return frames
+
+    def _extract_frames(self, tb: TracebackType | None) -> list[Any]:
+        if self.mode == "structured":
+            frames = [
+                {
+                    "file": frame.f_code.co_filename,
+                    "line": lineno,
+                    "function": frame.f_code.co_name,
+                }
+                for frame, lineno in traceback.walk_tb(tb)
+            ]
+            if self.frame_limit is None:
+                return frames
+            return frames[: self.frame_limit] if self.frame_limit >= 0 else frames[self.frame_limit :]
+
+        return traceback.extract_tb(tb, limit=self.frame_limit).format()
@@ -0,0 +1,110 @@
+"""
+This module contains the pool that decodes, redacts and formats
+batches of records for the queue listener.
+"""
+
+import logging
+import multiprocessing
+import sys
+import traceback
+from concurrent.futures import (
+    Executor,
+    ProcessPoolExecutor,
+    ThreadPoolExecutor,
+)
+from typing import Literal
+
+from utils.json_logger.json_log_formatter import (
+    JSONLogFormatter,
+    join_fragments,
+)
+from utils.json_logger.log_filters import SensitiveDataFilter
+from utils.json_logger.wire import (
+    WIRE_EXTRAS,
+    decode_record,
+)
+
+PoolKind = Literal["auto", "process", "thread"]
+KEPT_EXTRAS = frozenset(("request_id",))
+
+_formatter: JSONLogFormatter | None = None
+_redactor: SensitiveDataFilter | None = None
+
+
+def is_gil_enabled() -> bool:
+    """
+    Returns false on a free-threaded build running without the GIL.
+    """
+    is_enabled = getattr(sys, "_is_gil_enabled", None)
+    return is_enabled is None or is_enabled()
+
+
+def create_pool(kind: PoolKind, workers: int) -> Executor:
+    """
+    Creates the formatting pool.
+    Args:
+        kind: Pool type, auto selects threads if the GIL is disabled and processes otherwise.
+        workers: Number of workers.
+
+    Returns:
+            Executor whose workers are ready to format records.
+    """
+    if kind == "auto":
+        kind = "process" if is_gil_enabled() else "thread"
+    if kind == "thread":
+        return ThreadPoolExecutor(max_workers=workers, thread_name_prefix="LogFormatter", initializer=init_worker)
+
+    start_method = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+    return ProcessPoolExecutor(
+        max_workers=workers,
+        mp_context=multiprocessing.get_context(start_method),
+        initializer=init_worker,
+    )
+
+
+def init_worker() -> tuple[JSONLogFormatter, SensitiveDataFilter]:
+    """
+    Returns:
+            Formatter and redactor of the worker, created on the first call.
+    """
+    global _formatter, _redactor
+    if _formatter is None or _redactor is None:
+        _formatter = JSONLogFormatter()
+        _redactor = SensitiveDataFilter()
+
+    return _formatter, _redactor
+
+
+def format_batch(items: list[bytes | logging.LogRecord]) -> list[logging.LogRecord]:
+    """
+    Decodes, redacts and formats a batch of records in the compact wire format.
+    Records received in other formats are already formatted and are returned as is.
+    Args:
+        items: Queue items in the order they were received.
+
+    Returns:
+            Records whose message is the formatted log, in the same order.
+    """
+    formatter, redactor = init_worker()
+    records = []
+    for item in items:
+        if isinstance(item, bytes):
+            try:
+                record = decode_record(item)
+                redactor.filter(record)
+                fragments = formatter.get_fragments(record)
+            except Exception:
+                if logging.raiseExceptions:
+                    traceback.print_exc(file=sys.stderr)
+                continue
+            for key in WIRE_EXTRAS:
+                if key not in KEPT_EXTRAS:
+                    record.__dict__.pop(key, None)
+            record.json_fragments = fragments
+            record.msg = join_fragments(fragments)
+            record.message = record.msg
+            record.rendered_exceptions = None
+            item = record
+        records.append(item)
+
+    return records
@@ -0,0 +1,130 @@
+"""
+This module contains a mergeable log-linear histogram.
+
+Values below 2 ** SUB_BUCKET_BITS have their own buckets, larger values are
+split into 2 ** SUB_BUCKET_BITS linear buckets per power of two, so the
+relative error of a quantile is below 1 / 2 ** SUB_BUCKET_BITS.
+The histogram has a fixed number of buckets and is merged by adding them.
+"""
+
+from typing import Any
+
+SUB_BUCKET_BITS = 4
+SUB_BUCKETS = 1 << SUB_BUCKET_BITS
+MAX_VALUE_BITS = 40
+BUCKETS = (MAX_VALUE_BITS - SUB_BUCKET_BITS + 1) * SUB_BUCKETS
+MAX_VALUE = (1 << MAX_VALUE_BITS) - 1
+
+
+def get_bucket(value: int) -> int:
+    if value < SUB_BUCKETS:
+        return max(value, 0)
+    value = min(value, MAX_VALUE)
+    shift = value.bit_length() - SUB_BUCKET_BITS - 1
+    return (shift + 1) * SUB_BUCKETS + (value >> shift) - SUB_BUCKETS
+
+
+def get_bucket_bounds(bucket: int) -> tuple[int, int]:
+    """
+    Returns:
+            The smallest and the largest value of the bucket.
+    """
+    if bucket < SUB_BUCKETS:
+        return bucket, bucket
+    shift = bucket // SUB_BUCKETS - 1
+    lower = (bucket % SUB_BUCKETS + SUB_BUCKETS) << shift
+    return lower, lower + (1 << shift) - 1
+
+
+class LogLinearHistogram:
+    """
+    Fixed-memory histogram of non-negative integers.
+    """
+
+    __slots__ = (
+        "counts",
+        "count",
+        "total",
+        "min",
+        "max",
+    )
+
+    def __init__(self) -> None:
+        self.counts = [0] * BUCKETS
+        self.count = 0
+        self.total = 0
+        self.min: int | None = None
+        self.max: int | None = None
+
+    def __len__(self) -> int:
+        return self.count
+
+    def record(self, value: int | float, count: int = 1) -> None:
+        value = int(value)
+        self.counts[get_bucket(value)] += count
+        self.count += count
+        self.total += value * count
+        if self.min is None or value < self.min:
+            self.min = value
+        if self.max is None or value > self.max:
+            self.max = value
+
+    def merge(self, other: "LogLinearHistogram") -> None:
+        if not other.count:
+            return
+        counts = self.counts
+        for bucket, count in enumerate(other.counts):
+            if count:
+                counts[bucket] += count
+        self.count += other.count
+        self.total += other.total
+        if other.min is not None and (self.min is None or other.min < self.min):
+            self.min = other.min
+        if other.max is not None and (self.max is None or other.max > self.max):
+            self.max = other.max
+
+    def quantile(self, q: float) -> float | None:
+        """
+        Args:
+            q: Quantile between 0 and 1.
+
+        Returns:
+                Approximate value of the quantile or None if the histogram is empty.
+        """
+        if not self.count or self.min is None or self.max is None:
+            return None
+        rank = max(1, round(q * self.count))
+        seen = 0
+        for bucket, count in enumerate(self.counts):
+            seen += count
+            if seen >= rank:
+                lower, upper = get_bucket_bounds(bucket)
+                return min(max((lower + upper) / 2, self.min), self.max)
+
+        return float(self.max)
+
+    def mean(self) -> float | None:
+        return self.total / self.count if self.count else None
+
+    def to_dict(self) -> dict[str, Any]:
+        """
+        Sparse representation for the logs and for merging across processes.
+        """
+        return {
+            "count": self.count,
+            "total": self.total,
+            "min": self.min,
+            "max": self.max,
+            "buckets": {str(bucket): count for bucket, count in enumerate(self.counts) if count},
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict[str, Any]) -> "LogLinearHistogram":
+        histogram = cls()
+        for bucket, count in data["buckets"].items():
+            histogram.counts[int(bucket)] = count
+        histogram.count = data["count"]
+        histogram.total = data["total"]
+        histogram.min = data["min"]
+        histogram.max = data["max"]
+        return histogram
@@ -4,11 +4,21 @@ This module contains a custom JSON formatter for logging.
 
 import json
 import logging
-import traceback
+import re
+from collections.abc import Sequence
 from datetime import datetime
-from typing import override
+from typing import (
+    Any,
+    override,
+)
 
 from core.config import settings
+from utils.json_logger.events import (
+    BODY_FIELDS,
+    get_content_type,
+    is_json_content,
+)
+from utils.json_logger.exception_formatter import ExceptionRenderer
 from utils.json_logger.schemas import JsonLogBase
 
 LOG_LEVELS: dict[int, str] = {
@@ -20,12 +30,109 @@ LOG_LEVELS: dict[int, str] = {
     logging.NOTSET: "trace",
 }
 
+Fragments = dict[str, "str | Fragments"]
+Projection = dict[str, "Projection | None"]
+
+JSON_WHITESPACE = re.compile(r"[ \t\n\r]")
+
+
+def reject_constant(constant: str) -> None:
+    raise ValueError(f"Invalid JSON constant: {constant}")
+
+
+def to_raw_json(body: str) -> str | None:
+    """
+    Converts a JSON body to a fragment that can be embedded into the log as is.
+    A body without whitespace is already compact and is returned unchanged,
+    otherwise it is serialized again in compact form.
+    Args:
+        body: Request or response body.
+
+    Returns:
+            Compact JSON or None if the body is not valid JSON.
+    """
+    try:
+        content = json.loads(body, parse_constant=reject_constant)
+    except ValueError:
+        return None
+    if not JSON_WHITESPACE.search(body):
+        return body
+
+    return json.dumps(content, ensure_ascii=False, separators=(",", ":"))
+
+
+def serialize_fragments(log_object: dict[str, Any]) -> Fragments:
+    """
+    Serializes each top-level field and each field of the nested objects separately.
+    Args:
+        log_object: Dictionary with log objects.
+
+    Returns:
+            JSON fragments of the fields.
+    """
+    return {
+        key: (
+            {sub_key: json.dumps(sub_value, default=str) for sub_key, sub_value in value.items()}
+            if isinstance(value, dict)
+            else json.dumps(value, default=str)
+        )
+        for key, value in log_object.items()
+    }
+
+
+def join_fragments(fragments: Fragments, projection: Projection | None = None) -> str:
+    """
+    Builds a JSON object from the fragments, the output is the same as json.dumps of the log object.
+    Args:
+        fragments: JSON fragments of the fields.
+        projection: Fields to include, None includes all of them.
+
+    Returns:
+            Log string in JSON format.
+    """
+    items = []
+    for key, fragment in fragments.items():
+        if projection is not None and key not in projection:
+            continue
+        if isinstance(fragment, dict):
+            fragment = join_fragments(fragment, None if projection is None else projection[key])
+        items.append(f"{json.dumps(key)}: {fragment}")
+
+    return "{" + ", ".join(items) + "}"
+
+
+def compile_projection(fields: Sequence[str]) -> Projection:
+    """
+    Converts dotted field paths like response.response_status_code to a projection tree.
+    """
+    projection: Projection = {}
+    for field in fields:
+        key, _, sub_key = field.partition(".")
+        if not sub_key:
+            projection[key] = None
+            continue
+        sub_projection = projection.setdefault(key, {})
+        if sub_projection is not None:
+            sub_projection[sub_key] = None
+
+    return projection
+
 
 class JSONLogFormatter(logging.Formatter):
     """
     Class-formatter for logs in json format.
     """
 
+    def __init__(
+        self,
+        *args,
+        embed_json_bodies: bool = settings.log_cfg.embed_json_bodies,
+        **kwargs,
+    ) -> None:
+        super().__init__(*args, **kwargs)
+        self._exc_renderer = ExceptionRenderer()
+        self.embed_json_bodies = embed_json_bodies
+
     @override
     def format(self, record: logging.LogRecord) -> str:
         """
@@ -36,11 +143,55 @@ class JSONLogFormatter(logging.Formatter):
         Returns:
                 Log string in JSON format.
         """
-        log_object: dict = self._format_log_object(record)
-        return json.dumps(log_object, default=str)
+        return join_fragments(self.get_fragments(record))
+
+    def get_fragments(self, record: logging.LogRecord) -> Fragments:
+        """
+        Returns the JSON fragments cached on the record by the queue handler
+        or the listener, or serializes the record.
+        """
+        fragments = getattr(record, "json_fragments", None)
+        if fragments is None:
+            log_object = self._format_log_object(record)
+            fragments = serialize_fragments(log_object)
+            if self.embed_json_bodies:
+                self._embed_json_bodies(log_object, fragments)
+
+        return fragments
 
     @staticmethod
-    def _format_log_object(record: logging.LogRecord) -> dict:
+    def _embed_json_bodies(log_object: dict[str, Any], fragments: Fragments) -> None:
+        """
+        Replaces the string fragments of the bodies with JSON content types by the bodies themselves.
+        """
+        for side, body_key, headers_key in BODY_FIELDS:
+            fields = log_object.get(side)
+            if not isinstance(fields, dict) or not isinstance(body := fields.get(body_key), str) or not body:
+                continue
+            if is_json_content(get_content_type(fields.get(headers_key) or {})):
+                raw_json = to_raw_json(body)
+                side_fragments = fragments[side]
+                if raw_json is not None and isinstance(side_fragments, dict):
+                    side_fragments[body_key] = raw_json
+
+    def render_exceptions(self, record: logging.LogRecord) -> list[str] | list[dict[str, Any]] | str | None:
+        """
+        Renders the exception information of the record.
+        Args:
+            record: Log record.
+
+        Returns:
+                Rendered exceptions or None if the record has no exception.
+        """
+        if record.exc_info:
+            return self._exc_renderer.render(record.exc_info)
+
+        if record.exc_text:
+            return record.exc_text
+
+        return getattr(record, "rendered_exceptions", None)
+
+    def _format_log_object(self, record: logging.LogRecord) -> dict[str, Any]:
         """
         Generates fields for logging.
         Args:
@@ -51,10 +202,10 @@ class JSONLogFormatter(logging.Formatter):
         """
         now = datetime.fromtimestamp(record.created).astimezone().replace(microsecond=0)
         message = record.getMessage()
-        duration = record.duration if hasattr(record, "duration") else record.msecs
+        duration = record.duration if hasattr(record, "duration") else int(record.msecs)
         json_log_fields = JsonLogBase(
             timestamp=now,
-            thread=record.process,
+            thread=record.process or 0,
             level=record.levelno,
             level_name=LOG_LEVELS[record.levelno],
             message=message,
@@ -65,11 +216,19 @@ class JSONLogFormatter(logging.Formatter):
             app_env=settings.api.environment,
         )
 
-        if record.exc_info:
-            json_log_fields.exceptions = traceback.format_exception(*record.exc_info)
+        exceptions = self.render_exceptions(record)
+        if exceptions:
+            json_log_fields.exceptions = exceptions
+
+        if hasattr(record, "suppressed"):
+            json_log_fields.suppressed = record.suppressed
 
-        elif record.exc_text:
-            json_log_fields.exceptions = record.exc_text
+        if hasattr(record, "route_summary"):
+            json_log_fields.route_summary = record.route_summary
+
+        request_id = getattr(record, "request_id", None)
+        if request_id is not None:
+            json_log_fields.request_id = request_id
 
         json_log_obj = json_log_fields.model_dump(
             exclude_unset=True,
@@ -78,4 +237,34 @@ class JSONLogFormatter(logging.Formatter):
         if hasattr(record, "request_json_fields"):
             json_log_obj.update(record.request_json_fields)
 
+        request_event = getattr(record, "request_event", None)
+        if request_event is not None:
+            json_log_obj.update(request_event.to_dict())
+
         return json_log_obj
+
+
+class ProjectionFormatter(JSONLogFormatter):
+    """
+    Formats only the fields of a projection profile.
+    The fragments are shared with the other formatters of the record,
+    so a projection doesn't serialize the record again.
+    """
+
+    def __init__(
+        self,
+        *args,
+        profile: str | None = None,
+        fields: Sequence[str] | None = None,
+        **kwargs,
+    ) -> None:
+        super().__init__(*args, **kwargs)
+        if fields is None:
+            if profile is None:
+                raise ValueError("Either a projection profile or fields are required")
+            fields = settings.log_cfg.projection.profiles[profile]
+        self.projection = compile_projection(fields)
+
+    @override
+    def format(self, record: logging.LogRecord) -> str:
+        return join_fragments(self.get_fragments(record), self.projection)
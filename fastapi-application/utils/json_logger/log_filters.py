@@ -3,20 +3,60 @@ This module contains log filters.
 """
 
 import copy
+import json
 import logging
 import re
 from collections.abc import (
     Mapping,
     Sequence,
 )
-from typing import override
+from typing import (
+    Any,
+    override,
+)
 
 from core.config import settings
+from utils.json_logger.events import (
+    BODY_FIELDS,
+    EMPTY_VALUE,
+    HEADER_ENCODING,
+    RawHeaders,
+    RequestLogEvent,
+    get_content_type,
+    is_json_content,
+)
+
+BACKREFERENCE = re.compile(r"\\\d|\(\?P=")
+
+
+def combine_patterns(patterns: Sequence[str | re.Pattern[str]]) -> re.Pattern[str] | None:
+    """
+    Joins the patterns into one alternation, so a string is scanned once.
+    Returns:
+            Combined pattern or None if the patterns can't be combined safely.
+    """
+    sources = []
+    for pattern in patterns:
+        if isinstance(pattern, re.Pattern):
+            if pattern.flags != re.UNICODE:
+                return None
+            pattern = pattern.pattern
+        if not isinstance(pattern, str) or BACKREFERENCE.search(pattern):
+            return None
+        sources.append(f"(?:{pattern})")
+    if not sources:
+        return None
+    try:
+        return re.compile("|".join(sources))
+    except re.error:
+        return None
 
 
 class SensitiveDataFilter(logging.Filter):
     """
     Logs containing confidential information are filtered.
+    JSON bodies are parsed and masked by key, string values are matched
+    against all the patterns in a single pass.
     """
 
     ignore_keys = {
@@ -45,22 +85,124 @@ class SensitiveDataFilter(logging.Filter):
         mask_patterns: Sequence[str | re.Pattern[str]] = settings.log_cfg.regex_patterns,
         mask: str = settings.log_cfg.mask,
         mask_keys: Sequence[str] = settings.log_cfg.sensitive_keys,
+        json_keys: bool = settings.log_cfg.body_redaction.json_keys,
+        max_json_size: int = settings.log_cfg.body_redaction.max_json_size,
+        max_body_size: int = settings.log_cfg.body_redaction.max_size,
     ) -> None:
         super(SensitiveDataFilter, self).__init__()
         self._mask_patterns = mask_patterns
         self._mask = mask
         self._mask_keys = set(mask_keys or {})
+        self._header_mask_keys = {key.lower().encode(HEADER_ENCODING) for key in self._mask_keys}
+        self._lower_mask_keys = {key.lower() for key in self._mask_keys}
+        self._pattern = combine_patterns(mask_patterns)
+        self._json_keys = json_keys
+        self._max_json_size = max_json_size
+        self._max_body_size = max_body_size
 
     @override
     def filter(self, record: logging.LogRecord) -> bool:
         d = vars(record)
         for k, content in d.items():
-            if k not in self.ignore_keys:
+            if k in self.ignore_keys:
+                continue
+            if isinstance(content, RequestLogEvent):
+                content.redact(self)
+            elif k == "request_json_fields" and isinstance(content, Mapping):
+                d[k] = self.redact_request_fields(content)
+            else:
                 d[k] = self.redact(content, k)
 
         return True
 
-    def redact(self, content, key=None):
+    def redact_string(self, content: str) -> str:
+        if self._pattern is not None:
+            return self._pattern.sub(self._mask, content)
+        for pattern in self._mask_patterns:
+            content = re.sub(pattern, self._mask, content)
+
+        return content
+
+    def redact_headers(self, headers: RawHeaders) -> RawHeaders:
+        """
+        Masks raw ASGI headers, header names are compared case-insensitively.
+        """
+        mask = self._mask.encode(HEADER_ENCODING)
+        return [
+            (
+                key,
+                (
+                    mask
+                    if key.lower() in self._header_mask_keys
+                    else self.redact_string(value.decode(HEADER_ENCODING)).encode(HEADER_ENCODING, "replace")
+                ),
+            )
+            for key, value in headers
+        ]
+
+    def redact_request_fields(self, request_fields: Mapping[str, Any]) -> dict[str, Any]:
+        """
+        Masks the serialized fields of a request event,
+        header names are compared case-insensitively like in redact_headers.
+        """
+        fields: dict[str, Any] = {
+            key: dict(value) if isinstance(value, Mapping) else value for key, value in request_fields.items()
+        }
+        bodies = []
+        for side, body_key, headers_key in BODY_FIELDS:
+            if side in fields and isinstance(fields[side].get(body_key), str):
+                bodies.append((side, body_key, headers_key, fields[side][body_key]))
+                fields[side][body_key] = None
+
+        fields = self.redact(fields)
+        for side, body_key, headers_key in BODY_FIELDS:
+            headers = fields.get(side, {}).get(headers_key)
+            if headers:
+                fields[side][headers_key] = {
+                    name: self._mask if name.lower() in self._lower_mask_keys else value
+                    for name, value in headers.items()
+                }
+        for side, body_key, headers_key, body in bodies:
+            content_type = get_content_type(fields[side].get(headers_key) or {})
+            fields[side][body_key] = self.redact_body(body, content_type=content_type)
+
+        return fields
+
+    def redact_body(self, body: str, content_type: str = EMPTY_VALUE) -> str:
+        """
+        Masks a request or response body.
+        JSON bodies are masked by key and their string values by the patterns,
+        other bodies and JSON that can't be parsed are redacted as text.
+        Bodies larger than max_body_size are truncated first.
+        """
+        if not body:
+            return body
+        if len(body) > self._max_body_size:
+            body = f"{body[: self._max_body_size]}...[truncated {len(body) - self._max_body_size} characters]"
+        elif self._json_keys and len(body) <= self._max_json_size and is_json_content(content_type):
+            try:
+                content = json.loads(body)
+            except ValueError:
+                pass
+            else:
+                return json.dumps(self._redact_json(content), ensure_ascii=False, separators=(",", ":"))
+
+        return self.redact_string(body)
+
+    def _redact_json(self, content: Any) -> Any:
+        if isinstance(content, str):
+            return self.redact_string(content)
+        if isinstance(content, dict):
+            return {
+                key: self._mask if key.lower() in self._lower_mask_keys else self._redact_json(value)
+                for key, value in content.items()
+            }
+        if isinstance(content, list):
+            return [self._redact_json(value) for value in content]
+
+        return content
+
+    def redact(self, content: Any, key: str | None = None) -> Any:
         try:
             content_copy = copy.deepcopy(content)
         except Exception:
@@ -81,8 +223,7 @@ class SensitiveDataFilter(logging.Filter):
                 content_copy = self._mask
 
             elif isinstance(content_copy, str):
-                for pattern in self._mask_patterns:
-                    content_copy = re.sub(pattern, self._mask, content_copy)
+                content_copy = self.redact_string(content_copy)
 
         return content_copy
 
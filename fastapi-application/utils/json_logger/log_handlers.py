@@ -2,28 +2,185 @@
 Log handlers.
 """
 
+import copy
 import logging
+import threading
+import time
 from logging.handlers import QueueHandler
 from typing import override
 
+from core.config import settings
+from utils.json_logger.debug_buffer import get_request_buffer
+from utils.json_logger.dedup import LogDeduplicator
+from utils.json_logger.json_log_formatter import JSONLogFormatter
+from utils.json_logger.log_listeners import LogQueue
+from utils.json_logger.queue_budget import (
+    get_item_size,
+    get_queue_budget,
+)
+from utils.json_logger.wire import (
+    QueueItem,
+    encode_record,
+)
+
+DROPS_MSG = "Dropped %s log records (%s bytes), the log queue is full"
+
 
 class CustomQueueHandler(QueueHandler):
     """
     A subclass of QueueHandler.
+    Records below buffer_level are held in the buffer of the current request
+    instead of being enqueued, outside a request they are dropped.
+    Repeated records are suppressed by the deduplicator if it is enabled,
+    request records share a message template and are never suppressed.
+    The summaries of the expired windows are enqueued by a timer thread.
+    The bytes and records in flight are limited by the budget shared with the listener,
+    once it drops records they are reported by a warning every report_interval.
+    With the compact wire format records are enqueued as bytes
+    and formatted by the listener, otherwise the JSON fragments of the record
+    are kept for the projection formatters if keep_fragments is set.
     """
 
+    buffer_level: int = logging.NOTSET
+    keep_fragments: bool = False
+
+    def __init__(
+        self,
+        queue: LogQueue,
+        deduplicator: LogDeduplicator | None = None,
+        report_interval: float = settings.log_cfg.queue_budget.report_interval,
+    ) -> None:
+        super().__init__(queue)
+        self.wire_format = settings.log_cfg.wire_format
+        if deduplicator is None and settings.log_cfg.dedup.enabled:
+            deduplicator = LogDeduplicator()
+        self.deduplicator = deduplicator
+        self.report_interval = report_interval
+        self.budget = get_queue_budget(queue)
+        self._stopped = threading.Event()
+        self._timer: threading.Thread | None = None
+        self._timer_lock = threading.Lock()
+        if deduplicator is not None:
+            self._start_timer()
+
+    @override
+    def handle(self, record: logging.LogRecord) -> bool:
+        if record.levelno < self.buffer_level:
+            buffer = get_request_buffer()
+            if buffer is not None:
+                buffer.append(handler=self, record=record)
+            return False
+
+        if self.deduplicator is not None and getattr(record, "request_event", None) is None:
+            allowed, summaries = self.deduplicator.process(record)
+            for summary in summaries:
+                super().handle(summary)
+            if not allowed:
+                return False
+
+        return super().handle(record)
+
+    def handle_buffered(self, record: logging.LogRecord) -> bool:
+        """
+        Passes a buffered record through the filters and into the queue.
+        """
+        return super().handle(record)
+
+    @override
+    def flush(self) -> None:
+        """
+        Enqueues the summaries of the suppressed records.
+        """
+        if self.deduplicator is not None:
+            for summary in self.deduplicator.drain():
+                super().handle(summary)
+
+    @override
+    def close(self) -> None:
+        self._stopped.set()
+        super().close()
+
+    def report_drops(self) -> None:
+        """
+        Enqueues a warning with the number of records dropped since the last report.
+        """
+        records, size = self.budget.take_dropped()
+        if records:
+            super().handle(
+                logging.LogRecord(
+                    name=__name__,
+                    level=logging.WARNING,
+                    pathname="",
+                    lineno=0,
+                    msg=DROPS_MSG,
+                    args=(records, size),
+                    exc_info=None,
+                )
+            )
+
+    def _start_timer(self) -> None:
+        with self._timer_lock:
+            if self._timer is not None:
+                return
+            intervals = [self.report_interval] if self.report_interval > 0 else []
+            if self.deduplicator is not None:
+                intervals.append(self.deduplicator.window)
+            self._timer = threading.Thread(
+                target=self._run_timer, args=(min(intervals),), name="LogQueueTimer", daemon=True
+            )
+            self._timer.start()
+
+    def _run_timer(self, interval: float) -> None:
+        next_report = time.monotonic() + self.report_interval
+        while not self._stopped.wait(interval):
+            if self.deduplicator is not None:
+                for summary in self.deduplicator.expire():
+                    super().handle(summary)
+            if self.report_interval > 0 and time.monotonic() >= next_report:
+                next_report = time.monotonic() + self.report_interval
+                self.report_drops()
+
+    @override
+    def enqueue(self, record: QueueItem) -> None:
+        size = get_item_size(record)
+        if not self.budget.acquire(size):
+            if self.report_interval > 0 and self._timer is None:
+                self._start_timer()
+            return
+        try:
+            self.queue.put_nowait(record)
+        except BaseException:
+            self.budget.release(size)
+            raise
+
+    def get_stats(self) -> dict[str, int]:
+        """
+        Returns:
+                Byte budget statistics of the queue.
+        """
+        return self.budget.get_stats()
+
     @override
-    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord | bytes:
         """
         The parent class prepare method sets by default the attributes record.exc_info,
         record.exc_text, record.args the value None.
         The values of these attributes are used later in the logging process.
         """
+        if self.wire_format == "compact":
+            exceptions = None
+            if isinstance(self.formatter, JSONLogFormatter):
+                exceptions = self.formatter.render_exceptions(record)
+            return encode_record(record=record, exceptions=exceptions)
 
+        if self.keep_fragments and isinstance(self.formatter, JSONLogFormatter):
+            record = copy.copy(record)
+            record.json_fragments = self.formatter.get_fragments(record)
         record = super().prepare(record=record)
 
         record.exc_info = record.exc_info
         record.exc_text = record.exc_text
         record.args = record.args
+        record.__dict__.pop("request_event", None)
 
         return record
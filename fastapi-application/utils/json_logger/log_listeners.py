@@ -0,0 +1,299 @@
+"""
+Log listeners.
+"""
+
+import logging
+import queue
+import sys
+import threading
+import time
+import traceback
+from collections import deque
+from concurrent.futures import (
+    Executor,
+    Future,
+)
+from concurrent.futures.process import BrokenProcessPool
+from logging.handlers import QueueListener
+from typing import (
+    Literal,
+    Protocol,
+    override,
+)
+
+from core.config import settings
+from utils.json_logger.format_pool import (
+    PoolKind,
+    create_pool,
+    format_batch,
+)
+from utils.json_logger.json_log_formatter import (
+    JSONLogFormatter,
+    join_fragments,
+)
+from utils.json_logger.queue_budget import (
+    get_item_size,
+    get_queue_budget,
+)
+from utils.json_logger.wire import (
+    QueueItem,
+    WireRecord,
+    decode_record,
+)
+
+
+class LogQueue(Protocol):
+    """
+    Queue of the listener, a queue.Queue or a multiprocessing.Queue.
+    """
+
+    def get(self, block: bool = True, timeout: float | None = None) -> QueueItem | None: ...
+
+    def put_nowait(self, item: QueueItem | None) -> None: ...
+
+
+class SinkWorker:
+    """
+    Bounded queue and worker thread of a single handler.
+    """
+
+    _sentinel = None
+
+    def __init__(
+        self,
+        handler: logging.Handler,
+        maxsize: int,
+        overflow: Literal["block", "drop"],
+        block_timeout: float,
+        stop_timeout: float = settings.log_cfg.listener.stop_timeout,
+    ) -> None:
+        self.handler = handler
+        self.overflow = overflow
+        self.block_timeout = block_timeout
+        self.stop_timeout = stop_timeout
+        self.queue: queue.Queue[logging.LogRecord | None] = queue.Queue(maxsize=maxsize)
+        self.stats = {
+            "enqueued": 0,
+            "handled": 0,
+            "errors": 0,
+            "dropped": 0,
+            "blocked": 0,
+            "max_depth": 0,
+        }
+        self._thread: threading.Thread | None = None
+
+    def start(self) -> None:
+        name = self.handler.name or type(self.handler).__name__
+        self._thread = threading.Thread(target=self._run, name=f"SinkWorker-{name}", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        """
+        Stops the worker after the queued records, waiting for at most stop_timeout,
+        so a stuck handler doesn't hang the shutdown.
+        """
+        if self._thread is not None:
+            deadline = time.monotonic() + self.stop_timeout
+            try:
+                self.queue.put(self._sentinel, timeout=self.stop_timeout)
+            except queue.Full:
+                pass
+            self._thread.join(timeout=max(deadline - time.monotonic(), 0))
+            self._thread = None
+
+    def submit(self, record: logging.LogRecord) -> None:
+        """
+        Enqueues the record, a full queue blocks for at most block_timeout
+        with the block policy and drops the record with the drop policy.
+        """
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            if self.overflow == "drop":
+                self.stats["dropped"] += 1
+                return
+            self.stats["blocked"] += 1
+            try:
+                self.queue.put(record, timeout=self.block_timeout)
+            except queue.Full:
+                self.stats["dropped"] += 1
+                return
+
+        self.stats["enqueued"] += 1
+        self.stats["max_depth"] = max(self.stats["max_depth"], self.queue.qsize())
+
+    def _run(self) -> None:
+        while (record := self.queue.get()) is not self._sentinel:
+            try:
+                self.handler.handle(record)
+            except Exception:
+                self.stats["errors"] += 1
+                self.handler.handleError(record)
+            else:
+                self.stats["handled"] += 1
+
+
+class CustomQueueListener(QueueListener):
+    """
+    A subclass of QueueListener.
+    Records received in the compact wire format are decoded
+    and formatted once before being passed to the handlers.
+    In fanout mode each handler has its own bounded queue and worker thread,
+    so a slow handler doesn't hold back the others.
+    With format_workers set, batches of compact records are decoded, redacted
+    and formatted by a pool and written to the handlers in the order received.
+    The queue is read by a thread of the listener itself.
+    """
+
+    _sentinel = None
+    queue: LogQueue
+
+    def __init__(
+        self,
+        queue: LogQueue,
+        *handlers: logging.Handler,
+        respect_handler_level: bool = False,
+        fanout: bool = settings.log_cfg.listener.fanout,
+        format_workers: int = settings.log_cfg.listener.format_workers,
+        format_pool: PoolKind = settings.log_cfg.listener.format_pool,
+        format_batch_size: int = settings.log_cfg.listener.format_batch_size,
+    ) -> None:
+        super().__init__(queue, *handlers, respect_handler_level=respect_handler_level)
+        self.formatter = JSONLogFormatter()
+        self.budget = get_queue_budget(queue)
+        self.format_workers = format_workers
+        self.format_pool = format_pool
+        self.format_batch_size = format_batch_size
+        self.pool: Executor | None = None
+        self.sinks: list[SinkWorker] = []
+        self._listener_thread: threading.Thread | None = None
+        if fanout:
+            self.sinks = [
+                SinkWorker(
+                    handler=handler,
+                    maxsize=settings.log_cfg.listener.sink_queue_size,
+                    overflow=settings.log_cfg.listener.overflow,
+                    block_timeout=settings.log_cfg.listener.block_timeout,
+                )
+                for handler in handlers
+            ]
+
+    @override
+    def start(self) -> None:
+        for sink in self.sinks:
+            sink.start()
+        if self.format_workers > 0:
+            self.pool = create_pool(kind=self.format_pool, workers=self.format_workers)
+        self._listener_thread = threading.Thread(target=self._run, name="CustomQueueListener", daemon=True)
+        self._listener_thread.start()
+
+    @override
+    def stop(self) -> None:
+        if self._listener_thread is not None:
+            self.enqueue_sentinel()
+            self._listener_thread.join()
+            self._listener_thread = None
+        for sink in self.sinks:
+            sink.stop()
+        if self.pool is not None:
+            self.pool.shutdown()
+            self.pool = None
+
+    @override
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        if isinstance(record, WireRecord):
+            fragments = self.formatter.get_fragments(record)
+            record.json_fragments = fragments
+            record.msg = join_fragments(fragments)
+            record.message = record.msg
+            record.rendered_exceptions = None
+
+        return record
+
+    @override
+    def handle(self, record: logging.LogRecord) -> None:
+        self.dispatch(self.prepare(record))
+
+    def dispatch(self, record: logging.LogRecord) -> None:
+        """
+        Passes a prepared record to the handlers or to their queues in fanout mode.
+        """
+        if not self.sinks:
+            for handler in self.handlers:
+                if not self.respect_handler_level or record.levelno >= handler.level:
+                    handler.handle(record)
+            return
+
+        for sink in self.sinks:
+            if not self.respect_handler_level or record.levelno >= sink.handler.level:
+                sink.submit(record)
+
+    def _run(self) -> None:
+        """
+        Handles the records until the sentinel is received.
+        With a pool, up to two batches per worker are kept in flight
+        and their results are dispatched strictly in submission order.
+        """
+        pending: deque[Future[list[logging.LogRecord]]] = deque()
+        max_pending = self.format_workers * 2
+        stopped = False
+        while not stopped:
+            batch, stopped = self._dequeue_batch(block=not pending)
+            if self.pool is None:
+                for item in batch:
+                    self.handle(decode_record(item) if isinstance(item, bytes) else item)
+                continue
+            if batch:
+                pending.append(self._submit_batch(self.pool, batch))
+            elif pending and not stopped:
+                self._dispatch_batch(pending.popleft())
+            while pending and (stopped or pending[0].done() or len(pending) > max_pending):
+                self._dispatch_batch(pending.popleft())
+
+    def _dequeue_batch(self, block: bool) -> tuple[list[QueueItem], bool]:
+        """
+        Takes the items available in the queue, waiting only for the first one if block is true.
+        Returns:
+                Batch of items and whether the sentinel was received.
+        """
+        task_done = getattr(self.queue, "task_done", None)
+        batch: list[QueueItem] = []
+        while len(batch) < self.format_batch_size:
+            try:
+                item = self.queue.get(block)
+            except queue.Empty:
+                break
+            if task_done is not None:
+                task_done()
+            if item is self._sentinel:
+                return batch, True
+            self.budget.release(get_item_size(item))
+            batch.append(item)
+            block = False
+
+        return batch, False
+
+    def _submit_batch(self, pool: Executor, batch: list[QueueItem]) -> Future[list[logging.LogRecord]]:
+        try:
+            return pool.submit(format_batch, batch)
+        except BrokenProcessPool:
+            self.pool = create_pool(kind=self.format_pool, workers=self.format_workers)
+            return self.pool.submit(format_batch, batch)
+
+    def _dispatch_batch(self, future: Future[list[logging.LogRecord]]) -> None:
+        try:
+            records = future.result()
+        except Exception:
+            if logging.raiseExceptions:
+                traceback.print_exc(file=sys.stderr)
+            return
+
+        for record in records:
+            self.dispatch(record)
+
+    def get_stats(self) -> dict[str, dict[str, int]]:
+        """
+        Returns:
+                Queue statistics of each handler in fanout mode.
+        """
+        return {sink.handler.name or type(sink.handler).__name__: dict(sink.stats) for sink in self.sinks}
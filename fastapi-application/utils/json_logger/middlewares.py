@@ -5,6 +5,7 @@ Logging middleware.
 from time import time
 from math import ceil
 import logging
+from typing import Any
 
 from fastapi import (
     Request,
@@ -12,31 +13,43 @@ from fastapi import (
 )
 from starlette.middleware.base import RequestResponseEndpoint
 from starlette.background import BackgroundTask
+from starlette.concurrency import run_in_threadpool
 
 from core.config import settings
-from utils.json_logger.schemas import (
-    RequestJsonLog,
-    RequestSideSchema,
-    ResponseSideSchema,
+from utils.json_logger.debug_buffer import (
+    end_request_buffer,
+    start_request_buffer,
+)
+from utils.json_logger.events import (
+    RequestLogEvent,
+    RequestUri,
+)
+from utils.json_logger.profiling import start_request_profile
+from utils.json_logger.request_id import (
+    bind_request_id,
+    reset_request_id,
+)
+from utils.json_logger.route_metrics import route_metrics
+from utils.json_logger.routes import (
+    RouteMatcher,
+    route_templates,
+)
+from utils.json_logger.tracing import (
+    end_request_trace,
+    start_request_trace,
 )
 
 
-DEFAULT_HOST = settings.run.host
-DEFAULT_PORT = settings.run.port
-EMPTY_VALUE = ""
-PASS_ROUTES = settings.log_cfg.pass_routes
+PASS_ROUTES = RouteMatcher(settings.log_cfg.pass_routes)
+DEBUG_BUFFER = settings.log_cfg.debug_buffer
+ROUTE_METRICS = settings.log_cfg.route_metrics
+TRACING = settings.log_cfg.tracing
+REQUEST_ID_HEADER = settings.log_cfg.request_id_header
+PROFILING = settings.log_cfg.profiling
 
 logger = logging.getLogger("main")
 
 
-async def get_protocol(request: Request) -> str:
-    protocol = str(request.scope.get("type", ""))
-    http_version = str(request.scope.get("http_version", ""))
-    if protocol.lower() == "http" and http_version:
-        return f"{protocol.upper()}/{http_version}"
-    return EMPTY_VALUE
-
-
 async def log(
     req_body: bytes,
     res_body: bytes,
@@ -44,56 +57,45 @@ async def log(
     response: Response,
     duration: int,
     exception_object: BaseException | None,
+    route: str,
+    request_id: str,
+    trace: dict[str, Any] | None = None,
+    profile: dict[str, Any] | None = None,
 ) -> None:
     """
-    Initialises the fields of the RequestJsonLog schema and passes
+    Initialises the request log event and passes
     the object as an argument to the logger.
+    The uri, headers and message are built only if the record is emitted.
     """
     msg_type = "Response"
     log_level = 20
-    server: tuple = request.get("server", (DEFAULT_HOST, DEFAULT_PORT))
-    request_headers: dict = dict(request.headers.items())
-    response_headers = dict(response.headers.items())
+    response_headers = response.raw_headers
     if exception_object is not None:
         msg_type = "ERROR"
         log_level = 40
-        response_headers = {}
-    request_json_fields = RequestJsonLog(
-        request=RequestSideSchema(
-            request_uri=str(request.url),
-            request_referer=request_headers.get("referer", EMPTY_VALUE),
-            request_protocol=await get_protocol(request),
-            request_method=request.method,
-            request_path=request.url.path,
-            request_host=f"{server[0]}:{server[1]}",
-            request_size=int(request_headers.get("content-length", 0)),
-            request_content_type=request_headers.get("content-type", EMPTY_VALUE),
-            request_headers=dict(request_headers),
-            request_body=req_body,
-            request_direction="in",
-            remote_ip=request.client[0],
-            remote_port=request.client[1],
-        ),
-        response=ResponseSideSchema(
-            response_status_code=response.status_code,
-            response_size=int(response_headers.get("content-length", 0)),
-            response_headers=dict(response_headers),
-            response_body=res_body,
-        ),
+        response_headers = []
+    request_event = RequestLogEvent.from_scope(
+        scope=request.scope,
+        request_body=req_body,
+        response_status_code=response.status_code,
+        response_headers=response_headers,
+        response_body=res_body,
         duration=duration,
-    ).model_dump()
+        request_route=route,
+        trace=trace,
+        profile=profile,
+    )
     logger.log(
-        level=log_level,
-        msg="%s with code %s to '%s %s' in %s ms"
-        % (
-            msg_type,
-            response.status_code,
-            request.method,
-            request.url,
-            duration,
-        ),
+        log_level,
+        "%s with code %s to '%s %s' in %s ms",
+        msg_type,
+        response.status_code,
+        request_event.request_method,
+        RequestUri(request_event),
+        duration,
         extra={
-            "request_json_fields": request_json_fields,
+            "request_event": request_event,
+            "request_id": request_id,
         },
         exc_info=exception_object,
     )
@@ -111,35 +113,65 @@ class LoggingMiddleware:
         *args,
         **kwargs,
     ) -> Response:
+        if PASS_ROUTES and PASS_ROUTES.matches(request.scope["path"]):
+            return await call_next(request)
+
         start_time = time()
         exception_object = None
-        request_body = await request.body()
+        request_id, request_id_token = bind_request_id(request.headers.get(REQUEST_ID_HEADER))
+        buffer_token = start_request_buffer() if DEBUG_BUFFER.enabled else None
+        trace_token = start_request_trace() if TRACING.enabled else None
+        profiler = start_request_profile(request.headers, config=PROFILING) if PROFILING.enabled else None
+        response = None
         try:
-            response = await call_next(request)
-        except Exception as exc:
-            response_body: bytes = bytes("Internal Server Error".encode())
-            response = Response(
-                content=response_body,
-                status_code=500,
-            )
-            exception_object = exc
-        else:
-            chunks = []
-            async for chunk in response.body_iterator:
-                chunks.append(chunk)
-            response_body = b"".join(chunks)
-
-            response = Response(
-                content=response_body,
+            request_body = await request.body()
+            try:
+                response = await call_next(request)
+                chunks = []
+                async for chunk in response.body_iterator:
+                    chunks.append(chunk)
+                response_body = b"".join(chunks)
+            except Exception as exc:
+                response_body = bytes("Internal Server Error".encode())
+                response = Response(
+                    content=response_body,
+                    status_code=500,
+                )
+                exception_object = exc
+            else:
+                response = Response(
+                    content=response_body,
+                    status_code=response.status_code,
+                    headers=dict(response.headers),
+                    media_type=response.media_type,
+                )
+        finally:
+            if buffer_token is not None:
+                end_request_buffer(
+                    token=buffer_token,
+                    flush=response is None
+                    or exception_object is not None
+                    or response.status_code >= DEBUG_BUFFER.flush_status_code,
+                )
+            trace = None if trace_token is None else end_request_trace(trace_token)
+            if profiler is not None:
+                profiler.stop()
+            reset_request_id(request_id_token)
+            profile = None if profiler is None else await run_in_threadpool(profiler.summarize, request_id)
+
+        response.headers[REQUEST_ID_HEADER] = request_id
+        duration: int = ceil((time() - start_time) * 1000)
+        route = route_templates.resolve(request.scope)
+        if ROUTE_METRICS.enabled:
+            route_metrics.observe(
+                method=request.method,
+                route=route,
                 status_code=response.status_code,
-                headers=dict(response.headers),
-                media_type=response.media_type,
+                duration=duration,
             )
+            if ROUTE_METRICS.request_logs == "errors" and exception_object is None and response.status_code < 400:
+                return response
 
-        if request.url.path in PASS_ROUTES:
-            return response
-
-        duration: int = ceil((time() - start_time) * 1000)
         task = BackgroundTask(
             func=log,
             req_body=request_body,
@@ -148,6 +180,10 @@ class LoggingMiddleware:
             response=response,
             duration=duration,
             exception_object=exception_object,
+            route=route,
+            request_id=request_id,
+            trace=None if trace is None else trace.to_dict(),
+            profile=profile,
         )
         response.background = task
 
@@ -0,0 +1,262 @@
+"""
+This module contains the on-demand profiling of single requests.
+
+A request is profiled if it carries the profiling token in the profiling header
+or is picked by the sample rate. Only one request per process is profiled at a time,
+the profilers and tracemalloc see the other requests running concurrently as well.
+"""
+
+import cProfile
+import os
+import random
+import re
+import secrets
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter
+from collections.abc import Mapping
+from pathlib import Path
+from types import CodeType
+from typing import Any
+
+from core.config import (
+    ProfilingConfig,
+    settings,
+)
+
+UNSAFE_FILENAME_CHARS = re.compile(r"[^A-Za-z0-9_.-]")
+WORKER_THREAD_PREFIX = "AnyIO worker thread"
+IDLE_MODULES = frozenset(("threading.py", "queue.py"))
+
+_profiling = threading.Lock()
+
+
+def get_function_name(filename: str, line: int, name: str) -> str:
+    return f"{os.path.basename(filename)}:{line}({name})"
+
+
+def get_code_name(code: CodeType) -> str:
+    return get_function_name(code.co_filename, code.co_firstlineno, code.co_name)
+
+
+def should_profile(headers: Mapping[str, str], config: ProfilingConfig = settings.log_cfg.profiling) -> bool:
+    if config.token:
+        value = headers.get(config.header)
+        if value is not None and secrets.compare_digest(value.encode(), config.token.encode()):
+            return True
+    return config.sample_rate > 0 and random.random() < config.sample_rate
+
+
+class SamplingProfiler:
+    """
+    Samples the stacks of the thread that started it and of the worker threads
+    running the sync endpoints, idle worker threads are skipped.
+    """
+
+    def __init__(self, interval: float) -> None:
+        self.interval = interval
+        self.samples = 0
+        self.stacks: Counter[tuple[str, ...]] = Counter()
+        self._target = threading.get_ident()
+        self._stopped = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    def start(self) -> None:
+        self._thread = threading.Thread(target=self._run, name="RequestSampler", daemon=True)
+        self._thread.start()
+
+    def stop(self, wait: bool = True) -> None:
+        """
+        Args:
+            wait: If false, the sampler thread is only signalled to stop.
+        """
+        self._stopped.set()
+        if wait and self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def get_top(self, top_n: int) -> list[dict[str, Any]]:
+        """
+        Returns:
+                Functions with the most samples on the top of the stack.
+        """
+        own: Counter[str] = Counter()
+        total: Counter[str] = Counter()
+        for stack, count in self.stacks.items():
+            own[stack[-1]] += count
+            for function in set(stack):
+                total[function] += count
+
+        return [
+            {"function": function, "self": count, "total": total[function]}
+            for function, count in own.most_common(top_n)
+        ]
+
+    def dump(self, path: Path) -> None:
+        """
+        Writes the samples as folded stacks, the input format of flame graph tools.
+        """
+        with open(path, "w", encoding="utf-8") as out_f:
+            for stack, count in self.stacks.items():
+                out_f.write(f"{';'.join(stack)} {count}\n")
+
+    def _get_thread_ids(self) -> set[int]:
+        thread_ids = {self._target}
+        for thread in threading.enumerate():
+            if thread.name.startswith(WORKER_THREAD_PREFIX) and thread.ident is not None:
+                thread_ids.add(thread.ident)
+        return thread_ids
+
+    def _run(self) -> None:
+        while not self._stopped.wait(self.interval):
+            frames = sys._current_frames()
+            for thread_id in self._get_thread_ids():
+                frame = frames.get(thread_id)
+                if frame is None:
+                    continue
+                if thread_id != self._target and os.path.basename(frame.f_code.co_filename) in IDLE_MODULES:
+                    continue
+                stack = []
+                while frame is not None:
+                    stack.append(get_code_name(frame.f_code))
+                    frame = frame.f_back
+                stack.reverse()
+                self.stacks[tuple(stack)] += 1
+                self.samples += 1
+
+
+class RequestProfiler:
+    """
+    Profiler of a single request.
+    stop only disables the profilers, so it can run on the event loop,
+    summarize collects the profile in a worker thread and frees the profiling slot.
+    """
+
+    def __init__(self, config: ProfilingConfig = settings.log_cfg.profiling) -> None:
+        self.config = config
+        self.started = 0.0
+        self.duration = 0.0
+        self._profile: cProfile.Profile | None = None
+        self._sampler: SamplingProfiler | None = None
+        self._tracemalloc = False
+
+    def start(self) -> bool:
+        """
+        Returns:
+                False if another request is being profiled.
+        """
+        if not _profiling.acquire(blocking=False):
+            return False
+        try:
+            if self.config.mode == "sampling":
+                self._sampler = SamplingProfiler(interval=self.config.sample_interval)
+                self._sampler.start()
+            else:
+                self._profile = cProfile.Profile()
+                self._profile.enable()
+        except ValueError:
+            _profiling.release()
+            return False
+
+        if self.config.tracemalloc and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._tracemalloc = True
+        self.started = time.perf_counter()
+        return True
+
+    def stop(self) -> None:
+        """
+        Stops profiling without waiting for the sampler thread.
+        """
+        self.duration = time.perf_counter() - self.started
+        if self._profile is not None:
+            self._profile.disable()
+        if self._sampler is not None:
+            self._sampler.stop(wait=False)
+
+    def summarize(self, request_id: str) -> dict[str, Any]:
+        """
+        Collects the profile of a stopped profiler and frees the profiling slot.
+        Blocks on the sampler thread, tracemalloc and the profile file.
+        Args:
+            request_id: Id of the request, used in the name of the profile file.
+
+        Returns:
+                Compact summary of the profile.
+        """
+        try:
+            summary: dict[str, Any] = {"mode": self.config.mode, "duration_ms": round(self.duration * 1000, 3)}
+            if self._sampler is not None:
+                self._sampler.stop()
+                summary["samples"] = self._sampler.samples
+                summary["top"] = self._sampler.get_top(self.config.top_n)
+            else:
+                assert self._profile is not None
+                summary["top"] = self._get_profile_top(self._profile)
+            if self._tracemalloc:
+                summary["allocations"] = self._get_allocations()
+            if self.config.write_files:
+                summary["file"] = str(self._write_file(request_id))
+        finally:
+            if self._tracemalloc:
+                tracemalloc.stop()
+                self._tracemalloc = False
+            _profiling.release()
+
+        return summary
+
+    def _get_profile_top(self, profile: cProfile.Profile) -> list[dict[str, Any]]:
+        profile.create_stats()
+        top = sorted(profile.stats.items(), key=lambda item: item[1][2], reverse=True)[: self.config.top_n]
+        return [
+            {
+                "function": get_function_name(*function),
+                "calls": calls,
+                "self_ms": round(own_time * 1000, 3),
+                "total_ms": round(total_time * 1000, 3),
+            }
+            for function, (_, calls, own_time, total_time, _) in top
+        ]
+
+    def _get_allocations(self) -> dict[str, Any]:
+        _, peak = tracemalloc.get_traced_memory()
+        snapshot = tracemalloc.take_snapshot().filter_traces((tracemalloc.Filter(False, tracemalloc.__file__),))
+        return {
+            "peak_kb": round(peak / 1024, 1),
+            "top": [
+                {
+                    "location": f"{os.path.basename(stat.traceback[0].filename)}:{stat.traceback[0].lineno}",
+                    "size_kb": round(stat.size / 1024, 1),
+                    "count": stat.count,
+                }
+                for stat in snapshot.statistics("lineno")[: self.config.top_n]
+            ],
+        }
+
+    def _write_file(self, request_id: str) -> Path:
+        self.config.directory.mkdir(parents=True, exist_ok=True)
+        name = f"{int(time.time())}-{UNSAFE_FILENAME_CHARS.sub('_', request_id)[:64]}"
+        if self._sampler is not None:
+            path = self.config.directory / f"{name}.folded"
+            self._sampler.dump(path)
+        else:
+            assert self._profile is not None
+            path = self.config.directory / f"{name}.prof"
+            self._profile.dump_stats(path)
+        return path
+
+
+def start_request_profile(
+    headers: Mapping[str, str],
+    config: ProfilingConfig = settings.log_cfg.profiling,
+) -> RequestProfiler | None:
+    """
+    Returns:
+            Started profiler if the request is to be profiled, otherwise None.
+    """
+    if not should_profile(headers, config=config):
+        return None
+    profiler = RequestProfiler(config=config)
+    return profiler if profiler.start() else None
@@ -0,0 +1,142 @@
+"""
+This module contains the byte budget of the log queue.
+"""
+
+import logging
+import threading
+import time
+from typing import Literal
+from weakref import WeakKeyDictionary
+
+from core.config import settings
+from utils.json_logger.debug_buffer import RECORD_OVERHEAD
+from utils.json_logger.json_log_formatter import Fragments
+
+_budgets: WeakKeyDictionary[object, "QueueBudget"] = WeakKeyDictionary()
+_budgets_lock = threading.Lock()
+
+
+def get_fragments_size(fragments: Fragments) -> int:
+    return sum(len(value) if isinstance(value, str) else get_fragments_size(value) for value in fragments.values())
+
+
+def get_item_size(item: logging.LogRecord | bytes) -> int:
+    """
+    Size of the prepared payload of a queue item, computed the same way
+    by the queue handler and by the listener. The message of a prepared record
+    is the serialized log, bodies of the request and response included.
+    """
+    if isinstance(item, bytes):
+        return len(item)
+    size = RECORD_OVERHEAD + len(str(item.msg))
+    fragments = getattr(item, "json_fragments", None)
+    if fragments is not None:
+        size += get_fragments_size(fragments)
+
+    return size
+
+
+class QueueBudget:
+    """
+    Tracks the bytes and records in flight between a queue handler and its listener.
+    When max_bytes or max_records is exceeded, new records are dropped or wait for
+    at most block_timeout, depending on the overflow policy.
+    A record is always accepted by an empty queue, however large it is.
+    The records dropped since the last report are returned by take_dropped.
+    """
+
+    def __init__(
+        self,
+        max_bytes: int = settings.log_cfg.queue_budget.max_bytes,
+        max_records: int = settings.log_cfg.queue_budget.max_records,
+        overflow: Literal["block", "drop"] = settings.log_cfg.queue_budget.overflow,
+        block_timeout: float = settings.log_cfg.queue_budget.block_timeout,
+    ) -> None:
+        self.max_bytes = max_bytes
+        self.max_records = max_records
+        self.overflow = overflow
+        self.block_timeout = block_timeout
+        self.in_flight_bytes = 0
+        self.in_flight_records = 0
+        self._unreported = (0, 0)
+        self._cond = threading.Condition()
+        self._stats = {
+            "enqueued_records": 0,
+            "enqueued_bytes": 0,
+            "dropped_records": 0,
+            "dropped_bytes": 0,
+            "blocked": 0,
+            "max_in_flight_bytes": 0,
+        }
+
+    def acquire(self, size: int) -> bool:
+        """
+        Reserves the size of a record.
+        Returns:
+                False if the record doesn't fit into the budget and must be dropped.
+        """
+        with self._cond:
+            if not self._fits(size):
+                if self.overflow == "block":
+                    self._stats["blocked"] += 1
+                    deadline = time.monotonic() + self.block_timeout
+                    while not self._fits(size) and (remaining := deadline - time.monotonic()) > 0:
+                        self._cond.wait(remaining)
+                if not self._fits(size):
+                    self._stats["dropped_records"] += 1
+                    self._stats["dropped_bytes"] += size
+                    self._unreported = (self._unreported[0] + 1, self._unreported[1] + size)
+                    return False
+
+            self.in_flight_bytes += size
+            self.in_flight_records += 1
+            self._stats["enqueued_records"] += 1
+            self._stats["enqueued_bytes"] += size
+            self._stats["max_in_flight_bytes"] = max(self._stats["max_in_flight_bytes"], self.in_flight_bytes)
+            return True
+
+    def release(self, size: int) -> None:
+        """
+        Returns the size of a record taken from the queue to the budget.
+        """
+        with self._cond:
+            self.in_flight_bytes = max(0, self.in_flight_bytes - size)
+            self.in_flight_records = max(0, self.in_flight_records - 1)
+            self._cond.notify_all()
+
+    def take_dropped(self) -> tuple[int, int]:
+        """
+        Returns:
+                Number and bytes of the records dropped since the last call.
+        """
+        with self._cond:
+            dropped, self._unreported = self._unreported, (0, 0)
+            return dropped
+
+    def get_stats(self) -> dict[str, int]:
+        with self._cond:
+            return self._stats | {
+                "in_flight_bytes": self.in_flight_bytes,
+                "in_flight_records": self.in_flight_records,
+                "max_bytes": self.max_bytes,
+                "max_records": self.max_records,
+            }
+
+    def _fits(self, size: int) -> bool:
+        if not self.in_flight_records:
+            return True
+        if 0 < self.max_records <= self.in_flight_records:
+            return False
+        return self.max_bytes <= 0 or self.in_flight_bytes + size <= self.max_bytes
+
+
+def get_queue_budget(queue: object) -> QueueBudget:
+    """
+    Returns the budget shared by the queue handler and the listener of the queue.
+    """
+    with _budgets_lock:
+        budget = _budgets.get(queue)
+        if budget is None:
+            budget = _budgets[queue] = QueueBudget()
+
+        return budget
@@ -0,0 +1,49 @@
+"""
+This module contains the id of the current request.
+"""
+
+import logging
+import uuid
+from contextvars import (
+    ContextVar,
+    Token,
+)
+
+MAX_REQUEST_ID_LENGTH = 128
+
+_request_id: ContextVar[str | None] = ContextVar("request_id", default=None)
+
+
+def get_request_id() -> str | None:
+    return _request_id.get()
+
+
+def bind_request_id(request_id: str | None = None) -> tuple[str, Token[str | None]]:
+    """
+    Binds the id to the current request context.
+    Args:
+        request_id: Id received from the client, a new one is generated if it is missing or too long.
+
+    Returns:
+            The bound id and the token for restoring the previous context value.
+    """
+    if not request_id or len(request_id) > MAX_REQUEST_ID_LENGTH:
+        request_id = uuid.uuid4().hex
+    return request_id, _request_id.set(request_id)
+
+
+def reset_request_id(token: Token[str | None]) -> None:
+    _request_id.reset(token)
+
+
+class RequestIdFilter(logging.Filter):
+    """
+    Adds the id of the current request to the records emitted during the request.
+    """
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if getattr(record, "request_id", None) is None:
+            request_id = _request_id.get()
+            if request_id is not None:
+                record.request_id = request_id
+        return True
@@ -0,0 +1,104 @@
+"""
+This module contains the in-process latency histograms of the routes
+and their periodic summary records.
+"""
+
+import asyncio
+import logging
+import time
+from typing import Any
+
+from core.config import settings
+from utils.json_logger.histogram import LogLinearHistogram
+
+OTHER_ROUTES = "(other)"
+SUMMARY_QUANTILES = (0.5, 0.95, 0.99)
+
+logger = logging.getLogger("main")
+
+MetricsKey = tuple[str, str, str]
+
+
+def get_status_class(status_code: int) -> str:
+    return f"{status_code // 100}xx"
+
+
+class RouteMetrics:
+    """
+    Latency histograms by method, route template and status class.
+    Histograms are updated without locks, drain swaps the whole table,
+    so an observation racing with it is counted in the next interval at worst.
+    """
+
+    def __init__(self, max_routes: int = settings.log_cfg.route_metrics.max_routes) -> None:
+        self.max_routes = max_routes
+        self._histograms: dict[MetricsKey, LogLinearHistogram] = {}
+        self._started = time.time()
+
+    def observe(self, method: str, route: str, status_code: int, duration: int) -> None:
+        histograms = self._histograms
+        key = (method, route, get_status_class(status_code))
+        histogram = histograms.get(key)
+        if histogram is None:
+            if len(histograms) >= self.max_routes:
+                key = (method, OTHER_ROUTES, key[2])
+                histogram = histograms.get(key)
+            if histogram is None:
+                histogram = histograms.setdefault(key, LogLinearHistogram())
+        histogram.record(duration)
+
+    def drain(self) -> dict[str, Any] | None:
+        """
+        Returns:
+                Summary of the interval since the previous drain or None if nothing was observed.
+        """
+        histograms, self._histograms = self._histograms, {}
+        started, self._started = self._started, time.time()
+        if not histograms:
+            return None
+
+        routes = []
+        for (method, route, status_class), histogram in histograms.items():
+            routes.append(
+                {
+                    "method": method,
+                    "route": route,
+                    "status_class": status_class,
+                    "count": histogram.count,
+                    **{f"p{round(q * 100)}": histogram.quantile(q) for q in SUMMARY_QUANTILES},
+                    "latency_ms": histogram.to_dict(),
+                }
+            )
+
+        return {
+            "interval": round(self._started - started, 3),
+            "routes": routes,
+        }
+
+    def emit(self) -> None:
+        summary = self.drain()
+        if summary is not None:
+            logger.info(
+                "Route latency summary of %s routes",
+                len(summary["routes"]),
+                extra={"route_summary": summary},
+            )
+
+
+route_metrics = RouteMetrics()
+
+
+async def emit_route_summaries(
+    metrics: RouteMetrics = route_metrics,
+    interval: float = settings.log_cfg.route_metrics.interval,
+) -> None:
+    """
+    Emits a summary record every interval through the logging pipeline
+    and the last one when the task is cancelled.
+    """
+    try:
+        while True:
+            await asyncio.sleep(interval)
+            metrics.emit()
+    finally:
+        metrics.emit()
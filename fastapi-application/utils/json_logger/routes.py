@@ -0,0 +1,127 @@
+"""
+This module contains the matching of the routes excluded from logging
+and the resolution of the route templates.
+"""
+
+import fnmatch
+import re
+from collections.abc import Sequence
+from typing import Any
+
+from starlette.routing import Match
+from starlette.types import Scope
+
+from core.config import settings
+
+GLOB_CHARS = frozenset("*?[")
+UNMATCHED_ROUTE = "(unmatched)"
+_END = ""
+
+
+class RouteMatcher:
+    """
+    Matches request paths against exact paths, prefixes and glob patterns.
+    Exact paths are looked up in a set, patterns whose only wildcard is
+    a trailing * are stored in a prefix trie, other globs are combined
+    into one regular expression.
+    """
+
+    def __init__(self, patterns: Sequence[str] = settings.log_cfg.pass_routes) -> None:
+        self._exact: set[str] = set()
+        self._trie: dict[str, Any] = {}
+        globs = []
+        for pattern in patterns:
+            wildcards = GLOB_CHARS.intersection(pattern)
+            if not wildcards:
+                self._exact.add(pattern)
+            elif wildcards == {"*"} and pattern.index("*") == len(pattern) - 1:
+                self._add_prefix(pattern[:-1])
+            else:
+                globs.append(fnmatch.translate(pattern))
+        self._glob = re.compile("|".join(globs)) if globs else None
+
+    def __bool__(self) -> bool:
+        return bool(self._exact or self._trie or self._glob)
+
+    def matches(self, path: str) -> bool:
+        if path in self._exact:
+            return True
+        if self._trie and self._matches_prefix(path):
+            return True
+        return self._glob is not None and self._glob.match(path) is not None
+
+    def _add_prefix(self, prefix: str) -> None:
+        node = self._trie
+        for char in prefix:
+            node = node.setdefault(char, {})
+        node[_END] = True
+
+    def _matches_prefix(self, path: str) -> bool:
+        node = self._trie
+        for char in path:
+            if _END in node:
+                return True
+            child = node.get(char)
+            if child is None:
+                return False
+            node = child
+        return _END in node
+
+
+def get_scope_template(scope: Scope) -> str | None:
+    """
+    Returns:
+            Template of the route set by the router in the scope. Newer FastAPI versions keep
+            the route of an included router as declared and its full path in the effective route context.
+    """
+    context = (scope.get("fastapi") or {}).get("effective_route_context")
+    path_format: str | None = getattr(context, "path_format", None)
+    if path_format is None:
+        path_format = getattr(scope.get("route"), "path_format", None)
+    return path_format
+
+
+class RouteTemplates:
+    """
+    Resolves the template of the route matched by a request, e.g. /user/{user_id}.
+    The route set by the router in the scope is used if present, otherwise
+    the routes of the application are matched once per path and the result is cached.
+    """
+
+    def __init__(self, max_size: int = 4096) -> None:
+        self.max_size = max_size
+        self._cache: dict[tuple[str, str], str] = {}
+
+    def resolve(self, scope: Scope) -> str:
+        template = get_scope_template(scope)
+        if template is not None:
+            return template
+
+        key = (scope.get("method", ""), scope["path"])
+        template = self._cache.get(key)
+        if template is None:
+            template = self._match(scope)
+            if len(self._cache) >= self.max_size:
+                self._cache.clear()
+            self._cache[key] = template
+
+        return template
+
+    @staticmethod
+    def _match(scope: Scope) -> str:
+        router = getattr(scope.get("app"), "router", None)
+        partial = None
+        for route in getattr(router, "routes", ()):
+            match, child_scope = route.matches(scope)
+            if match == Match.NONE:
+                continue
+            template = get_scope_template(child_scope) or getattr(route, "path_format", None)
+            if match == Match.FULL:
+                return template or UNMATCHED_ROUTE
+            if partial is None:
+                partial = template
+
+        return partial or UNMATCHED_ROUTE
+
+
+route_templates = RouteTemplates()
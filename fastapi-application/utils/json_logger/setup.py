@@ -16,6 +16,15 @@ def setup_logging(
     to_file: bool = settings.log_cfg.to_file,
     cfg_yaml: Path = settings.log_cfg.default_log_cfg_yaml,
     env: str = settings.api.environment,
+    debug_buffer: bool = settings.log_cfg.debug_buffer.enabled,
+    bulk_http: bool = settings.log_cfg.bulk_http.enabled,
+    socket_stream: bool = settings.log_cfg.socket_stream.enabled,
+    buffered_stdout: bool = settings.log_cfg.stdout.buffered,
+    spill: bool = settings.log_cfg.spill.enabled,
+    format_pool: bool = settings.log_cfg.listener.format_workers > 0,
+    projections: dict[str, str] = settings.log_cfg.projection.handlers,
+    sharded_files: bool = settings.log_cfg.sharded_files,
+    flight_recorder: bool = settings.log_cfg.flight_recorder.enabled,
 ) -> None:
     """
     Basic logging setup.
@@ -25,16 +34,96 @@ def setup_logging(
         to_file: If true, the logs are written to the file.
         cfg_yaml: Yaml file with settings for logging.
         env: By default dev.
+        debug_buffer: If true, records below the log level are buffered per request
+                      and written only if the request fails.
+        bulk_http: If true, the logs are sent to the bulk HTTP endpoint.
+        socket_stream: If true, the logs are streamed to the log agent socket.
+        buffered_stdout: If true, the console handler writes batches of records
+                         to the stdout file descriptor.
+        spill: If true, the handlers listed in the spill settings are wrapped
+               with a disk spill buffer.
+        format_pool: If true and the compact wire format is used, the sensitive data
+                     is redacted by the formatting pool of the listener instead of the queue handler.
+        projections: Handler names mapped to the projection profiles of their formatters.
+        sharded_files: If true, every process writes and rotates log files of its own,
+                       e.g. info_log.<pid>.jsonl.
+        flight_recorder: If true, the last formatted records are kept in memory
+                         for the debug route.
     """
     level = "DEBUG" if env == "dev" else log_level
     with open(cfg_yaml, "rt") as in_f:
         config = yaml.safe_load(in_f)
     config["loggers"]["main"]["level"] = level
 
+    if debug_buffer and level != "DEBUG":
+        config["loggers"]["main"]["level"] = "DEBUG"
+        config["handlers"]["queue_handler"]["."] = {
+            "buffer_level": logging.getLevelNamesMapping()[level],
+        }
+
     if to_file:
         log_dir.mkdir(exist_ok=True)
         config["handlers"]["queue_handler"]["handlers"].extend(
             ["info_file_handler", "error_file_handler"]
         )
+        if sharded_files:
+            for name in ("info_file_handler", "error_file_handler"):
+                config["handlers"][name]["class"] = "utils.json_logger.sinks.ShardedRotatingFileHandler"
+
+    if buffered_stdout:
+        config["handlers"]["console"] = {
+            "class": "utils.json_logger.sinks.BufferedStdoutHandler",
+            "level": config["handlers"]["console"].get("level", "NOTSET"),
+        }
+
+    if bulk_http:
+        config["handlers"]["bulk_http_handler"] = {
+            "class": "utils.json_logger.sinks.BulkHTTPHandler",
+            "level": settings.log_cfg.bulk_http.level,
+        }
+        config["handlers"]["queue_handler"]["handlers"].append("bulk_http_handler")
+
+    if socket_stream:
+        config["handlers"]["socket_stream_handler"] = {
+            "class": "utils.json_logger.sinks.SocketStreamHandler",
+            "level": settings.log_cfg.socket_stream.level,
+        }
+        config["handlers"]["queue_handler"]["handlers"].append("socket_stream_handler")
+
+    if flight_recorder:
+        config["handlers"]["flight_recorder"] = {
+            "class": "utils.json_logger.sinks.FlightRecorderHandler",
+            "level": "DEBUG",
+        }
+        config["handlers"]["queue_handler"]["handlers"].append("flight_recorder")
+
+    if spill:
+        queue_handlers = config["handlers"]["queue_handler"]["handlers"]
+        for name in settings.log_cfg.spill.handlers:
+            if name not in queue_handlers:
+                continue
+            config["handlers"][f"spill_{name}"] = {
+                "class": "utils.json_logger.sinks.SpillHandler",
+                "level": config["handlers"][name].get("level", "NOTSET"),
+                "target": name,
+                "directory": str(settings.log_cfg.spill.directory / name),
+            }
+            queue_handlers[queue_handlers.index(name)] = f"spill_{name}"
+
+    for name, profile in projections.items():
+        if name not in config["handlers"]:
+            continue
+        formatter = f"projection_{profile}"
+        config["formatters"][formatter] = {
+            "()": "utils.json_logger.json_log_formatter.ProjectionFormatter",
+            "profile": profile,
+        }
+        config["handlers"][name]["formatter"] = formatter
+    if projections:
+        config["handlers"]["queue_handler"].setdefault(".", {})["keep_fragments"] = True
+
+    if format_pool and settings.log_cfg.wire_format == "compact":
+        queue_filters = config["handlers"]["queue_handler"]["filters"]
+        config["handlers"]["queue_handler"]["filters"] = [name for name in queue_filters if name != "sensitive_data"]
 
     logging.config.dictConfig(config)
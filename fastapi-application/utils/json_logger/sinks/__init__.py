@@ -0,0 +1,17 @@
+__all__ = (
+    "BatchingHandler",
+    "BufferedStdoutHandler",
+    "BulkHTTPHandler",
+    "FlightRecorderHandler",
+    "ShardedRotatingFileHandler",
+    "SocketStreamHandler",
+    "SpillHandler",
+)
+
+from utils.json_logger.sinks.base import BatchingHandler
+from utils.json_logger.sinks.flight_recorder import FlightRecorderHandler
+from utils.json_logger.sinks.http_bulk import BulkHTTPHandler
+from utils.json_logger.sinks.sharded_file import ShardedRotatingFileHandler
+from utils.json_logger.sinks.socket_stream import SocketStreamHandler
+from utils.json_logger.sinks.spill import SpillHandler
+from utils.json_logger.sinks.stdout import BufferedStdoutHandler
@@ -0,0 +1,234 @@
+"""
+This module contains the base class of the batching sinks.
+"""
+
+import logging
+import random
+import threading
+import time
+from abc import (
+    ABC,
+    abstractmethod,
+)
+from collections import deque
+from typing import override
+
+
+class PartialSendError(Exception):
+    """
+    Raised by send_batch if the destination accepted only a part of a batch.
+    """
+
+    def __init__(self, failed: list[str], rejected: int = 0, sent: int = 0) -> None:
+        super().__init__(f"{len(failed) + rejected} records of the batch were not accepted")
+        self.failed = failed
+        self.rejected = rejected
+        self.sent = sent
+
+
+class BatchingHandler(logging.Handler, ABC):
+    """
+    Accumulates formatted records into batches bounded by count, bytes and time.
+    Batches are sent by worker threads, so emit never blocks on the destination.
+    Failed batches are retried with exponential backoff, when the pending
+    batches exceed max_pending_records the oldest ones are dropped.
+    Once the handler is closing, failed batches are no longer retried,
+    so shutdown is not held up by an unavailable destination.
+    If send_batch raises PartialSendError, only the failed records are retried
+    and the rejected ones are dropped.
+    """
+
+    def __init__(
+        self,
+        max_batch_records: int = 500,
+        max_batch_bytes: int = 5242880,
+        flush_interval: float = 1.0,
+        max_pending_records: int = 100000,
+        workers: int = 1,
+        max_retries: int = 5,
+        backoff: float = 0.5,
+        max_backoff: float = 30.0,
+        level: int = logging.NOTSET,
+    ) -> None:
+        super().__init__(level=level)
+        self.max_batch_records = max_batch_records
+        self.max_batch_bytes = max_batch_bytes
+        self.flush_interval = flush_interval
+        self.max_pending_records = max_pending_records
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self._batch: list[str] = []
+        self._batch_bytes = 0
+        self._batch_started = 0.0
+        self._pending: deque[list[str]] = deque()
+        self._pending_records = 0
+        self._in_progress = 0
+        self._closing = False
+        self._closed = False
+        self._cond = threading.Condition()
+        self._stats = {
+            "records": 0,
+            "batches_sent": 0,
+            "records_sent": 0,
+            "bytes_sent": 0,
+            "retries": 0,
+            "records_dropped": 0,
+        }
+        self._workers = [
+            threading.Thread(target=self._run, name=f"{type(self).__name__}-{i}", daemon=True) for i in range(workers)
+        ]
+        for worker in self._workers:
+            worker.start()
+
+    @abstractmethod
+    def send_batch(self, lines: list[str]) -> int:
+        """
+        Sends a batch of formatted records to the destination.
+        Args:
+            lines: Formatted records.
+
+        Returns:
+                Number of bytes sent.
+        """
+
+    def is_retryable(self, exc: Exception) -> bool:
+        return True
+
+    def worker_stopped(self) -> None:
+        """
+        Called by each worker thread before it exits.
+        """
+
+    def get_stats(self) -> dict[str, int]:
+        with self._cond:
+            return self._stats | {
+                "pending_records": self._pending_records + len(self._batch),
+            }
+
+    def is_backlogged(self) -> bool:
+        """
+        Returns true if the sink can't keep up with the incoming records.
+        """
+        with self._cond:
+            return self._pending_records + len(self._batch) >= self.max_pending_records
+
+    @override
+    def emit(self, record: logging.LogRecord) -> None:
+        try:
+            line = self.format(record)
+        except Exception:
+            self.handleError(record)
+            return
+
+        with self._cond:
+            if self._closed:
+                return
+            if not self._batch:
+                self._batch_started = time.monotonic()
+            self._batch.append(line)
+            self._batch_bytes += len(line) + 1
+            self._stats["records"] += 1
+            if len(self._batch) >= self.max_batch_records or self._batch_bytes >= self.max_batch_bytes:
+                self._seal_batch()
+
+    @override
+    def flush(self, timeout: float | None = None) -> None:
+        """
+        Sends the current batch and waits until the pending batches are sent.
+        Args:
+            timeout: Seconds to wait, flush_interval * 5 by default.
+        """
+        deadline = time.monotonic() + (self.flush_interval * 5 if timeout is None else timeout)
+        with self._cond:
+            if self._batch:
+                self._seal_batch()
+            while self._pending or self._in_progress:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                self._cond.wait(remaining)
+
+    @override
+    def close(self) -> None:
+        with self._cond:
+            self._closing = True
+            self._cond.notify_all()
+        self.flush()
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        for worker in self._workers:
+            worker.join(timeout=self.flush_interval)
+        super().close()
+
+    def _seal_batch(self) -> None:
+        self._pending.append(self._batch)
+        self._pending_records += len(self._batch)
+        self._batch = []
+        self._batch_bytes = 0
+        while self._pending_records > self.max_pending_records and len(self._pending) > 1:
+            dropped = self._pending.popleft()
+            self._pending_records -= len(dropped)
+            self._stats["records_dropped"] += len(dropped)
+        self._cond.notify_all()
+
+    def _next_batch(self) -> list[str] | None:
+        with self._cond:
+            while not self._pending:
+                if self._closed:
+                    return None
+                timeout = self.flush_interval
+                if self._batch:
+                    age = time.monotonic() - self._batch_started
+                    if age >= self.flush_interval:
+                        self._seal_batch()
+                        break
+                    timeout -= age
+                self._cond.wait(timeout)
+            lines = self._pending.popleft()
+            self._pending_records -= len(lines)
+            self._in_progress += 1
+            return lines
+
+    def _run(self) -> None:
+        while (lines := self._next_batch()) is not None:
+            records, sent = self._send_with_retries(lines)
+            with self._cond:
+                self._in_progress -= 1
+                self._stats["records_dropped"] += len(lines) - records
+                if records:
+                    self._stats["batches_sent"] += 1
+                    self._stats["records_sent"] += records
+                    self._stats["bytes_sent"] += sent
+                self._cond.notify_all()
+        self.worker_stopped()
+
+    def _send_with_retries(self, lines: list[str]) -> tuple[int, int]:
+        """
+        Returns:
+                Number of records and bytes sent.
+        """
+        records = sent = 0
+        error: Exception
+        for attempt in range(self.max_retries + 1):
+            try:
+                return records + len(lines), sent + self.send_batch(lines)
+            except PartialSendError as exc:
+                records += len(lines) - len(exc.failed) - exc.rejected
+                sent += exc.sent
+                lines = exc.failed
+                if not lines:
+                    break
+                error = exc
+            except Exception as exc:
+                error = exc
+            if attempt == self.max_retries or not self.is_retryable(error) or self._closing:
+                break
+            delay = min(self.max_backoff, self.backoff * 2**attempt)
+            with self._cond:
+                self._stats["retries"] += 1
+                if self._cond.wait_for(lambda: self._closing, timeout=random.uniform(delay / 2, delay)):
+                    break
+
+        return records, sent
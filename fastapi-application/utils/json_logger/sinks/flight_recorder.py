@@ -0,0 +1,133 @@
+"""
+This module contains the in-memory flight recorder of the formatted records.
+"""
+
+import json
+import logging
+import sys
+from collections import deque
+from typing import (
+    NamedTuple,
+    override,
+)
+
+from core.config import settings
+
+ENTRY_OVERHEAD = 120
+
+
+class RecorderEntry(NamedTuple):
+    levelno: int
+    request_id: str | None
+    line: str
+    size: int
+
+
+def has_request_path(line: str, path: str) -> bool:
+    """
+    Checks the request path and route template of a formatted record.
+    """
+    try:
+        request = json.loads(line).get("request")
+    except (ValueError, AttributeError):
+        return False
+    if not isinstance(request, dict):
+        return False
+    return path in (request.get("request_path"), request.get("request_route"))
+
+
+class FlightRecorderHandler(logging.Handler):
+    """
+    Ring buffer of the last formatted records of the process.
+    The oldest records are evicted when max_records or max_bytes is exceeded.
+    Records are appended only by the listener, so handle takes no lock,
+    readers query a copy of the buffer. Only the level and the request id
+    are extracted on append, the path is matched against the formatted record on query.
+    """
+
+    def __init__(
+        self,
+        max_records: int = settings.log_cfg.flight_recorder.max_records,
+        max_bytes: int = settings.log_cfg.flight_recorder.max_bytes,
+        level: int | str = logging.NOTSET,
+    ) -> None:
+        super().__init__(level)
+        self.max_records = max_records
+        self.max_bytes = max_bytes
+        self.size = 0
+        self.evicted = 0
+        self._entries: deque[RecorderEntry] = deque()
+
+    @override
+    def handle(self, record: logging.LogRecord) -> bool:
+        rv = self.filter(record)
+        if isinstance(rv, logging.LogRecord):
+            record = rv
+        if rv:
+            self.emit(record)
+        return bool(rv)
+
+    @override
+    def emit(self, record: logging.LogRecord) -> None:
+        try:
+            line = self.format(record)
+        except Exception:
+            self.handleError(record)
+            return
+
+        size = sys.getsizeof(line) + ENTRY_OVERHEAD
+        if size > self.max_bytes:
+            self.evicted += 1
+            return
+        self._entries.append(
+            RecorderEntry(
+                levelno=record.levelno,
+                request_id=getattr(record, "request_id", None),
+                line=line,
+                size=size,
+            )
+        )
+        self.size += size
+        while len(self._entries) > self.max_records or self.size > self.max_bytes:
+            self.size -= self._entries.popleft().size
+            self.evicted += 1
+
+    def query(
+        self,
+        level: int = logging.NOTSET,
+        path: str | None = None,
+        request_id: str | None = None,
+        limit: int = 100,
+    ) -> list[str]:
+        """
+        Finds the last matching records.
+        Args:
+            level: Minimum level.
+            path: Request path or route template.
+            request_id: Request id.
+            limit: Maximum number of records.
+
+        Returns:
+                Formatted records from the oldest to the newest.
+        """
+        lines = []
+        for entry in reversed(self._entries.copy()):
+            if entry.levelno < level:
+                continue
+            if request_id is not None and request_id != entry.request_id:
+                continue
+            if path is not None and not has_request_path(entry.line, path):
+                continue
+            lines.append(entry.line)
+            if len(lines) >= limit:
+                break
+
+        lines.reverse()
+        return lines
+
+    def get_stats(self) -> dict[str, int]:
+        return {
+            "records": len(self._entries),
+            "bytes": self.size,
+            "evicted": self.evicted,
+        }
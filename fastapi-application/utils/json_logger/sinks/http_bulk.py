@@ -0,0 +1,159 @@
+"""
+This module contains the bulk HTTP sink for Elasticsearch-style ingestion.
+"""
+
+import http.client
+import json
+import logging
+import threading
+from typing import override
+from urllib.parse import urlsplit
+
+from core.config import settings
+from utils.json_logger.sinks.base import (
+    BatchingHandler,
+    PartialSendError,
+)
+
+RETRYABLE_STATUS_CODES = frozenset({408, 429, 500, 502, 503, 504})
+
+
+class BulkSendError(Exception):
+    def __init__(self, status: int, reason: str) -> None:
+        super().__init__(f"Bulk request failed with status {status} {reason}")
+        self.status = status
+
+
+def get_failed_items(body: bytes, lines: list[str]) -> tuple[list[str], int]:
+    """
+    Finds the records that failed in a _bulk response with errors.
+    Args:
+        body: Response body.
+        lines: Records of the request, in the order of the response items.
+
+    Returns:
+            Records failed with a retryable status and number of the other failed records.
+    """
+    try:
+        result = json.loads(body)
+    except ValueError:
+        return [], 0
+    if not isinstance(result, dict) or not result.get("errors"):
+        return [], 0
+
+    failed = []
+    rejected = 0
+    for line, item in zip(lines, result.get("items") or ()):
+        action = next(iter(item.values()), None) if isinstance(item, dict) else None
+        status = action.get("status", 200) if isinstance(action, dict) else 200
+        if status < 300:
+            continue
+        if status in RETRYABLE_STATUS_CODES:
+            failed.append(line)
+        else:
+            rejected += 1
+
+    return failed, rejected
+
+
+class BulkHTTPHandler(BatchingHandler):
+    """
+    Sends formatted records as NDJSON bulk payloads.
+    Each worker thread keeps its own keep-alive connection, so pool_size
+    is both the number of connections and of concurrent bulk requests.
+    If action_line is set, it precedes every record like in the _bulk API,
+    and the items of a response with errors are checked: records failed
+    with a retryable status are retried, the others are dropped.
+    """
+
+    def __init__(
+        self,
+        url: str = settings.log_cfg.bulk_http.url,
+        action_line: str | None = settings.log_cfg.bulk_http.action_line,
+        max_batch_records: int = settings.log_cfg.bulk_http.max_batch_records,
+        max_batch_bytes: int = settings.log_cfg.bulk_http.max_batch_bytes,
+        flush_interval: float = settings.log_cfg.bulk_http.flush_interval,
+        max_pending_records: int = settings.log_cfg.bulk_http.max_pending_records,
+        pool_size: int = settings.log_cfg.bulk_http.pool_size,
+        max_retries: int = settings.log_cfg.bulk_http.max_retries,
+        timeout: float = settings.log_cfg.bulk_http.timeout,
+        headers: dict[str, str] | None = None,
+        level: int = logging.NOTSET,
+    ) -> None:
+        parts = urlsplit(url)
+        if parts.scheme not in ("http", "https") or not parts.hostname:
+            raise ValueError(f"Invalid bulk url: {url}")
+        self.scheme = parts.scheme
+        self.host = parts.hostname
+        self.port = parts.port
+        self.path = parts.path or "/"
+        if parts.query:
+            self.path = f"{self.path}?{parts.query}"
+        self.action_line = action_line
+        self.timeout = timeout
+        self.headers = {"Content-Type": "application/x-ndjson"} | (headers or {})
+        self._local = threading.local()
+        super().__init__(
+            max_batch_records=max_batch_records,
+            max_batch_bytes=max_batch_bytes,
+            flush_interval=flush_interval,
+            max_pending_records=max_pending_records,
+            workers=pool_size,
+            max_retries=max_retries,
+            level=level,
+        )
+
+    def build_payload(self, lines: list[str]) -> bytes:
+        if self.action_line is None:
+            return "".join(f"{line}\n" for line in lines).encode()
+        return "".join(f"{self.action_line}\n{line}\n" for line in lines).encode()
+
+    @override
+    def send_batch(self, lines: list[str]) -> int:
+        payload = self.build_payload(lines)
+        connection = self._get_connection()
+        try:
+            connection.request("POST", self.path, body=payload, headers=self.headers)
+            response = connection.getresponse()
+            body = response.read()
+        except (OSError, http.client.HTTPException):
+            self._close_connection()
+            raise
+
+        if response.will_close:
+            self._close_connection()
+        if response.status >= 300:
+            raise BulkSendError(status=response.status, reason=response.reason)
+        if self.action_line is not None:
+            failed, rejected = get_failed_items(body, lines)
+            if failed or rejected:
+                raise PartialSendError(failed=failed, rejected=rejected, sent=len(payload))
+
+        return len(payload)
+
+    @override
+    def is_retryable(self, exc: Exception) -> bool:
+        if isinstance(exc, PartialSendError):
+            return True
+        if isinstance(exc, BulkSendError):
+            return exc.status in RETRYABLE_STATUS_CODES
+        return isinstance(exc, (OSError, http.client.HTTPException))
+
+    @override
+    def worker_stopped(self) -> None:
+        self._close_connection()
+
+    def _get_connection(self) -> http.client.HTTPConnection:
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            connection_class = http.client.HTTPSConnection if self.scheme == "https" else http.client.HTTPConnection
+            connection = connection_class(self.host, self.port, timeout=self.timeout)
+            self._local.connection = connection
+
+        return connection
+
+    def _close_connection(self) -> None:
+        connection = getattr(self._local, "connection", None)
+        if connection is not None:
+            connection.close()
+            self._local.connection = None
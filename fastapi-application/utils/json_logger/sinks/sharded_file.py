@@ -0,0 +1,49 @@
+"""
+This module contains the per-process sharded log file handler.
+"""
+
+import logging
+import os
+from logging.handlers import RotatingFileHandler
+from pathlib import Path
+from typing import override
+
+
+def get_shard_filename(filename: str | os.PathLike[str], pid: int) -> str:
+    """
+    Returns:
+            File name with the process id inserted before the suffix,
+            e.g. logs/info_log.jsonl -> logs/info_log.1234.jsonl.
+    """
+    path = Path(filename)
+    return str(path.with_name(f"{path.stem}.{pid}{path.suffix}"))
+
+
+class ShardedRotatingFileHandler(RotatingFileHandler):
+    """
+    Rotating file handler that writes to a file of its own process,
+    so the workers neither share an inode nor rotate a file under each other.
+    The shard is switched if the handler is inherited by a forked process.
+    """
+
+    def __init__(self, filename: str | os.PathLike[str], *args, **kwargs) -> None:
+        self.template = os.fspath(filename)
+        self.pid = os.getpid()
+        super().__init__(get_shard_filename(self.template, self.pid), *args, **kwargs)
+
+    @override
+    def emit(self, record: logging.LogRecord) -> None:
+        if self.pid != os.getpid():
+            self._switch_shard()
+        super().emit(record)
+
+    def _switch_shard(self) -> None:
+        self.acquire()
+        try:
+            self.pid = os.getpid()
+            if self.stream is not None:
+                self.stream.close()
+                self.stream = None
+            self.baseFilename = os.path.abspath(get_shard_filename(self.template, self.pid))
+        finally:
+            self.release()
@@ -0,0 +1,208 @@
+"""
+This module contains the stream sink for a local log agent listening on a TCP or Unix socket.
+"""
+
+import logging
+import select
+import socket
+import struct
+import threading
+import time
+from typing import (
+    Any,
+    Literal,
+    override,
+)
+from urllib.parse import urlsplit
+
+from core.config import settings
+from utils.json_logger.sinks.base import BatchingHandler
+
+LENGTH_PREFIX = struct.Struct("!I")
+
+Framing = Literal["newline", "length"]
+
+
+def parse_address(address: str) -> tuple[socket.AddressFamily, str | tuple[str, int]]:
+    """
+    Args:
+        address: tcp://host:port or unix:///path/to/socket.
+
+    Returns:
+            Address family and socket address.
+    """
+    parts = urlsplit(address)
+    if parts.scheme == "unix" and parts.path:
+        return socket.AF_UNIX, parts.path
+    if parts.scheme == "tcp" and parts.hostname and parts.port:
+        return socket.AF_INET6 if ":" in parts.hostname else socket.AF_INET, (parts.hostname, parts.port)
+    raise ValueError(f"Invalid socket address: {address}")
+
+
+class SocketConnection:
+    """
+    Persistent connection of a worker thread and its statistics.
+    """
+
+    def __init__(self, family: socket.AddressFamily, address: str | tuple[str, int], timeout: float) -> None:
+        self.family = family
+        self.address = address
+        self.timeout = timeout
+        self.sock: socket.socket | None = None
+        self.stats = {
+            "connects": 0,
+            "batches_sent": 0,
+            "records_sent": 0,
+            "bytes_sent": 0,
+            "errors": 0,
+            "connected_seconds": 0.0,
+        }
+        self._connected_at = 0.0
+
+    def send(self, payload: bytes, records: int) -> None:
+        sock = self.sock
+        if sock is None or not self._is_alive():
+            sock = self.connect()
+        try:
+            sock.sendall(payload)
+        except OSError:
+            self.stats["errors"] += 1
+            self.close()
+            raise
+        self.stats["batches_sent"] += 1
+        self.stats["records_sent"] += records
+        self.stats["bytes_sent"] += len(payload)
+
+    def connect(self) -> socket.socket:
+        self.close()
+        sock = socket.socket(self.family, socket.SOCK_STREAM)
+        sock.settimeout(self.timeout)
+        try:
+            if self.family != socket.AF_UNIX:
+                sock.setsockopt(socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1)
+            sock.connect(self.address)
+        except OSError:
+            sock.close()
+            self.stats["errors"] += 1
+            raise
+        self.sock = sock
+        self.stats["connects"] += 1
+        self._connected_at = time.monotonic()
+        return sock
+
+    def close(self) -> None:
+        if self.sock is not None:
+            self.sock.close()
+            self.sock = None
+            self.stats["connected_seconds"] += time.monotonic() - self._connected_at
+
+    def get_stats(self) -> dict[str, float]:
+        stats = dict(self.stats)
+        if self.sock is not None:
+            stats["connected_seconds"] += time.monotonic() - self._connected_at
+        stats["connected_seconds"] = round(stats["connected_seconds"], 3)
+        stats["connected"] = self.sock is not None
+        return stats
+
+    def _is_alive(self) -> bool:
+        """
+        Detects a connection closed by the peer, which would otherwise swallow the next batch.
+        """
+        sock = self.sock
+        if sock is None:
+            return False
+        poller = select.poll()
+        poller.register(sock, select.POLLIN)
+        if not poller.poll(0):
+            return True
+        try:
+            return sock.recv(1, socket.MSG_PEEK) != b""
+        except OSError:
+            return False
+
+
+class SocketStreamHandler(BatchingHandler):
+    """
+    Writes batches of formatted records to a TCP or Unix stream socket,
+    framed by a newline or by a 4-byte big-endian length prefix.
+    Each worker thread keeps its own persistent connection and reconnects
+    with the retry backoff of the batching handler, so the listener never waits for the socket.
+    A batch interrupted by a failed connection is sent again on the next one.
+    """
+
+    def __init__(
+        self,
+        address: str = settings.log_cfg.socket_stream.address,
+        framing: Framing = settings.log_cfg.socket_stream.framing,
+        max_batch_records: int = settings.log_cfg.socket_stream.max_batch_records,
+        max_batch_bytes: int = settings.log_cfg.socket_stream.max_batch_bytes,
+        flush_interval: float = settings.log_cfg.socket_stream.flush_interval,
+        max_pending_records: int = settings.log_cfg.socket_stream.max_pending_records,
+        connections: int = settings.log_cfg.socket_stream.connections,
+        max_retries: int = settings.log_cfg.socket_stream.max_retries,
+        max_backoff: float = settings.log_cfg.socket_stream.max_backoff,
+        timeout: float = settings.log_cfg.socket_stream.timeout,
+        level: int = logging.NOTSET,
+    ) -> None:
+        if framing not in ("newline", "length"):
+            raise ValueError(f"Invalid framing: {framing}")
+        self.family, self.address = parse_address(address)
+        self.framing = framing
+        self.timeout = timeout
+        self._local = threading.local()
+        self._connections: dict[str, SocketConnection] = {}
+        super().__init__(
+            max_batch_records=max_batch_records,
+            max_batch_bytes=max_batch_bytes,
+            flush_interval=flush_interval,
+            max_pending_records=max_pending_records,
+            workers=connections,
+            max_retries=max_retries,
+            max_backoff=max_backoff,
+            level=level,
+        )
+
+    def build_payload(self, lines: list[str]) -> bytes:
+        if self.framing == "newline":
+            return "".join(f"{line}\n" for line in lines).encode()
+        frames = []
+        for line in lines:
+            data = line.encode()
+            frames.append(LENGTH_PREFIX.pack(len(data)))
+            frames.append(data)
+        return b"".join(frames)
+
+    @override
+    def send_batch(self, lines: list[str]) -> int:
+        payload = self.build_payload(lines)
+        self._get_connection().send(payload, records=len(lines))
+        return len(payload)
+
+    @override
+    def is_retryable(self, exc: Exception) -> bool:
+        return isinstance(exc, OSError)
+
+    @override
+    def worker_stopped(self) -> None:
+        connection = getattr(self._local, "connection", None)
+        if connection is not None:
+            connection.close()
+
+    @override
+    def get_stats(self) -> dict[str, Any]:
+        """
+        Returns:
+                Statistics of the handler and of the connection of each worker thread.
+        """
+        return super().get_stats() | {
+            "connections": {name: connection.get_stats() for name, connection in list(self._connections.items())},
+        }
+
+    def _get_connection(self) -> SocketConnection:
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            connection = SocketConnection(family=self.family, address=self.address, timeout=self.timeout)
+            self._local.connection = connection
+            self._connections[threading.current_thread().name] = connection
+
+        return connection
@@ -0,0 +1,293 @@
+"""
+This module contains the disk spill stage for slow or unavailable sinks.
+"""
+
+import logging
+import os
+import struct
+import threading
+import time
+import zlib
+from collections import deque
+from logging.handlers import MemoryHandler
+from pathlib import Path
+from typing import (
+    BinaryIO,
+    override,
+)
+
+from core.config import settings
+from utils.json_logger.wire import (
+    WireFormatError,
+    decode_record,
+    encode_record,
+)
+
+FRAME_HEADER = struct.Struct("!II")
+SEGMENT_SUFFIX = ".spill"
+
+
+def is_process_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+
+    return True
+
+
+def get_segment_pid(path: Path) -> int | None:
+    _, _, pid = path.stem.partition("-")
+    return int(pid) if pid.isdigit() else None
+
+
+class SpillHandler(MemoryHandler):
+    """
+    Passes records to the target handler and spills them to segmented,
+    checksummed files while the target raises, is slow or reports a backlog.
+    Errors the target reports through its own handleError are left to it.
+    Spilled records are replayed in order once the target recovers, new records
+    are spilled until then. Segments of dead processes are adopted on start.
+    """
+
+    def __init__(
+        self,
+        target: logging.Handler,
+        directory: Path | str = settings.log_cfg.spill.directory,
+        max_bytes: int = settings.log_cfg.spill.max_bytes,
+        max_age: float = settings.log_cfg.spill.max_age,
+        segment_bytes: int = settings.log_cfg.spill.segment_bytes,
+        slow_threshold: float = settings.log_cfg.spill.slow_threshold,
+        retry_interval: float = settings.log_cfg.spill.retry_interval,
+    ) -> None:
+        super().__init__(capacity=0, target=target, flushOnClose=False)
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self.segment_bytes = segment_bytes
+        self.slow_threshold = slow_threshold
+        self.retry_interval = retry_interval
+        self._spill_lock = threading.Lock()
+        self._segments: deque[Path] = deque()
+        self._writer: BinaryIO | None = None
+        self._writer_path: Path | None = None
+        self._writer_size = 0
+        self._spill_bytes = 0
+        self._replay_offset = 0
+        self._unhealthy_until = 0.0
+        self._stats = {
+            "spilled_records": 0,
+            "replayed_records": 0,
+            "slow_deliveries": 0,
+            "failed_deliveries": 0,
+            "dropped_segments": 0,
+            "dropped_bytes": 0,
+            "corrupt_segments": 0,
+        }
+        self._adopt_segments()
+        self._spilling = bool(self._segments)
+        self._stop = threading.Event()
+        self._replayer = threading.Thread(target=self._replay_loop, name="SpillReplayer", daemon=True)
+        self._replayer.start()
+
+    @override
+    def shouldFlush(self, record: logging.LogRecord) -> bool:
+        return False
+
+    @override
+    def emit(self, record: logging.LogRecord) -> None:
+        with self._spill_lock:
+            if self._spilling:
+                self._spill(record)
+                return
+
+        if self._is_target_unavailable() or not self._deliver(record):
+            with self._spill_lock:
+                self._spilling = True
+                self._spill(record)
+
+    def get_stats(self) -> dict[str, int]:
+        with self._spill_lock:
+            return self._stats | {
+                "spill_bytes": self._spill_bytes,
+                "segments": len(self._segments),
+                "spilling": int(self._spilling),
+            }
+
+    @override
+    def close(self) -> None:
+        self._stop.set()
+        self._replayer.join(timeout=self.retry_interval * 2)
+        with self._spill_lock:
+            if self._writer is not None:
+                self._writer.close()
+                self._writer = None
+        super().close()
+
+    def _is_target_unavailable(self) -> bool:
+        if time.monotonic() < self._unhealthy_until:
+            return True
+        is_backlogged = getattr(self.target, "is_backlogged", None)
+        return is_backlogged is not None and is_backlogged()
+
+    def _deliver(self, record: logging.LogRecord) -> bool:
+        if self.target is None:
+            return False
+        start = time.monotonic()
+        try:
+            self.target.handle(record)
+        except Exception:
+            self._stats["failed_deliveries"] += 1
+            self._unhealthy_until = time.monotonic() + self.retry_interval
+            return False
+        if time.monotonic() - start > self.slow_threshold:
+            self._stats["slow_deliveries"] += 1
+            self._unhealthy_until = time.monotonic() + self.retry_interval
+
+        return True
+
+    def _adopt_segments(self) -> None:
+        pid = os.getpid()
+        for path in sorted(self.directory.glob(f"*{SEGMENT_SUFFIX}")):
+            segment_pid = get_segment_pid(path)
+            if segment_pid != pid:
+                if segment_pid is None or is_process_alive(segment_pid):
+                    continue
+                timestamp, _, _ = path.stem.partition("-")
+                adopted = path.with_name(f"{timestamp}-{pid}{SEGMENT_SUFFIX}")
+                try:
+                    path.rename(adopted)
+                except FileNotFoundError:
+                    continue
+                path = adopted
+            self._segments.append(path)
+            self._spill_bytes += path.stat().st_size
+
+    def _spill(self, record: logging.LogRecord) -> None:
+        payload = encode_record(record)
+        frame = FRAME_HEADER.pack(len(payload), zlib.crc32(payload)) + payload
+        writer = self._writer
+        if writer is None or self._writer_size + len(frame) > self.segment_bytes:
+            writer = self._open_segment()
+        writer.write(frame)
+        writer.flush()
+        self._writer_size += len(frame)
+        self._spill_bytes += len(frame)
+        self._stats["spilled_records"] += 1
+
+        while self._spill_bytes > self.max_bytes and len(self._segments) > 1:
+            self._drop_oldest_segment()
+
+    def _open_segment(self) -> BinaryIO:
+        if self._writer is not None:
+            self._writer.close()
+        self._writer_path = self.directory / f"{time.time_ns():020d}-{os.getpid()}{SEGMENT_SUFFIX}"
+        self._writer = open(self._writer_path, "ab")
+        self._writer_size = 0
+        self._segments.append(self._writer_path)
+        return self._writer
+
+    def _drop_oldest_segment(self) -> None:
+        path = self._segments.popleft()
+        size = self._remove_segment(path)
+        self._stats["dropped_segments"] += 1
+        self._stats["dropped_bytes"] += size
+        self._replay_offset = 0
+
+    def _remove_segment(self, path: Path) -> int:
+        if path == self._writer_path and self._writer is not None:
+            self._writer.close()
+            self._writer = None
+            self._writer_path = None
+            size = self._writer_size
+        else:
+            try:
+                size = path.stat().st_size
+            except FileNotFoundError:
+                size = 0
+        path.unlink(missing_ok=True)
+        self._spill_bytes -= size
+
+        return size
+
+    def _drop_expired_segments(self) -> None:
+        expire_before = time.time() - self.max_age
+        while self._segments and self._segments[0] != self._writer_path:
+            try:
+                expired = self._segments[0].stat().st_mtime < expire_before
+            except FileNotFoundError:
+                expired = True
+            if not expired:
+                break
+            self._drop_oldest_segment()
+
+    def _replay_loop(self) -> None:
+        while not self._stop.wait(self.retry_interval):
+            self._replay()
+
+    def _replay(self) -> None:
+        with self._spill_lock:
+            if not self._spilling:
+                return
+            self._drop_expired_segments()
+
+        while not self._stop.is_set() and not self._is_target_unavailable():
+            with self._spill_lock:
+                if not self._segments:
+                    self._spilling = False
+                    return
+                path = self._segments[0]
+                offset = self._replay_offset
+
+            delivered, offset = self._replay_segment(path, offset)
+            with self._spill_lock:
+                if not self._segments or self._segments[0] != path:
+                    continue
+                self._replay_offset = offset
+                if not delivered:
+                    return
+                if path == self._writer_path and self._writer_size > offset:
+                    continue
+                self._segments.popleft()
+                self._remove_segment(path)
+                self._replay_offset = 0
+                if not self._segments:
+                    self._spilling = False
+                    return
+
+    def _replay_segment(self, path: Path, offset: int) -> tuple[bool, int]:
+        """
+        Delivers the records of a segment starting from the offset.
+        Returns:
+                Whether the end of the segment was reached and the offset of the next record.
+        """
+        try:
+            reader = open(path, "rb")
+        except FileNotFoundError:
+            return True, offset
+        with reader:
+            reader.seek(offset)
+            while not self._stop.is_set():
+                header = reader.read(FRAME_HEADER.size)
+                if len(header) < FRAME_HEADER.size:
+                    break
+                length, checksum = FRAME_HEADER.unpack(header)
+                payload = reader.read(length)
+                if len(payload) < length:
+                    break
+                try:
+                    if zlib.crc32(payload) != checksum:
+                        raise WireFormatError("Checksum mismatch")
+                    record = decode_record(payload)
+                except WireFormatError:
+                    self._stats["corrupt_segments"] += 1
+                    return True, reader.seek(0, os.SEEK_END)
+                if not self._deliver(record):
+                    return False, offset
+                offset += FRAME_HEADER.size + length
+                self._stats["replayed_records"] += 1
+
+        return True, offset
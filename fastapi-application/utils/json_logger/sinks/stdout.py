@@ -0,0 +1,114 @@
+"""
+This module contains the buffered stdout sink for containerized deployments.
+"""
+
+import logging
+import os
+import select
+import stat
+import sys
+import time
+from collections.abc import Iterator
+from typing import override
+
+from core.config import settings
+from utils.json_logger.sinks.base import BatchingHandler
+
+
+class StdoutStalledError(TimeoutError):
+    pass
+
+
+def iter_chunks(payload: memoryview, chunk_bytes: int) -> Iterator[memoryview]:
+    """
+    Splits the payload into chunks of whole lines of at most chunk_bytes.
+    A line longer than chunk_bytes is a chunk of its own.
+    """
+    data = payload.tobytes()
+    start = 0
+    while start < len(data):
+        end = start + chunk_bytes
+        if end < len(data):
+            newline = data.rfind(b"\n", start, end)
+            if newline == -1:
+                newline = data.find(b"\n", end)
+            end = len(data) if newline == -1 else newline + 1
+        yield payload[start:end]
+        start = end
+
+
+class BufferedStdoutHandler(BatchingHandler):
+    """
+    Writes batches of formatted records to the stdout file descriptor with os.write,
+    bypassing the buffer of sys.stdout. Records are formatted by the listener and
+    written by a worker thread, so a full pipe never blocks the listener,
+    when the pending records exceed max_pending_records the oldest batches are dropped.
+    If stdout is a pipe or a socket, batches are written in chunks of whole lines of at most PIPE_BUF bytes,
+    a record longer than that is written by an os.write of its own. Only writes of at most PIPE_BUF bytes
+    to a pipe or FIFO are atomic, so a longer record may interleave with the output of other writers,
+    writes to sockets and regular files are not guaranteed to be atomic.
+    A batch is dropped if the pipe stays full for write_timeout.
+    """
+
+    def __init__(
+        self,
+        fd: int | None = None,
+        max_batch_records: int = settings.log_cfg.stdout.max_batch_records,
+        max_batch_bytes: int = settings.log_cfg.stdout.max_batch_bytes,
+        flush_interval: float = settings.log_cfg.stdout.flush_interval,
+        max_pending_records: int = settings.log_cfg.stdout.max_pending_records,
+        write_timeout: float = settings.log_cfg.stdout.write_timeout,
+        level: int = logging.NOTSET,
+    ) -> None:
+        self.fd = sys.stdout.fileno() if fd is None else fd
+        self.write_timeout = write_timeout
+        mode = os.fstat(self.fd).st_mode
+        self.is_pipe = stat.S_ISFIFO(mode) or stat.S_ISSOCK(mode)
+        self.chunk_bytes = select.PIPE_BUF if self.is_pipe else max_batch_bytes
+        self.writes = 0
+        self.stalls = 0
+        super().__init__(
+            max_batch_records=max_batch_records,
+            max_batch_bytes=max_batch_bytes,
+            flush_interval=flush_interval,
+            max_pending_records=max_pending_records,
+            workers=1,
+            max_retries=0,
+            level=level,
+        )
+
+    @override
+    def send_batch(self, lines: list[str]) -> int:
+        payload = memoryview("".join(f"{line}\n" for line in lines).encode())
+        for chunk in iter_chunks(payload, self.chunk_bytes):
+            self._write(chunk)
+        return len(payload)
+
+    @override
+    def is_retryable(self, exc: Exception) -> bool:
+        return False
+
+    @override
+    def get_stats(self) -> dict[str, int]:
+        return super().get_stats() | {"writes": self.writes, "stalls": self.stalls}
+
+    def _write(self, chunk: memoryview) -> None:
+        deadline = time.monotonic() + self.write_timeout
+        while chunk:
+            remaining = deadline - time.monotonic()
+            if self.is_pipe:
+                poller = select.poll()
+                poller.register(self.fd, select.POLLOUT)
+                if not poller.poll(max(remaining, 0) * 1000):
+                    self.stalls += 1
+                    raise StdoutStalledError(f"Stdout is not writable for {self.write_timeout} seconds")
+            try:
+                written = os.write(self.fd, chunk)
+            except BlockingIOError:
+                if remaining <= 0:
+                    self.stalls += 1
+                    raise StdoutStalledError(f"Stdout is not writable for {self.write_timeout} seconds")
+                time.sleep(min(0.01, remaining))
+                continue
+            self.writes += 1
+            chunk = chunk[written:]
@@ -0,0 +1,178 @@
+"""
+This module contains the spans timing the sub-operations of a request.
+
+    with span("db.query"):
+        ...
+
+    @span("serialize")
+    async def serialize(...):
+        ...
+
+Spans are recorded only while the logging middleware traces the request,
+otherwise entering a span costs a single context variable lookup.
+"""
+
+import functools
+import inspect
+from collections.abc import Callable
+from contextvars import (
+    ContextVar,
+    Token,
+)
+from time import perf_counter_ns
+from typing import (
+    Any,
+    ParamSpec,
+    TypeVar,
+    cast,
+)
+
+from core.config import settings
+
+NO_PARENT = -1
+DROPPED = -2
+
+P = ParamSpec("P")
+R = TypeVar("R")
+
+OpenSpan = tuple["RequestTrace", int, Token[int] | None]
+
+_request_trace: ContextVar["RequestTrace | None"] = ContextVar("request_trace", default=None)
+_parent_span: ContextVar[int] = ContextVar("parent_span", default=NO_PARENT)
+_open_spans: ContextVar[tuple[OpenSpan, ...]] = ContextVar("open_spans", default=())
+
+
+class RequestTrace:
+    """
+    Spans of a single request, at most max_spans of them are kept.
+    Each span is stored as [name, parent index, start, end] in nanoseconds.
+    """
+
+    __slots__ = (
+        "max_spans",
+        "started",
+        "dropped",
+        "_spans",
+    )
+
+    def __init__(self, max_spans: int = settings.log_cfg.tracing.max_spans) -> None:
+        self.max_spans = max_spans
+        self.started = perf_counter_ns()
+        self.dropped = 0
+        self._spans: list[list[Any]] = []
+
+    def __len__(self) -> int:
+        return len(self._spans)
+
+    def open(self, name: str, parent: int) -> int:
+        if len(self._spans) >= self.max_spans:
+            self.dropped += 1
+            return DROPPED
+        self._spans.append([name, parent, perf_counter_ns(), None])
+        return len(self._spans) - 1
+
+    def close(self, index: int) -> None:
+        if index >= 0:
+            self._spans[index][3] = perf_counter_ns()
+
+    def to_dict(self) -> dict[str, Any]:
+        """
+        Returns:
+                Spans with the start offset from the beginning of the request and the duration
+                in microseconds, unfinished spans have no duration.
+        """
+        spans = []
+        for name, parent, start, end in self._spans:
+            item = {"name": name, "start_us": (start - self.started) // 1000}
+            item["duration_us"] = None if end is None else (end - start) // 1000
+            if parent != NO_PARENT:
+                item["parent"] = parent
+            spans.append(item)
+
+        fields: dict[str, Any] = {"spans": spans}
+        if self.dropped:
+            fields["spans_dropped"] = self.dropped
+        return fields
+
+
+class span:
+    """
+    Context manager and decorator recording a span in the current request trace.
+    The open spans are kept in the context rather than on the instance,
+    so an instance can be reused, nested and entered by concurrent tasks.
+    """
+
+    __slots__ = ("name",)
+
+    def __init__(self, name: str) -> None:
+        self.name = name
+
+    def __enter__(self) -> "span":
+        trace = _request_trace.get()
+        if trace is not None:
+            index = trace.open(self.name, _parent_span.get())
+            token = _parent_span.set(index) if index >= 0 else None
+            _open_spans.set((*_open_spans.get(), (trace, index, token)))
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        open_spans = _open_spans.get()
+        if open_spans:
+            trace, index, token = open_spans[-1]
+            _open_spans.set(open_spans[:-1])
+            trace.close(index)
+            if token is not None:
+                _parent_span.reset(token)
+
+    async def __aenter__(self) -> "span":
+        return self.__enter__()
+
+    async def __aexit__(self, *exc_info) -> None:
+        self.__exit__(*exc_info)
+
+    def __call__(self, func: Callable[P, R]) -> Callable[P, R]:
+        name = self.name
+
+        if inspect.iscoroutinefunction(func):
+
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                if _request_trace.get() is None:
+                    return await func(*args, **kwargs)
+                with span(name):
+                    return await func(*args, **kwargs)
+
+            return cast(Callable[P, R], async_wrapper)
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if _request_trace.get() is None:
+                return func(*args, **kwargs)
+            with span(name):
+                return func(*args, **kwargs)
+
+        return wrapper
+
+
+def start_request_trace() -> Token["RequestTrace | None"]:
+    """
+    Binds a new trace to the current request context.
+    Returns:
+            Token for restoring the previous context value.
+    """
+    return _request_trace.set(RequestTrace())
+
+
+def get_request_trace() -> RequestTrace | None:
+    return _request_trace.get()
+
+
+def end_request_trace(token: Token["RequestTrace | None"]) -> RequestTrace | None:
+    """
+    Unbinds the trace of the current request.
+    Returns:
+            The trace or None if it was not bound.
+    """
+    trace = _request_trace.get()
+    _request_trace.reset(token)
+    return trace
@@ -0,0 +1,164 @@
+"""
+This module contains the compact wire format for the records sent
+from the queue handler to the queue listener.
+
+A record is a struct-packed header followed by length-prefixed fields:
+    version, flags, level, created, process, duration,
+    lengths of the name, message, exceptions and extras fields,
+    name (utf-8), message (utf-8), exceptions (json), extras (json).
+Only the attributes used by JSONLogFormatter are sent.
+"""
+
+import json
+import logging
+import struct
+from typing import Any
+
+WIRE_VERSION = 2
+HEADER = struct.Struct("!BBHdIqIIII")
+MAX_DURATION = 2**63 - 1
+WIRE_EXTRAS: tuple[str, ...] = (
+    "request_json_fields",
+    "suppressed",
+    "route_summary",
+    "json_fragments",
+    "request_id",
+)
+
+EMPTY = b""
+
+QueueItem = bytes | logging.LogRecord
+
+
+class WireFormatError(ValueError):
+    pass
+
+
+class WireRecord(logging.LogRecord):
+    """
+    Lightweight log record decoded from the wire format.
+    The parent initializer is not called, only the attributes
+    used by the formatter and the handlers are set.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        levelno: int,
+        created: float,
+        process: int,
+        duration: int,
+        message: str,
+        exceptions: list[Any] | str | None = None,
+        extras: dict[str, Any] | None = None,
+    ) -> None:
+        self.name = name
+        self.levelno = levelno
+        self.levelname = logging.getLevelName(levelno)
+        self.created = created
+        self.msecs = (created - int(created)) * 1000
+        self.process = process
+        self.duration = duration
+        self.msg = message
+        self.args = None
+        self.exc_info = None
+        self.exc_text = None
+        self.stack_info = None
+        self.rendered_exceptions = exceptions
+        if extras:
+            self.__dict__.update(extras)
+
+    def __repr__(self) -> str:
+        return f"<WireRecord: {self.name}, {self.levelno}, {self.msg!r:.50}>"
+
+
+def _dump_json(obj: object) -> bytes:
+    if obj is None:
+        return EMPTY
+    return json.dumps(obj, default=str, separators=(",", ":")).encode()
+
+
+def encode_record(record: logging.LogRecord, exceptions: list[Any] | str | None = None) -> bytes:
+    """
+    Encodes a log record.
+    Args:
+        record: Log record.
+        exceptions: Rendered exceptions of the record.
+
+    Returns:
+            Encoded record.
+    """
+    duration = record.duration if hasattr(record, "duration") else record.msecs
+    extras = {key: getattr(record, key) for key in WIRE_EXTRAS if hasattr(record, key)}
+    request_event = getattr(record, "request_event", None)
+    if request_event is not None:
+        extras["request_json_fields"] = request_event.to_dict()
+    name = record.name.encode()
+    message = record.getMessage().encode()
+    exc_field = _dump_json(exceptions)
+    extras_field = _dump_json(extras or None)
+    header = HEADER.pack(
+        WIRE_VERSION,
+        0,
+        record.levelno,
+        record.created,
+        record.process or 0,
+        max(-MAX_DURATION, min(MAX_DURATION, int(duration))),
+        len(name),
+        len(message),
+        len(exc_field),
+        len(extras_field),
+    )
+
+    return b"".join((header, name, message, exc_field, extras_field))
+
+
+def decode_record(data: bytes) -> WireRecord:
+    """
+    Decodes a record encoded by encode_record.
+    Args:
+        data: Encoded record.
+
+    Returns:
+            Lightweight log record.
+    """
+    try:
+        (
+            version,
+            _flags,
+            levelno,
+            created,
+            process,
+            duration,
+            name_len,
+            message_len,
+            exc_len,
+            extras_len,
+        ) = HEADER.unpack_from(data)
+    except struct.error as err:
+        raise WireFormatError("Truncated record header") from err
+    if version != WIRE_VERSION:
+        raise WireFormatError(f"Unsupported wire format version: {version}")
+    if HEADER.size + name_len + message_len + exc_len + extras_len != len(data):
+        raise WireFormatError("Record length does not match the header")
+
+    view = memoryview(data)
+    offset = HEADER.size
+    name = str(view[offset : offset + name_len], "utf-8")
+    offset += name_len
+    message = str(view[offset : offset + message_len], "utf-8")
+    offset += message_len
+    exceptions = json.loads(view[offset : offset + exc_len].tobytes()) if exc_len else None
+    offset += exc_len
+    extras = json.loads(view[offset : offset + extras_len].tobytes()) if extras_len else None
+
+    return WireRecord(
+        name=name,
+        levelno=levelno,
+        created=created,
+        process=process,
+        duration=duration,
+        message=message,
+        exceptions=exceptions,
+        extras=extras,
+    )